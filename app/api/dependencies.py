@@ -1,34 +1,87 @@
-import os
+import sys
+import math
+import asyncio
+import importlib
+import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 
 from app.core.azure_client import AzureClient
+from app.core.monitoring import TENANT_REQUESTS
+from app.core.tenancy import Tenant, get_tenant_index
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+# Modules that pull in pandas and the source/sink backends; imported after startup
+BACKEND_MODULES = ["app.core.data_processor"]
+
 # Azure client singleton
 _azure_client = None
 
-def get_azure_client() -> AzureClient:
+def azure_client_instance() -> AzureClient:
     """
-    Get or create the Azure client singleton
+    Get or create the Azure client singleton without initializing it
     """
     global _azure_client
     if _azure_client is None:
         _azure_client = AzureClient()
     return _azure_client
 
+async def get_azure_client() -> AzureClient:
+    """
+    Get the Azure client singleton, waiting for its initialization if
+    startup has not finished it yet
+    """
+    client = azure_client_instance()
+    await client.initialize()
+    return client
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-async def verify_api_key(api_key: Optional[str] = Depends(oauth2_scheme)):
+async def initialize_backends():
     """
-    Verify the API key if security is enabled
+    Initialize the Azure client and import the data processing backends in
+    the background, retrying the Azure initialization until it succeeds
     """
+    client = azure_client_instance()
+    warm_up = asyncio.gather(*[asyncio.to_thread(importlib.import_module, name) for name in BACKEND_MODULES])
     
+    delay = 1
+    while True:
+        try:
+            await client.initialize()
+            break
+        except Exception as e:
+            logger.error(f"Azure client initialization failed, retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+    
+    await warm_up
+
+def backends_ready() -> bool:
+    """
+    Whether the service can process requests without further initialization
+    """
+    return (
+        _azure_client is not None
+        and _azure_client.initialized
+        and all(name in sys.modules for name in BACKEND_MODULES)
+    )
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+def authenticate(api_key: Optional[str]) -> Tenant:
+    """
+    The tenant an API key belongs to. Requests are anonymous, and run as the
+    default tenant, only in DEBUG mode; without configured keys every
+    request is refused.
+    """
+    index = get_tenant_index()
     if settings.DEBUG:
-        return True
-        
+        return index.default
+    
     if not api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,13 +89,41 @@ async def verify_api_key(api_key: Optional[str] = Depends(oauth2_scheme)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Validate against a database or secure storage
-    valid_api_keys = os.environ.get("API_KEYS", "").split(",")
-    if api_key not in valid_api_keys:
+    tenant = index.lookup(api_key)
+    if tenant is None:
+        TENANT_REQUESTS.labels("unknown", "unauthorized").inc()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return True
\ No newline at end of file
+    return tenant
+
+async def verify_api_key(api_key: Optional[str] = Depends(oauth2_scheme)) -> Tenant:
+    """
+    Verify the API key if security is enabled
+    """
+    return authenticate(api_key)
+
+async def rate_limited_tenant(tenant: Tenant = Depends(verify_api_key)) -> Tenant:
+    """
+    The calling tenant, after charging the request to its rate limit
+    """
+    return charge_tenant(tenant)
+
+def charge_tenant(tenant: Tenant) -> Tenant:
+    """
+    Charge one request to the tenant's rate limit, raising 429 when it is spent
+    """
+    retry_after = get_tenant_index().acquire(tenant)
+    if retry_after:
+        TENANT_REQUESTS.labels(tenant.name, "throttled").inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit of {tenant.rate:g} requests/s exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    
+    TENANT_REQUESTS.labels(tenant.name, "accepted").inc()
+    return tenant
@@ -1,34 +1,73 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.security.utils import get_authorization_scheme_param
+from fastapi.responses import JSONResponse
 from typing import List, Optional
+import asyncio
 import logging
-from app.schemas.models import DataSourceConfig, ProcessingStatus, JobStatus
-from app.core.data_processor import process_data, check_job_status
+import uuid
+from app.schemas.models import DataSourceConfig, ProcessingStatus, JobStatus, StreamConfig, StreamStatus
 from app.core.azure_client import AzureClient
-from app.api.dependencies import get_azure_client
+from app.core.job_registry import get_job_registry
+from app.core.tenancy import DEFAULT_TENANT, Tenant
+from app.api.dependencies import authenticate, charge_tenant, get_azure_client, backends_ready, rate_limited_tenant
+
+# app.core.data_processor and app.core.streaming (pandas and the source
+# backends) are imported inside the handlers so the app can start serving
+# before they have loaded
 
 router = APIRouter(prefix="/api/v1")
+health_router = APIRouter(prefix="/health")
 logger = logging.getLogger(__name__)
 
+async def check_job_tenant(job_id: str, tenant: Tenant):
+    """
+    Answer 404 unless ``tenant`` started the job; jobs from before tenants
+    were tracked belong to the default tenant
+    """
+    owner = await asyncio.to_thread(get_job_registry().job_tenant, job_id)
+    if (owner or DEFAULT_TENANT) != tenant.name:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+@health_router.get("/live")
+async def liveness():
+    """
+    The process is up and serving requests
+    """
+    return {"status": "alive"}
+
+@health_router.get("/ready")
+async def readiness():
+    """
+    The Azure client is initialized and the processing backends are loaded
+    """
+    if not backends_ready():
+        return JSONResponse(status_code=503, content={"status": "initializing"})
+    return {"status": "ready"}
+
 @router.post("/ingest", response_model=JobStatus)
 async def ingest_data(
-    background_tasks: BackgroundTasks,
+    request: Request,
     config: DataSourceConfig,
+    tenant: Tenant = Depends(rate_limited_tenant),
     azure_client: AzureClient = Depends(get_azure_client)
 ):
     """
-    Endpoint to start data ingestion job to Azure
+    Endpoint to start data ingestion job to Azure.
+
+    The job is queued in the shared job registry and run by whichever worker
+    process claims it first, with workers shared fairly between tenants.
     """
     try:
         
         job_id = azure_client.generate_job_id()
         
         
-        background_tasks.add_task(
-            process_data,
-            job_id=job_id,
-            config=config,
-            azure_client=azure_client
+        await asyncio.to_thread(
+            get_job_registry().submit, job_id, "ingest", config.dict(), tenant.name, tenant.weight
         )
+        job_worker = getattr(request.app.state, "job_worker", None)
+        if job_worker:
+            job_worker.notify()
         
         logger.info(f"Started ingestion job {job_id}")
         return JobStatus(job_id=job_id, status="processing")
@@ -42,6 +81,7 @@ async def ingest_file(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     destination: str = Form(...),
+    tenant: Tenant = Depends(rate_limited_tenant),
     azure_client: AzureClient = Depends(get_azure_client)
 ):
     """
@@ -52,6 +92,7 @@ async def ingest_file(
         
         
         file_contents = await file.read()
+        await asyncio.to_thread(get_job_registry().record_upload, job_id, tenant.name)
         
         
         background_tasks.add_task(
@@ -72,10 +113,13 @@ async def ingest_file(
 
 
 @router.get("/status/{job_id}", response_model=ProcessingStatus)
-async def get_job_status(job_id: str):
+async def get_job_status(job_id: str, tenant: Tenant = Depends(rate_limited_tenant)):
     """
     Check the status of a processing job
     """
+    from app.core.data_processor import check_job_status
+    
+    await check_job_tenant(job_id, tenant)
     try:
         status = await check_job_status(job_id)
         return status
@@ -83,20 +127,160 @@ async def get_job_status(job_id: str):
         logger.error(f"Failed to get job status: {str(e)}")
         raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
 
+@router.post("/retry/{job_id}", response_model=JobStatus)
+async def retry_job(request: Request, job_id: str, tenant: Tenant = Depends(rate_limited_tenant)):
+    """
+    Requeue a failed job; it resumes from the batches it already committed
+    """
+    await check_job_tenant(job_id, tenant)
+    try:
+        requeued = await asyncio.to_thread(get_job_registry().retry, job_id)
+    except Exception as e:
+        logger.error(f"Error retrying job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not requeued:
+        raise HTTPException(status_code=400, detail="Only failed jobs can be retried")
+    
+    job_worker = getattr(request.app.state, "job_worker", None)
+    if job_worker:
+        job_worker.notify()
+    
+    logger.info(f"Requeued job {job_id}")
+    return JobStatus(job_id=job_id, status="queued")
+
 @router.post("/cancel/{job_id}", response_model=JobStatus)
 async def cancel_job(
     job_id: str,
+    tenant: Tenant = Depends(rate_limited_tenant),
     azure_client: AzureClient = Depends(get_azure_client)
 ):
     """
     Cancel a running job
     """
+    await check_job_tenant(job_id, tenant)
     try:
-        success = await azure_client.cancel_job(job_id)
+        queued = await asyncio.to_thread(get_job_registry().cancel, job_id)
+        success = await azure_client.cancel_job(job_id) or queued
         if success:
             return JobStatus(job_id=job_id, status="cancelled")
         else:
             raise HTTPException(status_code=400, detail="Failed to cancel job")
     except Exception as e:
         logger.error(f"Error cancelling job {job_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/streams", response_model=StreamStatus)
+async def create_stream(config: StreamConfig, tenant: Tenant = Depends(rate_limited_tenant)):
+    """
+    Open a push stream; records sent to it are micro-batched to its destinations
+    """
+    try:
+        stream_id = str(uuid.uuid4())
+        await asyncio.to_thread(get_job_registry().create_stream, stream_id, config.dict(), tenant.name)
+        
+        logger.info(f"Opened stream {stream_id}")
+        return StreamStatus(stream_id=stream_id, status="open")
+    
+    except Exception as e:
+        logger.error(f"Failed to open stream: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/streams/{stream_id}", response_model=StreamStatus)
+async def get_stream(stream_id: str, tenant: Tenant = Depends(rate_limited_tenant)):
+    """
+    A stream's config, and the counters of the worker answering the request
+    """
+    from app.core.streaming import get_stream_manager
+    
+    config = await asyncio.to_thread(get_job_registry().get_stream, stream_id, tenant.name)
+    if config is None:
+        raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found")
+    
+    return StreamStatus(
+        stream_id=stream_id,
+        status="open",
+        details={"config": config, "worker_stats": get_stream_manager().stats(stream_id)}
+    )
+
+@router.delete("/streams/{stream_id}", response_model=StreamStatus)
+async def delete_stream(stream_id: str, tenant: Tenant = Depends(rate_limited_tenant)):
+    """
+    Close a stream, flushing the records this worker has queued; other
+    workers flush theirs when they notice the stream is gone
+    """
+    from app.core.streaming import get_stream_manager
+    
+    if not await asyncio.to_thread(get_job_registry().delete_stream, stream_id, tenant.name):
+        raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found")
+    
+    manager = get_stream_manager()
+    await manager.close(stream_id)
+    return StreamStatus(stream_id=stream_id, status="closed")
+
+@router.post("/streams/{stream_id}/records", response_model=StreamStatus)
+async def push_records(stream_id: str, request: Request, tenant: Tenant = Depends(rate_limited_tenant)):
+    """
+    Push newline-delimited JSON records to a stream. The body is read as it
+    arrives and reading pauses while the stream's queue is full.
+    """
+    from app.core.streaming import InvalidRecord, RecordTooLarge, StreamClosed, get_stream_manager, iter_ndjson
+    
+    accepted = 0
+    async with get_stream_manager().producer(stream_id, tenant.name) as batcher:
+        if batcher is None:
+            raise HTTPException(status_code=404, detail=f"Stream {stream_id} not found")
+        
+        try:
+            async for record in iter_ndjson(request.stream()):
+                await batcher.put(record)
+                accepted += 1
+        except RecordTooLarge as e:
+            raise HTTPException(status_code=413, detail=f"{str(e)}; {accepted} records accepted before it")
+        except InvalidRecord as e:
+            raise HTTPException(status_code=400, detail=f"{str(e)}; {accepted} records accepted before it")
+        except StreamClosed:
+            raise HTTPException(status_code=409, detail=f"Stream {stream_id} closed; {accepted} records accepted")
+    
+    return StreamStatus(stream_id=stream_id, status="open", details={"accepted": accepted})
+
+@router.websocket("/streams/{stream_id}/ws")
+async def stream_websocket(websocket: WebSocket, stream_id: str):
+    """
+    Push records over a WebSocket: each text message holds one or more
+    newline-delimited JSON records and is answered with the number accepted.
+    Messages stop being read while the stream's queue is full.
+    """
+    from app.core.streaming import InvalidRecord, StreamClosed, get_stream_manager, parse_ndjson
+    
+    # Dependencies can't reject a handshake with a status code, so authenticate and rate limit by hand
+    scheme, api_key = get_authorization_scheme_param(websocket.headers.get("authorization"))
+    try:
+        tenant = charge_tenant(authenticate(api_key if scheme.lower() == "bearer" else None))
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    
+    async with get_stream_manager().producer(stream_id, tenant.name) as batcher:
+        if batcher is None:
+            await websocket.close(code=1008, reason="Stream not found")
+            return
+        
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    records = parse_ndjson(message)
+                except InvalidRecord as e:
+                    await websocket.send_json({"error": str(e)})
+                    continue
+                
+                for record in records:
+                    await batcher.put(record)
+                await websocket.send_json({"accepted": len(records)})
+        
+        except WebSocketDisconnect:
+            pass
+        except StreamClosed:
+            await websocket.close(code=1001, reason="Stream closed")
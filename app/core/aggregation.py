@@ -0,0 +1,513 @@
+# app/core/aggregation.py
+"""
+Streaming group-by aggregation over a sequence of DataFrame batches.
+
+Each batch is reduced to partial aggregates that are merged into a running
+state, so memory grows with the number of groups rather than the number of
+rows. When the state outgrows ``max_memory_bytes`` it is hash-partitioned
+and spilled to disk; partitions are merged one at a time when the result is
+produced.
+
+Supported functions: ``sum``, ``count``, ``min``, ``max``, ``mean``, and the
+approximate ``approx_distinct`` (HyperLogLog), ``approx_median`` and
+``approx_pNN`` percentiles such as ``approx_p95`` (mergeable quantile
+sketch). Exact functions such as ``nunique``, ``median`` and ``p95`` need
+all rows at once and are computed in memory.
+
+Sketches are kept as plain columns rather than one object per group, so
+building, merging and finalizing them are whole-column operations:
+
+- A HyperLogLog is a set of (group, register, rank) rows, holding only the
+  registers a group has set, until the group sets more than
+  ``HLL_SPARSE_MAX`` of them; it then moves to one row of dense registers.
+- A quantile sketch is a set of (group, value, weight) rows, compressed to
+  at most ``QUANTILE_SKETCH_SIZE`` evenly weighted points per group.
+"""
+import logging
+import os
+import pickle
+import re
+import shutil
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NATIVE_FUNCTIONS = {"sum", "count", "min", "max", "mean"}
+DISTINCT_FUNCTIONS = {"approx_distinct"}
+_PERCENTILE_RE = re.compile(r"^p(\d{1,2}(?:\.\d+)?)$")
+_APPROX_PERCENTILE_RE = re.compile(r"^approx_p(\d{1,2}(?:\.\d+)?)$")
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+# A sparse register costs about 24 bytes (index codes and hash table, rank)
+# against 1 byte in a dense row, so groups switch over well before half full
+HLL_SPARSE_MAX = HLL_REGISTERS // 16
+QUANTILE_SKETCH_SIZE = 512
+
+# Rows of dense registers estimated at a time, bounding the float64 temporary
+_ESTIMATE_CHUNK = 1024
+_INVERSE_POWERS = np.power(2.0, -np.arange(256, dtype=np.float64))
+
+
+def _quantile_of(func: str) -> Optional[float]:
+    """The quantile of an exact percentile function (``median``, ``p95``)"""
+    if func == "median":
+        return 0.5
+    match = _PERCENTILE_RE.match(func)
+    return float(match.group(1)) / 100 if match else None
+
+
+def _approx_quantile_of(func: str) -> Optional[float]:
+    """The quantile of a sketched percentile function (``approx_median``, ``approx_p95``)"""
+    if func == "approx_median":
+        return 0.5
+    match = _APPROX_PERCENTILE_RE.match(func)
+    return float(match.group(1)) / 100 if match else None
+
+
+def is_streamable(aggregations: Dict[str, str]) -> bool:
+    """Whether every function in an aggregation spec is supported here"""
+    return all(
+        func in NATIVE_FUNCTIONS or func in DISTINCT_FUNCTIONS or _approx_quantile_of(func) is not None
+        for func in aggregations.values()
+    )
+
+
+# Sketches
+
+def _key_levels(nkeys: int) -> List[int]:
+    return list(range(nkeys))
+
+def _with_key_index(keys: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """A frame of ``columns`` indexed by the group keys of each row"""
+    frame = keys.assign(**columns)
+    return frame.set_index(list(keys.columns))
+
+def _group_layout(codes: np.ndarray, ngroups: int):
+    """Counts, start and end positions of each group in rows sorted by group code"""
+    counts = np.bincount(codes, minlength=ngroups)
+    ends = np.cumsum(counts)
+    return counts, ends - counts, ends
+
+
+def _hll_partial(keys: pd.DataFrame, values: pd.Series) -> pd.Series:
+    """The highest rank seen per (group, register), as a Series indexed by keys + register"""
+    present = values.notna().to_numpy()
+    keys, values = keys[present], values[present]
+
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+    register = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.uint16)
+    remainder = hashes & np.uint64((1 << (64 - HLL_PRECISION)) - 1)
+    # frexp's exponent is the bit length; rank is the position of the first set bit
+    _, bit_length = np.frexp(remainder.astype(np.float64))
+    rank = (64 - HLL_PRECISION - bit_length + 1).astype(np.uint8)
+
+    frame = keys.assign(__register=register, __rank=rank)
+    return frame.groupby(list(keys.columns) + ["__register"], observed=True, sort=False)["__rank"].max()
+
+
+def _merge_hll(sparse_parts: List[pd.Series], dense_parts: List[pd.DataFrame], nkeys: int):
+    """Merge sparse and dense register sets, moving groups that outgrew the sparse form to dense rows"""
+    sparse = pd.concat(sparse_parts) if len(sparse_parts) > 1 else sparse_parts[0]
+    if sparse.index.has_duplicates:
+        sparse = sparse.groupby(level=_key_levels(nkeys + 1), observed=True, sort=False).max()
+
+    dense = None
+    if dense_parts:
+        dense = pd.concat(dense_parts) if len(dense_parts) > 1 else dense_parts[0]
+        if dense.index.has_duplicates:
+            dense = dense.groupby(level=_key_levels(nkeys), observed=True, sort=False).max()
+
+    if not len(sparse):
+        return sparse, dense
+
+    keys = sparse.index.droplevel(-1)
+    sizes = sparse.groupby(level=_key_levels(nkeys), observed=True, sort=False).transform("size").to_numpy()
+    moving = sizes > HLL_SPARSE_MAX
+    if dense is not None:
+        moving |= keys.isin(dense.index)
+
+    if moving.any():
+        codes, groups = keys[moving].factorize()
+        registers = np.zeros((len(groups), HLL_REGISTERS), dtype=np.uint8)
+        # Each (group, register) occurs once after the max above
+        registers[codes, sparse.index.get_level_values(-1)[moving].to_numpy(dtype=np.intp)] = sparse.to_numpy()[moving]
+
+        promoted = pd.DataFrame(registers, index=groups)
+        dense = promoted if dense is None else pd.concat([dense, promoted])
+        if dense.index.has_duplicates:
+            dense = dense.groupby(level=_key_levels(nkeys), observed=True, sort=False).max()
+        sparse = sparse[~moving]
+
+    return sparse, dense
+
+
+def _hll_formula(harmonic: np.ndarray, zeros: np.ndarray) -> np.ndarray:
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / harmonic
+    # Small-range correction (linear counting)
+    small = (estimate <= 2.5 * m) & (zeros > 0)
+    estimate[small] = m * np.log(m / zeros[small])
+    return np.round(estimate).astype(np.int64)
+
+
+def _hll_estimate(sparse: Optional[pd.Series], dense: Optional[pd.DataFrame], nkeys: int) -> pd.Series:
+    """Distinct count estimates per group (about 1.6% standard error)"""
+    estimates = []
+
+    if sparse is not None and len(sparse):
+        inverse = pd.Series(_INVERSE_POWERS[sparse.to_numpy()], index=sparse.index)
+        grouped = inverse.groupby(level=_key_levels(nkeys), observed=True, sort=False)
+        harmonic, present = grouped.sum(), grouped.size()
+        zeros = (HLL_REGISTERS - present).to_numpy(dtype=np.float64)
+        # Every register a group hasn't set contributes 2^0
+        estimates.append(pd.Series(_hll_formula(harmonic.to_numpy() + zeros, zeros), index=harmonic.index))
+
+    if dense is not None and len(dense):
+        registers = dense.to_numpy()
+        values = np.empty(len(registers), dtype=np.int64)
+        for start in range(0, len(registers), _ESTIMATE_CHUNK):
+            chunk = registers[start:start + _ESTIMATE_CHUNK]
+            harmonic = _INVERSE_POWERS[chunk].sum(axis=1)
+            zeros = np.count_nonzero(chunk == 0, axis=1).astype(np.float64)
+            values[start:start + len(chunk)] = _hll_formula(harmonic, zeros)
+        estimates.append(pd.Series(values, index=dense.index))
+
+    if not estimates:
+        return pd.Series(dtype=np.int64)
+    return pd.concat(estimates) if len(estimates) > 1 else estimates[0]
+
+
+def _quantile_partial(keys: pd.DataFrame, values: pd.Series) -> pd.DataFrame:
+    """One (value, weight) point per non-null value, compressed per group"""
+    numeric = pd.to_numeric(values)
+    present = numeric.notna().to_numpy()
+    points = _with_key_index(keys[present], {
+        "__value": numeric[present].to_numpy(dtype=np.float64),
+        "__weight": np.ones(int(present.sum())),
+    })
+    return _compress_quantiles(points)
+
+
+def _compress_quantiles(points: pd.DataFrame, size: int = QUANTILE_SKETCH_SIZE) -> pd.DataFrame:
+    """
+    Reduce each group with more than ``size`` points to ``size`` points of
+    equal weight at evenly spaced ranks, preserving its quantiles
+    """
+    if not len(points):
+        return points
+
+    codes, groups = points.index.factorize()
+    counts = np.bincount(codes, minlength=len(groups))
+    if counts.max() <= size:
+        return points
+
+    values = points["__value"].to_numpy()
+    weights = points["__weight"].to_numpy()
+    order = np.lexsort((values, codes))
+    codes, values, weights = codes[order], values[order], weights[order]
+    counts, starts, ends = _group_layout(codes, len(groups))
+
+    cumulative = np.cumsum(weights)
+    before = cumulative[starts] - weights[starts]
+    totals = cumulative[ends - 1] - before
+
+    large = np.flatnonzero(counts > size)
+    step = totals[large] / size
+    targets = before[large, None] + (np.arange(size) + 0.5)[None, :] * step[:, None]
+    picks = np.searchsorted(cumulative, targets.ravel())
+    # Rounding in the running sum must not pick a neighbouring group's point
+    picks = np.clip(picks, np.repeat(starts[large], size), np.repeat(ends[large] - 1, size))
+
+    kept = counts[codes] <= size
+    new_codes = np.concatenate([codes[kept], np.repeat(large, size)])
+    compressed = pd.DataFrame({
+        "__value": np.concatenate([values[kept], values[picks]]),
+        "__weight": np.concatenate([weights[kept], np.repeat(step, size)]),
+    }, index=groups.take(new_codes))
+    return compressed
+
+
+def _quantile_estimate(points: Optional[pd.DataFrame], q: float) -> pd.Series:
+    """The value at quantile ``q`` of each group's points"""
+    if points is None or not len(points):
+        return pd.Series(dtype=np.float64)
+
+    codes, groups = points.index.factorize()
+    values = points["__value"].to_numpy()
+    weights = points["__weight"].to_numpy()
+    order = np.lexsort((values, codes))
+    codes, values, weights = codes[order], values[order], weights[order]
+    _, starts, ends = _group_layout(codes, len(groups))
+
+    cumulative = np.cumsum(weights)
+    before = cumulative[starts] - weights[starts]
+    totals = cumulative[ends - 1] - before
+    positions = np.clip(np.searchsorted(cumulative, before + q * totals), starts, ends - 1)
+    return pd.Series(values[positions], index=groups)
+
+
+# Aggregator
+
+def _nbytes(table) -> int:
+    usage = table.memory_usage(index=True, deep=True)
+    return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+
+
+class StreamingAggregator:
+    """Incrementally aggregate DataFrame batches in bounded memory"""
+
+    def __init__(
+        self,
+        group_by: List[str],
+        aggregations: Dict[str, str],
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        spill_partitions: int = 16,
+        spill_dir: Optional[str] = None
+    ):
+        if not is_streamable(aggregations):
+            unsupported = [func for func in aggregations.values() if not is_streamable({"_": func})]
+            raise ValueError(f"Unsupported streaming aggregations: {unsupported}")
+
+        self.group_by = list(group_by)
+        self.aggregations = dict(aggregations)
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_partitions = spill_partitions
+        self.spill_dir = spill_dir
+
+        # Table name -> frame: "native" for the sum/count/min/max partials,
+        # "<column>__hll", "<column>__dense" and "<column>__sketch" for sketches
+        self._state: Optional[Dict[str, pd.DataFrame]] = None
+        self._pending: List[Dict[str, pd.DataFrame]] = []
+        self._pending_rows = 0
+        self._spill_path: Optional[str] = None
+        self.rows_seen = 0
+        self.spills = 0
+
+    # Partial aggregation
+
+    def _partial(self, batch: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        grouped = batch.groupby(self.group_by, observed=True, sort=False)
+        native = {}
+        for column, func in self.aggregations.items():
+            if func in ("sum", "mean"):
+                native[f"{column}__sum"] = (column, "sum")
+            if func in ("count", "mean"):
+                native[f"{column}__count"] = (column, "count")
+            if func in ("min", "max"):
+                native[f"{column}__{func}"] = (column, func)
+
+        tables = {"native": grouped.agg(**native) if native else grouped.size().to_frame("__rows")[[]]}
+
+        # Rows with a null key belong to no group, as in groupby
+        keys = batch[self.group_by]
+        keyed = keys.notna().all(axis=1).to_numpy()
+        keys = keys[keyed]
+        for column, func in self.aggregations.items():
+            if func in DISTINCT_FUNCTIONS:
+                tables[f"{column}__hll"] = _hll_partial(keys, batch[column][keyed])
+            elif _approx_quantile_of(func) is not None:
+                tables[f"{column}__sketch"] = _quantile_partial(keys, batch[column][keyed])
+
+        return tables
+
+    def _merge(self, parts: List[Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+        nkeys = len(self.group_by)
+        merged = {"native": self._merge_native([part["native"] for part in parts])}
+
+        for column, func in self.aggregations.items():
+            if func in DISTINCT_FUNCTIONS:
+                sparse, dense = _merge_hll(
+                    [part[f"{column}__hll"] for part in parts],
+                    [part[f"{column}__dense"] for part in parts if part.get(f"{column}__dense") is not None],
+                    nkeys
+                )
+                merged[f"{column}__hll"] = sparse
+                if dense is not None:
+                    merged[f"{column}__dense"] = dense
+            elif _approx_quantile_of(func) is not None:
+                merged[f"{column}__sketch"] = _compress_quantiles(pd.concat([part[f"{column}__sketch"] for part in parts]))
+
+        return merged
+
+    def _merge_native(self, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        combined = pd.concat(frames)
+        if not combined.index.has_duplicates:
+            return combined
+
+        grouped = combined.groupby(level=_key_levels(combined.index.nlevels), observed=True, sort=False)
+        reducers = {}
+        for name in combined.columns:
+            suffix = name.rsplit("__", 1)[1]
+            reducers[name] = "sum" if suffix in ("sum", "count") else suffix
+
+        if not reducers:
+            return grouped.size().to_frame("__rows")[[]]
+        return grouped.agg(reducers)
+
+    def update(self, batch: pd.DataFrame):
+        """Fold one batch into the running state"""
+        if batch.empty:
+            return
+        self.rows_seen += len(batch)
+
+        partial = self._partial(batch)
+        self._pending.append(partial)
+        self._pending_rows += sum(len(table) for table in partial.values())
+
+        # Amortize merges: only fold pending partials once they rival the state in size
+        state_rows = sum(len(table) for table in self._state.values()) if self._state is not None else 0
+        if self._pending_rows >= max(state_rows, 50000):
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        parts = ([self._state] if self._state is not None else []) + self._pending
+        self._state = self._merge(parts)
+        self._pending = []
+        self._pending_rows = 0
+
+        if self.memory_bytes() > self.max_memory_bytes:
+            self._spill()
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the merged state"""
+        if self._state is None:
+            return 0
+        return sum(_nbytes(table) for table in self._state.values())
+
+    # Spilling
+
+    def _partition_of(self, index: pd.Index) -> np.ndarray:
+        keys = index.to_frame(index=False)
+        return (pd.util.hash_pandas_object(keys, index=False).to_numpy() % np.uint64(self.spill_partitions)).astype(np.int64)
+
+    def _spill(self):
+        if self._spill_path is None:
+            self._spill_path = tempfile.mkdtemp(prefix="aggregate-spill-", dir=self.spill_dir)
+
+        # Every table is partitioned by group key alone, so a group's rows all land together
+        partitions = {}
+        for name, table in self._state.items():
+            keys = table.index.droplevel(-1) if name.endswith("__hll") else table.index
+            partitions[name] = self._partition_of(keys)
+
+        size = self.memory_bytes()
+        for partition in range(self.spill_partitions):
+            part = {name: table[partitions[name] == partition] for name, table in self._state.items()}
+            if len(part["native"]):
+                with open(os.path.join(self._spill_path, f"part-{partition:04d}.pkl"), "ab") as f:
+                    pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.spills += 1
+        logger.info(
+            f"Spilled {len(self._state['native'])} aggregate groups ({size / 1048576:.1f} MiB) "
+            f"to {self._spill_path} (spill {self.spills})"
+        )
+        self._state = None
+
+    def _spilled_partitions(self):
+        for partition in range(self.spill_partitions):
+            path = os.path.join(self._spill_path, f"part-{partition:04d}.pkl")
+            if not os.path.exists(path):
+                continue
+
+            parts = []
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        parts.append(pickle.load(f))
+                    except EOFError:
+                        break
+            yield self._merge(parts)
+
+    # Results
+
+    def _finalize(self, state: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        native = state["native"]
+        nkeys = len(self.group_by)
+        result = pd.DataFrame(index=native.index)
+
+        for column, func in self.aggregations.items():
+            if func == "mean":
+                result[column] = native[f"{column}__sum"] / native[f"{column}__count"].replace(0, np.nan)
+            elif func in NATIVE_FUNCTIONS:
+                result[column] = native[f"{column}__{func}"]
+            elif func in DISTINCT_FUNCTIONS:
+                estimates = _hll_estimate(state[f"{column}__hll"], state.get(f"{column}__dense"), nkeys)
+                # Groups whose values were all null have no registers set
+                result[column] = estimates.reindex(native.index, fill_value=0).to_numpy() if len(estimates) else 0
+            else:
+                q = _approx_quantile_of(func)
+                estimates = _quantile_estimate(state[f"{column}__sketch"], q)
+                result[column] = estimates.reindex(native.index).to_numpy() if len(estimates) else np.nan
+
+        return result
+
+    def result(self) -> pd.DataFrame:
+        """Merge all partial state and return the aggregated DataFrame"""
+        self._flush_pending()
+
+        try:
+            if self._spill_path is None:
+                if self._state is None:
+                    return pd.DataFrame(columns=self.group_by + list(self.aggregations))
+                finalized = [self._finalize(self._state)]
+            else:
+                if self._state is not None:
+                    self._spill()
+                finalized = [self._finalize(state) for state in self._spilled_partitions()]
+
+            return pd.concat(finalized).sort_index().reset_index()
+        finally:
+            self.close()
+
+    def close(self):
+        """Remove any spill files"""
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+        self._state = None
+        self._pending = []
+
+
+def aggregate(batches: Iterable[pd.DataFrame], group_by: List[str], aggregations: Dict[str, str], **options) -> pd.DataFrame:
+    """Aggregate an iterable of batches with a StreamingAggregator"""
+    aggregator = StreamingAggregator(group_by, aggregations, **options)
+    try:
+        for batch in batches:
+            aggregator.update(batch)
+        return aggregator.result()
+    finally:
+        aggregator.close()
+
+
+def aggregate_frame(df: pd.DataFrame, group_by: List[str], aggregations: Dict[str, str]) -> pd.DataFrame:
+    """
+    Aggregate an in-memory DataFrame. Exact functions go to pandas and the
+    ``approx_*`` ones to the same sketches as streamed sources, so a
+    function gives the same answer whatever the source type.
+    """
+    approximate = {column: func for column, func in aggregations.items() if func.startswith("approx_")}
+    exact = {column: func for column, func in aggregations.items() if column not in approximate}
+
+    # observed=True: categorical keys would otherwise yield every combination of categories
+    grouped = df.groupby(group_by, observed=True)
+    columns = {}
+    for column, func in exact.items():
+        q = _quantile_of(func)
+        columns[column] = grouped[column].quantile(q) if q is not None and func != "median" else grouped[column].agg(func)
+
+    if approximate:
+        sketched = aggregate([df], group_by, approximate).set_index(group_by)
+        for column in approximate:
+            columns[column] = sketched[column]
+
+    result = pd.DataFrame(columns) if columns else grouped.size().to_frame("__rows")[[]]
+    return result[list(aggregations)].reset_index()
@@ -2,25 +2,31 @@ import datetime
 import logging
 import uuid
 import asyncio
-import aiohttp
 import os
-from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
-from azure.storage.blob import ContentSettings
-from azure.identity import DefaultAzureCredential
-from azure.eventhub.aio import EventHubProducerClient as AsyncEventHubProducerClient
-from azure.data.tables.aio import TableServiceClient as AsyncTableServiceClient
-from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
+import json
 from config.settings import settings
-from typing import Dict, Any, Optional, List
+from typing import Awaitable, Callable, Dict, Any, Optional, List, TypeVar
+from app.core.resilience import get_breaker, retry_async
+from config.logging_config import log_context
+
+# The Azure SDKs are imported where they are used: together they take longer
+# to import than the rest of the service, and most replicas only touch some of them.
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Append blob blocks are limited to 4 MiB
+APPEND_BLOCK_BYTES = 4 * 1024 * 1024
+
 class AzureClient:
     """Client for interacting with various Azure services"""
     
     def __init__(self):
         
-        self.credential = DefaultAzureCredential()
+        self._credential = None
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
         
         
         self.blob_connection_string = settings.AZURE_BLOB_CONNECTION_STRING
@@ -31,21 +37,70 @@ class AzureClient:
         
         
         self.jobs_table_name = "datapipelinejobs"
-        self._init_job_tracking()
+    
+    @property
+    def credential(self):
+        """Default Azure credential, created on first use"""
+        if self._credential is None:
+            from azure.identity.aio import DefaultAzureCredential
+            self._credential = DefaultAzureCredential()
+        return self._credential
+    
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+    
+    async def initialize(self):
+        """Create the job tracking table; cheap once done and safe to call concurrently"""
+        if self._initialized:
+            return
         
-        logger.info("Azure client initialized")
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await self._init_job_tracking()
+            self._initialized = True
+            logger.info("Azure client initialized")
+    
+    def _blob_service(self):
+        """A Blob service client, used as an async context manager for one operation"""
+        from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+        return AsyncBlobServiceClient.from_connection_string(self.blob_connection_string)
     
-    def _init_job_tracking(self):
+    def _event_hub_producer(self, event_hub_name: str):
+        """An Event Hub producer, used as an async context manager for one operation"""
+        from azure.eventhub.aio import EventHubProducerClient as AsyncEventHubProducerClient
+        return AsyncEventHubProducerClient.from_connection_string(
+            self.eventhub_connection_string,
+            eventhub_name=event_hub_name
+        )
+    
+    def _table_service(self):
+        """A Table service client, used as an async context manager for one operation"""
+        from azure.data.tables.aio import TableServiceClient as AsyncTableServiceClient
+        return AsyncTableServiceClient.from_connection_string(self.table_connection_string)
+    
+    async def _init_job_tracking(self):
         """Initialize the table for tracking jobs"""
-        try:
-            table_service = TableServiceClient.from_connection_string(self.table_connection_string)
+        from azure.core.exceptions import ResourceExistsError
+        
+        async with self._table_service() as table_service:
             try:
-                table_service.create_table(self.jobs_table_name)
+                await table_service.create_table(self.jobs_table_name)
                 logger.info(f"Created job tracking table {self.jobs_table_name}")
-            except Exception:
+            except ResourceExistsError:
                 logger.info(f"Using existing job tracking table {self.jobs_table_name}")
-        except Exception as e:
-            logger.error(f"Failed to initialize job tracking: {str(e)}")
+    
+    async def _with_retry(self, endpoint: str, operation: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run an Azure call with backoff, behind the circuit breaker for ``endpoint``"""
+        return await retry_async(
+            func,
+            name=f"{operation} ({endpoint})",
+            attempts=settings.SINK_MAX_RETRIES + 1,
+            base_delay=settings.SINK_RETRY_BACKOFF,
+            max_delay=settings.RETRY_MAX_DELAY,
+            breaker=get_breaker(endpoint)
+        )
     
     def generate_job_id(self) -> str:
         """Generate a unique job ID"""
@@ -53,6 +108,10 @@ class AzureClient:
 
     async def upload_file(self, job_id: str, file_contents: bytes, filename: str, content_type: str, destination: str):
         """Upload a file to Azure Blob Storage"""
+        with log_context(job_id=job_id):
+            return await self._upload_file(job_id, file_contents, filename, content_type, destination)
+
+    async def _upload_file(self, job_id: str, file_contents: bytes, filename: str, content_type: str, destination: str):
         try:
             await self.update_job_status(job_id, "uploading")
 
@@ -61,16 +120,7 @@ class AzureClient:
             container_name = parts[0]
             blob_path = parts[1] if len(parts) > 1 else filename
 
-            async with AsyncBlobServiceClient.from_connection_string(self.blob_connection_string) as blob_service_client:
-                container_client = blob_service_client.get_container_client(container_name)
-                blob_client = container_client.get_blob_client(blob_path)
-
-                
-                await blob_client.upload_blob(
-                    file_contents,
-                    overwrite=True,
-                    content_settings=ContentSettings(content_type=content_type or "application/octet-stream")
-                )
+            await self.upload_blob(container_name, blob_path, file_contents, content_type)
 
             logger.info(f"File {filename} uploaded to {destination}")
             await self.update_job_status(job_id, "completed", {
@@ -86,15 +136,140 @@ class AzureClient:
             await self.update_job_status(job_id, "failed", {"error": str(e)})
             return False
 
+    async def upload_blob(self, container_name: str, blob_path: str, data: bytes, content_type: Optional[str] = None):
+        """Write bytes to a blob without touching job state; retries transient errors, raises on failure"""
+        from azure.storage.blob import ContentSettings
+        
+        async def upload():
+            async with self._blob_service() as blob_service_client:
+                container_client = blob_service_client.get_container_client(container_name)
+                blob_client = container_client.get_blob_client(blob_path)
+                
+                await blob_client.upload_blob(
+                    data,
+                    overwrite=True,
+                    content_settings=ContentSettings(content_type=content_type or "application/octet-stream")
+                )
+        
+        # overwrite=True makes a repeated upload of the same blob harmless
+        await self._with_retry(f"blob:{container_name}", f"Upload to {blob_path}", upload)
+        
+        logger.debug(f"Uploaded {len(data)} bytes to {container_name}/{blob_path}")
+        return True
+
+    async def delete_prefix(self, container_name: str, prefix: str) -> int:
+        """
+        Delete every blob whose name starts with ``prefix``; retries transient
+        errors, raises on failure. Returns the number of blobs deleted.
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        
+        deleted = 0
+        
+        async def delete():
+            nonlocal deleted
+            async with self._blob_service() as blob_service_client:
+                container_client = blob_service_client.get_container_client(container_name)
+                try:
+                    async for blob in container_client.list_blobs(name_starts_with=prefix):
+                        try:
+                            await container_client.delete_blob(blob.name, delete_snapshots="include")
+                            deleted += 1
+                        except ResourceNotFoundError:
+                            pass
+                except ResourceNotFoundError:
+                    # No container, so nothing to delete
+                    pass
+        
+        # A retry lists again and only finds what is left
+        await self._with_retry(f"blob:{container_name}", f"Delete of {prefix}*", delete)
+        
+        logger.debug(f"Deleted {deleted} blobs under {container_name}/{prefix}")
+        return deleted
+
+    async def append_to_blob(self, container_name: str, blob_path: str, data: bytes, content_type: Optional[str] = None):
+        """
+        Append newline-delimited data to an append blob, creating it if needed;
+        retries transient errors, raises on failure. Blocks are cut at line
+        boundaries so concurrent appenders never interleave within a line, and
+        a retried block may be appended twice.
+        """
+        from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+        from azure.storage.blob import ContentSettings
+        
+        blocks = []
+        start = 0
+        while start < len(data):
+            end = start + APPEND_BLOCK_BYTES
+            if end < len(data):
+                newline = data.rfind(b"\n", start, end)
+                end = newline + 1 if newline >= start else end
+            blocks.append(data[start:end])
+            start = end
+        
+        async def append():
+            async with self._blob_service() as blob_service_client:
+                blob_client = blob_service_client.get_blob_client(container_name, blob_path)
+                while blocks:
+                    block = blocks[0]
+                    try:
+                        await blob_client.append_block(block)
+                    except ResourceNotFoundError:
+                        try:
+                            # if_none_match keeps a racing worker from truncating a blob another just created
+                            await blob_client.create_append_blob(
+                                content_settings=ContentSettings(content_type=content_type or "application/x-ndjson"),
+                                if_none_match="*"
+                            )
+                        except (ResourceExistsError, ResourceModifiedError):
+                            pass
+                        await blob_client.append_block(block)
+                    # A retry resumes at the block that failed
+                    blocks.pop(0)
+        
+        await self._with_retry(f"blob:{container_name}", f"Append to {blob_path}", append)
+        
+        logger.debug(f"Appended {len(data)} bytes to {container_name}/{blob_path}")
+        return True
+
+    async def send_to_event_hub(self, event_hub_name: str, records: List[Dict[str, Any]]):
+        """
+        Send records to an Event Hub in size-bounded batches; retries transient
+        errors, raises on failure. A retry resends the whole call, so delivery
+        is at least once.
+        """
+        from azure.eventhub import EventData
+        
+        # Serialization is CPU bound; keep it off the event loop
+        bodies = await asyncio.to_thread(lambda: [json.dumps(record, default=str) for record in records])
+        
+        async def send():
+            async with self._event_hub_producer(event_hub_name) as producer:
+                batch = await producer.create_batch()
+                for body in bodies:
+                    event = EventData(body)
+                    try:
+                        batch.add(event)
+                    except ValueError:
+                        # Batch is full, ship it and start a new one
+                        await producer.send_batch(batch)
+                        batch = await producer.create_batch()
+                        batch.add(event)
+                
+                if len(batch) > 0:
+                    await producer.send_batch(batch)
+        
+        await self._with_retry(f"eventhub:{event_hub_name}", f"Send of {len(records)} events", send)
+        
+        logger.debug(f"Sent {len(records)} events to Event Hub {event_hub_name}")
+        return True
+
     async def update_job_status(self, job_id: str, status: str, details: Optional[Dict[str, Any]] = None):
         """Update the status of a job in Azure Table Storage"""
         try:
-            async with AsyncTableServiceClient.from_connection_string(self.table_connection_string) as table_service:
+            async with self._table_service() as table_service:
                 table_client = table_service.get_table_client(self.jobs_table_name)
                 
-                
-                import json
-                
                 entity = {
                     "PartitionKey": "job",
                     "RowKey": job_id,
@@ -104,7 +279,7 @@ class AzureClient:
                 }
                 
                 await table_client.upsert_entity(entity)
-                logger.info(f"Updated job {job_id} status to {status}")
+                logger.debug(f"Updated job {job_id} status to {status}")
                 return True
                 
         except Exception as e:
@@ -114,12 +289,11 @@ class AzureClient:
     async def get_job_status(self, job_id: str):
         """Get the status of a job from Azure Table Storage"""
         try:
-            async with AsyncTableServiceClient.from_connection_string(self.table_connection_string) as table_service:
+            async with self._table_service() as table_service:
                 table_client = table_service.get_table_client(self.jobs_table_name)
                 
                 entity = await table_client.get_entity("job", job_id)
                 
-                import json
                 details = json.loads(entity.get("Details", "{}")) if entity.get("Details") else {}
                 
                 return {
@@ -140,7 +314,7 @@ class AzureClient:
         if not job_info:
             return False
             
-        if job_info["status"] in ["completed", "failed", "cancelled"]:
+        if job_info["status"] in ["completed", "completed_with_errors", "failed", "cancelled"]:
             logger.info(f"Job {job_id} already in final state: {job_info['status']}")
             return False
         
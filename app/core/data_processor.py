@@ -2,24 +2,30 @@ import logging
 import asyncio
 import pandas as pd
 import json
-import aiohttp
 import tempfile
 import os
+from urllib.parse import quote, urlparse
 from io import StringIO, BytesIO
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 from app.core.azure_client import AzureClient
+from app.core.aggregation import StreamingAggregator, aggregate_frame, is_streamable
+from app.core.expressions import apply_filter, apply_assignments
+from app.core.job_registry import JobCheckpoints, get_job_registry
+from app.core.resilience import TRANSIENT_STATUSES, TransientError, get_breaker, retry_async, track_retries
+from app.core.schema_cache import read_with_schema, load_schema, invalidate_schema, csv_read_options, source_key
 from app.schemas.models import DataSourceConfig, ProcessingStatus
 from config.settings import settings
-from sqlalchemy.ext.asyncio import create_async_engine
-import pandas as pd
-from fastapi import UploadFile
 import shutil
 
 logger = logging.getLogger(__name__)
 
 async def process_data(job_id: str, config: DataSourceConfig, azure_client: AzureClient):
     """
-    Process data from source and upload to Azure
+    Process data from source and upload to Azure.
+
+    The source is read and transformed once; the result is then written to
+    every configured destination concurrently. When a previous attempt of
+    the job failed, its staged data and committed batches are reused.
     """
     try:
         
@@ -28,40 +34,57 @@ async def process_data(job_id: str, config: DataSourceConfig, azure_client: Azur
             "destination": config.destination
         })
         
+        checkpoints = await JobCheckpoints.load(job_id)
+        data = await checkpoints.load_data()
         
-        data = await fetch_data(config)
-        if not data:
-            await azure_client.update_job_status(job_id, "failed", {"error": "Failed to fetch data from source"})
-            return False
-        
+        if data is not None:
+            logger.info(f"Job {job_id}: resuming from staged data, {len(checkpoints)} batches already committed")
+        elif streaming_aggregate_index(config) is not None:
+            # Aggregations over file sources never hold the whole source in memory
+            data = await stream_aggregate(job_id, config)
+        else:
+            data = await fetch_data(config)
+            if data is None or (isinstance(data, list) and not data):
+                await azure_client.update_job_status(job_id, "failed", {"error": "Failed to fetch data from source"})
+                return False
+            
+            
+            if config.transformations:
+                data = await transform_data(data, config.transformations)
         
-        if config.transformations:
-            data = await transform_data(data, config.transformations)
         
+        destinations = config.destinations
+        results = await asyncio.gather(*[
+            write_to_sink(azure_client, job_id, data, destination, config, checkpoints)
+            for destination in destinations
+        ])
+        sinks = dict(zip(destinations, results))
         
-        if config.destination.startswith("blob:"):
-            
-            container_path = config.destination[5:]  
-            success = await upload_to_blob(azure_client, job_id, data, container_path, config.file_format)
         
-        elif config.destination.startswith("eventhub:"):
-            
-            event_hub_name = config.destination[9:]  
-            success = await azure_client.send_to_event_hub(event_hub_name, data)
+        succeeded = [destination for destination, result in sinks.items() if result["status"] == "completed"]
+        details = {
+            "records_processed": len(data),
+            "destination": config.destination,
+            "sinks": sinks
+        }
         
-        else:
-            await azure_client.update_job_status(job_id, "failed", {"error": f"Unsupported destination: {config.destination}"})
-            return False
+        if len(succeeded) == len(destinations):
+            await checkpoints.clear()
+            await azure_client.update_job_status(job_id, "completed", details)
+            return True
         
+        try:
+            # Keep what was read and written so a retry only redoes the missing batches
+            await checkpoints.save(data)
+        except Exception as e:
+            logger.warning(f"Job {job_id}: failed to save checkpoints, a retry will start over: {str(e)}")
         
-        if success:
-            await azure_client.update_job_status(job_id, "completed", {
-                "records_processed": len(data) if isinstance(data, list) else "unknown",
-                "destination": config.destination
-            })
-            return True
+        if succeeded:
+            await azure_client.update_job_status(job_id, "completed_with_errors", details)
+            return False
         else:
-            await azure_client.update_job_status(job_id, "failed", {"error": "Failed to send data to destination"})
+            details["error"] = "Failed to send data to destination"
+            await azure_client.update_job_status(job_id, "failed", details)
             return False
             
     except Exception as e:
@@ -69,6 +92,61 @@ async def process_data(job_id: str, config: DataSourceConfig, azure_client: Azur
         await azure_client.update_job_status(job_id, "failed", {"error": str(e)})
         return False
 
+async def write_to_sink(azure_client: AzureClient, job_id: str, data: Union[List[Dict[str, Any]], pd.DataFrame], destination: str, config: DataSourceConfig, checkpoints: Optional[JobCheckpoints] = None) -> Dict[str, Any]:
+    """
+    Write data to a single destination.
+
+    Each Azure call is retried with backoff by the client; ``attempts`` in
+    the result is the most any one call needed. Batches recorded in
+    ``checkpoints`` by an earlier attempt of the job are skipped, and the
+    ones written now are added to it. Never raises; the outcome is returned
+    as a status dict for the job details.
+    """
+    if checkpoints is None:
+        checkpoints = JobCheckpoints(job_id)
+    if destination in checkpoints:
+        return {"status": "completed", "resumed": True}
+    
+    with track_retries() as retries:
+        try:
+            if destination.startswith("blob:"):
+                
+                container_path = destination[5:]
+                if config.partition_by or config.rows_per_file:
+                    parts = await upload_partitioned_to_blob(
+                        azure_client, job_id, data, container_path, config.file_format,
+                        config.partition_by, config.rows_per_file, checkpoints, destination
+                    )
+                    result = {"status": "completed", "parts": parts}
+                else:
+                    await upload_to_blob(azure_client, job_id, data, container_path, config.file_format)
+                    result = {"status": "completed"}
+            
+            elif destination.startswith("eventhub:"):
+                
+                event_hub_name = destination[9:]
+                batches = await send_to_event_hub_in_batches(azure_client, data, event_hub_name, checkpoints, destination)
+                result = {"status": "completed", "batches": batches}
+            
+            else:
+                return {"status": "failed", "attempts": 0, "error": f"Unsupported destination: {destination}"}
+        
+        except Exception as e:
+            logger.error(f"Job {job_id}: write to {destination} failed after {retries.attempts} attempts: {str(e)}")
+            return {"status": "failed", "attempts": retries.attempts, "error": str(e)}
+    
+    result["attempts"] = retries.attempts
+    checkpoints.mark(destination)
+    return result
+
+async def run_ingest_job(job_id: str, payload: Dict[str, Any]) -> bool:
+    """
+    Job registry handler for jobs queued by the /ingest endpoint
+    """
+    from app.api.dependencies import get_azure_client
+    
+    return await process_data(job_id, DataSourceConfig(**payload), await get_azure_client())
+
 async def fetch_data(config: DataSourceConfig) -> Union[List[Dict[str, Any]], pd.DataFrame, None]:
     """
     Fetch data from the configured source
@@ -98,98 +176,167 @@ async def fetch_data(config: DataSourceConfig) -> Union[List[Dict[str, Any]], pd
         logger.error(f"Error fetching data: {str(e)}")
         return None
 
+def _endpoint(kind: str, url: str) -> str:
+    """
+    Circuit breaker name for a source URL; credentials in the URL are left out
+    """
+    parsed = urlparse(url)
+    if parsed.hostname:
+        return f"{kind}:{parsed.hostname}" + (f":{parsed.port}" if parsed.port else "")
+    return f"{kind}:{parsed.path or url}"
+
+async def _fetch_with_retry(endpoint: str, operation: str, func):
+    """
+    Run a source read with backoff, behind the circuit breaker for ``endpoint``
+    """
+    return await retry_async(
+        func,
+        name=f"{operation} ({endpoint})",
+        attempts=settings.SOURCE_MAX_RETRIES + 1,
+        base_delay=settings.SOURCE_RETRY_BACKOFF,
+        max_delay=settings.RETRY_MAX_DELAY,
+        breaker=get_breaker(endpoint)
+    )
+
+def _check_response(response, message: str):
+    """
+    Raise for a non-200 response, as TransientError when it is worth retrying
+    """
+    if response.status != 200:
+        if response.status in TRANSIENT_STATUSES:
+            raise TransientError(f"{message}: status {response.status}")
+        raise Exception(f"{message}: status {response.status}")
+
 async def fetch_from_api(url: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
-    Fetch data from an API endpoint
+    Fetch data from an API endpoint, retrying throttling and server errors
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status != 200:
-                raise Exception(f"API returned status code {response.status}")
-                
-            
-            data = await response.json()
-            
-            
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict) and "data" in data:
-                return data["data"] if isinstance(data["data"], list) else [data["data"]]
-            elif isinstance(data, dict) and "results" in data:
-                return data["results"] if isinstance(data["results"], list) else [data["results"]]
-            else:
-                return [data]
+    import aiohttp
+    
+    async def fetch():
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params=params) as response:
+                _check_response(response, "API request failed")
+                body = await response.read()
+        # Large responses take a while to parse; do it off the event loop
+        return await asyncio.to_thread(json.loads, body)
+    
+    data = await _fetch_with_retry(_endpoint("api", url), "API request", fetch)
+    
+    
+    if isinstance(data, list):
+        return data
+    elif isinstance(data, dict) and "data" in data:
+        return data["data"] if isinstance(data["data"], list) else [data["data"]]
+    elif isinstance(data, dict) and "results" in data:
+        return data["results"] if isinstance(data["results"], list) else [data["results"]]
+    else:
+        return [data]
 
 async def fetch_from_database(connection_string: str, query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
     """
-    Fetch data from a database
+    Fetch data from a database, retrying dropped connections and timeouts
     """
-        
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
     engine = create_async_engine(connection_string)
     
-    async with engine.connect() as conn:
-        result = await conn.execute(query, params or {})
-        rows = result.fetchall()
-        
-        # DataFrame
-        df = pd.DataFrame(rows, columns=result.keys())
-        return df
+    async def fetch():
+        async with engine.connect() as conn:
+            result = await conn.execute(query, params or {})
+            rows = result.fetchall()
+            
+            # DataFrame
+            return pd.DataFrame(rows, columns=result.keys())
+    
+    try:
+        return await _fetch_with_retry(_endpoint("database", connection_string), "Database query", fetch)
+    finally:
+        await engine.dispose()
 
 async def fetch_from_file(file_path: str, file_format: str) -> pd.DataFrame:
     """
-    Fetch data from a file
+    Fetch data from a file.
+
+    CSV and JSON sources are parsed with the schema cached from earlier runs
+    of the same feed (see app.core.schema_cache).
     """
+    file_format = getattr(file_format, "value", file_format).lower()
     
     if file_path.startswith(("http://", "https://")):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_path) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to download file: status {response.status}")
-                
-                content = await response.read()
-                
-                
-                if file_format.lower() == "csv":
-                    return pd.read_csv(BytesIO(content))
-                elif file_format.lower() == "json":
-                    return pd.read_json(BytesIO(content))
-                elif file_format.lower() == "parquet":
-                    return pd.read_parquet(BytesIO(content))
-                elif file_format.lower() == "excel":
-                    return pd.read_excel(BytesIO(content))
-                else:
-                    raise ValueError(f"Unsupported file format: {file_format}")
-    else:
+        import aiohttp
         
-        if file_format.lower() == "csv":
-            return pd.read_csv(file_path)
-        elif file_format.lower() == "json":
-            return pd.read_json(file_path)
-        elif file_format.lower() == "parquet":
-            return pd.read_parquet(file_path)
-        elif file_format.lower() == "excel":
-            return pd.read_excel(file_path)
-        else:
-            raise ValueError(f"Unsupported file format: {file_format}")
+        async def download():
+            async with aiohttp.ClientSession() as session:
+                async with session.get(file_path) as response:
+                    _check_response(response, "Failed to download file")
+                    return await response.read()
+        
+        content = await _fetch_with_retry(_endpoint("file", file_path), "File download", download)
+        
+        open_source = lambda: BytesIO(content)
+    else:
+        open_source = lambda: file_path
+    
+    if file_format == "csv":
+        reader = lambda **options: pd.read_csv(open_source(), **options)
+    elif file_format == "json":
+        reader = lambda **options: pd.read_json(open_source(), **options)
+    elif file_format == "parquet":
+        return await asyncio.to_thread(pd.read_parquet, open_source())
+    elif file_format == "excel":
+        return await asyncio.to_thread(pd.read_excel, open_source())
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    
+    return await asyncio.to_thread(read_with_schema, reader, file_path, file_format)
+
+def frame_from_records(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    DataFrame of a list of dicts. An integer field missing from some
+    records gets a nullable integer column rather than turning into floats.
+    """
+    df = pd.DataFrame(records)
+    for column in df.columns[(df.dtypes == "float64") & df.isna().any().values]:
+        values = [record.get(column) for record in records]
+        if all(isinstance(value, int) and not isinstance(value, bool) for value in values if value is not None):
+            df[column] = df[column].astype("Int64")
+    return df
+
+def records_from_frame(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Records of a DataFrame, leaving out the fields it holds as missing (NaN is not valid JSON)"""
+    return [
+        {key: value for key, value in record.items() if not (pd.api.types.is_scalar(value) and pd.isna(value))}
+        for record in df.to_dict(orient="records")
+    ]
 
 async def transform_data(data: Union[List[Dict[str, Any]], pd.DataFrame], transformations: List[Dict[str, Any]]) -> Union[List[Dict[str, Any]], pd.DataFrame]:
+    """
+    Apply transformations to the data in a worker thread; they are CPU bound
+    and would otherwise stall the event loop, and the job lease renewals on it
+    """
+    return await asyncio.to_thread(apply_transformations, data, transformations)
+
+def apply_transformations(data: Union[List[Dict[str, Any]], pd.DataFrame], transformations: List[Dict[str, Any]]) -> Union[List[Dict[str, Any]], pd.DataFrame]:
     """
     Apply transformations to the data
     """
     # Convert to DataFrame if it's a list of dicts
     if isinstance(data, list):
-        df = pd.DataFrame(data)
+        df = frame_from_records(data)
     else:
         df = data
     
     
     for transform in transformations:
+        if hasattr(transform, "dict"):
+            transform = transform.dict()
         transform_type = transform.get("type")
         
         if transform_type == "filter":
             
-            condition = transform.get("condition")
-            df = df.query(condition)
+            # Parsed once per condition and evaluated column-wise, unlike DataFrame.query
+            df = apply_filter(df, transform.get("condition"))
             
         elif transform_type == "select":
             
@@ -205,109 +352,319 @@ async def transform_data(data: Union[List[Dict[str, Any]], pd.DataFrame], transf
             
             group_by = transform.get("group_by", [])
             aggs = transform.get("aggregations", {})
-            df = df.groupby(group_by).agg(aggs).reset_index()
+            df = aggregate_frame(df, group_by, aggs)
             
         elif transform_type == "custom":
             
-            # needs finetunning for security
-            code = transform.get("code", "")
-            
-            locals_dict = {"df": df}
-            exec(code, {"pd": pd}, locals_dict)
-            df = locals_dict["df"]
+            # ``column = expression`` statements in the sandboxed expression language
+            df = apply_assignments(df, transform.get("code", ""))
     
     
     if isinstance(data, list):
-        return df.to_dict(orient="records")
+        return records_from_frame(df)
     
     return df
 
-async def upload_to_blob(azure_client: AzureClient, job_id: str, data: Union[List[Dict[str, Any]], pd.DataFrame], container_path: str, file_format: str) -> bool:
+def streaming_aggregate_index(config: DataSourceConfig) -> Optional[int]:
     """
-    Upload data to Azure Blob Storage
+    Index of the aggregate transformation to stream, if the job can stream one
     """
-    try:
-        
-        parts = container_path.strip('/').split('/', 1)
-        container_name = parts[0]
-        blob_path = parts[1] if len(parts) > 1 else f"data_{job_id}.{file_format}"
-        
+    file_format = getattr(config.file_format, "value", config.file_format)
+    if config.source_type != "file" or file_format not in ("csv", "json", "parquet"):
+        return None
+    
+    for index, transform in enumerate(config.transformations or []):
+        if transform.type == "aggregate":
+            return index if is_streamable(transform.aggregations or {}) else None
+    return None
+
+def iter_file_batches(file_path: str, file_format: str, batch_size: int, cache_key: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield a local file as DataFrames of at most ``batch_size`` rows.
+
+    CSV and Parquet are read incrementally (CSV with its cached schema, if
+    any); JSON is only streamed when it is newline-delimited.
+    """
+    if file_format == "csv":
+        cache_key = cache_key or file_path
+        schema = load_schema(cache_key, "csv") if settings.SCHEMA_CACHE_ENABLED else None
+        options = csv_read_options(schema) if schema else {}
+        try:
+            with pd.read_csv(file_path, chunksize=batch_size, **options) as reader:
+                yield from reader
+        except (ValueError, TypeError, OverflowError):
+            if schema:
+                # Batches already consumed can't be re-read; drop the schema so a retry succeeds
+                logger.warning(f"Schema drift detected for {source_key(cache_key)} while streaming, invalidating cached schema")
+                invalidate_schema(cache_key, "csv")
+            raise
+    
+    elif file_format == "parquet":
+        import pyarrow.parquet as pq
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_format}") as tmp:
-            
-            if isinstance(data, pd.DataFrame):
-                if file_format.lower() == "csv":
-                    data.to_csv(tmp.name, index=False)
-                elif file_format.lower() == "json":
-                    data.to_json(tmp.name, orient="records")
-                elif file_format.lower() == "parquet":
-                    data.to_parquet(tmp.name, index=False)
-                elif file_format.lower() == "excel":
-                    data.to_excel(tmp.name, index=False)
-                else:
-                    
-                    data.to_csv(tmp.name, index=False)
-                    file_format = "csv"
-            else:
+        for record_batch in pq.ParquetFile(file_path).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pandas()
+    
+    elif file_format == "json" and file_path.endswith((".jsonl", ".ndjson")):
+        with pd.read_json(file_path, lines=True, chunksize=batch_size) as reader:
+            yield from reader
+    
+    else:
+        df = pd.read_json(file_path) if file_format == "json" else pd.read_excel(file_path)
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
+
+async def download_to_tempfile(url: str, suffix: str = "") -> str:
+    """
+    Stream a remote file to a temporary local file and return its path
+    """
+    import aiohttp
+    
+    async def download():
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                _check_response(response, "Failed to download file")
                 
-                if file_format.lower() == "csv":
-                    pd.DataFrame(data).to_csv(tmp.name, index=False)
-                elif file_format.lower() == "json":
-                    with open(tmp.name, 'w') as f:
-                        json.dump(data, f)
-                elif file_format.lower() == "parquet":
-                    pd.DataFrame(data).to_parquet(tmp.name, index=False)
-                else:
-                    
-                    with open(tmp.name, 'w') as f:
-                        json.dump(data, f)
-                    file_format = "json"
-        
-        
-        
-        class TempUploadFile:
-            def __init__(self, path, filename, content_type):
-                self.path = path
-                self.filename = filename
-                self.content_type = content_type
-                self._file = open(path, "rb")
-            
-            async def read(self):
-                return self._file.read()
+                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+                    try:
+                        async for chunk in response.content.iter_chunked(1024 * 1024):
+                            tmp.write(chunk)
+                    except BaseException:
+                        tmp.close()
+                        os.unlink(tmp.name)
+                        raise
+                    return tmp.name
+    
+    return await _fetch_with_retry(_endpoint("file", url), "File download", download)
+
+async def stream_aggregate(job_id: str, config: DataSourceConfig) -> pd.DataFrame:
+    """
+    Read a file source batch by batch, applying the transformations before
+    the aggregate to each batch and folding it into a StreamingAggregator.
+    Transformations after the aggregate run on its (much smaller) result.
+    """
+    index = streaming_aggregate_index(config)
+    transformations = config.transformations
+    aggregate_step = transformations[index]
+    file_format = getattr(config.file_format, "value", config.file_format)
+    
+    file_path = config.source_url
+    downloaded = None
+    if file_path.startswith(("http://", "https://")):
+        suffix = os.path.splitext(file_path.split("?", 1)[0])[1]
+        downloaded = file_path = await download_to_tempfile(config.source_url, suffix)
+    
+    aggregator = StreamingAggregator(
+        aggregate_step.group_by or [],
+        aggregate_step.aggregations or {},
+        max_memory_bytes=settings.AGGREGATE_MAX_MEMORY_MB * 1024 * 1024,
+        spill_partitions=settings.AGGREGATE_SPILL_PARTITIONS,
+        spill_dir=settings.AGGREGATE_SPILL_DIR
+    )
+    
+    try:
+        batches = iter_file_batches(file_path, file_format, settings.STREAM_BATCH_SIZE, config.source_url)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
             
-            def close(self):
-                self._file.close()
+            if index:
+                batch = await transform_data(batch, transformations[:index])
+            await asyncio.to_thread(aggregator.update, batch)
         
+        logger.info(f"Job {job_id}: aggregated {aggregator.rows_seen} rows with {aggregator.spills} spills")
+        data = await asyncio.to_thread(aggregator.result)
+    finally:
+        aggregator.close()
+        if downloaded:
+            os.unlink(downloaded)
+    
+    if transformations[index + 1:]:
+        data = await transform_data(data, transformations[index + 1:])
+    return data
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "parquet": "application/octet-stream",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+def serialize_data(data: Union[List[Dict[str, Any]], pd.DataFrame], file_format: Optional[str]) -> Tuple[bytes, str]:
+    """
+    Serialize data to bytes in the requested format.
+
+    Returns the payload and the format actually used, which falls back to
+    csv for DataFrames and json for records when the format is unsupported.
+    """
+    file_format = (getattr(file_format, "value", file_format) or "json").lower()
+    buffer = BytesIO()
+    
+    if isinstance(data, pd.DataFrame):
+        if file_format == "csv":
+            data.to_csv(buffer, index=False)
+        elif file_format == "json":
+            data.to_json(buffer, orient="records")
+        elif file_format == "parquet":
+            data.to_parquet(buffer, index=False)
+        elif file_format == "excel":
+            data.to_excel(buffer, index=False)
+        else:
+            
+            data.to_csv(buffer, index=False)
+            file_format = "csv"
+    else:
         
-        content_types = {
-            "csv": "text/csv",
-            "json": "application/json",
-            "parquet": "application/octet-stream",
-            "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        }
-        
-        upload_file = TempUploadFile(
-            tmp.name,
-            os.path.basename(blob_path),
-            content_types.get(file_format.lower(), "application/octet-stream")
-        )
+        if file_format == "csv":
+            pd.DataFrame(data).to_csv(buffer, index=False)
+        elif file_format == "parquet":
+            pd.DataFrame(data).to_parquet(buffer, index=False)
+        else:
+            
+            buffer.write(json.dumps(data, default=str).encode("utf-8"))
+            file_format = "json"
+    
+    return buffer.getvalue(), file_format
+
+async def upload_to_blob(azure_client: AzureClient, job_id: str, data: Union[List[Dict[str, Any]], pd.DataFrame], container_path: str, file_format: Optional[str]) -> bool:
+    """
+    Upload data to Azure Blob Storage.
+
+    Raises on failure so the caller can decide whether to retry.
+    """
+    parts = container_path.strip('/').split('/', 1)
+    container_name = parts[0]
+    
+    # Serialization is CPU bound; keep it off the event loop so concurrent sinks keep moving
+    payload, file_format = await asyncio.to_thread(serialize_data, data, file_format)
+    blob_path = parts[1] if len(parts) > 1 else f"data_{job_id}.{file_format}"
+    
+    return await azure_client.upload_blob(
+        container_name,
+        blob_path,
+        payload,
+        CONTENT_TYPES.get(file_format, "application/octet-stream")
+    )
+
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+def _partition_segment(column: str, value: Any) -> str:
+    """
+    Render one Hive-style ``column=value`` path segment
+    """
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return f"{column}={HIVE_DEFAULT_PARTITION}"
+    return f"{column}={quote(str(value), safe='')}"
+
+def partition_frame(df: pd.DataFrame, partition_by: Optional[List[str]] = None, rows_per_file: Optional[int] = None) -> List[Tuple[str, pd.DataFrame]]:
+    """
+    Split a DataFrame into ``(relative_path, part)`` pairs.
+
+    Rows are grouped by the ``partition_by`` columns into ``col=value``
+    directories (the partition columns are dropped from the parts, as Hive
+    readers recover them from the path), and each group is further split
+    into parts of at most ``rows_per_file`` rows.
+    """
+    if partition_by:
+        missing = [column for column in partition_by if column not in df.columns]
+        if missing:
+            raise ValueError(f"Partition columns not found in data: {missing}")
         
+        groups = []
+        for key, group in df.groupby(partition_by, dropna=False, sort=False, observed=True):
+            key = key if isinstance(key, tuple) else (key,)
+            directory = "/".join(_partition_segment(column, value) for column, value in zip(partition_by, key))
+            groups.append((directory, group.drop(columns=partition_by)))
+    else:
+        groups = [("", df)]
+    
+    parts = []
+    for directory, group in groups:
+        if rows_per_file:
+            chunks = [group.iloc[i:i + rows_per_file] for i in range(0, len(group), rows_per_file)] or [group]
+        else:
+            chunks = [group]
         
-        success = await azure_client.upload_file(
-            job_id=job_id,
-            file=upload_file,
-            destination=f"{container_name}/{blob_path}"
-        )
+        for index, chunk in enumerate(chunks):
+            name = f"part-{index:04d}"
+            parts.append((f"{directory}/{name}" if directory else name, chunk))
+    
+    return parts
+
+async def upload_partitioned_to_blob(azure_client: AzureClient, job_id: str, data: Union[List[Dict[str, Any]], pd.DataFrame], container_path: str, file_format: Optional[str], partition_by: Optional[List[str]] = None, rows_per_file: Optional[int] = None, checkpoints: Optional[JobCheckpoints] = None, checkpoint_prefix: str = "") -> int:
+    """
+    Upload data as a partitioned dataset under ``container/prefix/``.
+
+    The dataset replaces whatever was under the prefix: blobs left by an
+    earlier run are deleted before the first part is written, so readers
+    never mix old partitions into the new data. Parts are serialized and
+    uploaded by concurrent writers, bounded by ``BLOB_UPLOAD_CONCURRENCY``.
+    Parts already in ``checkpoints`` are skipped. Returns the number of
+    parts in the dataset and raises if any part fails.
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    
+    parts = container_path.strip('/').split('/', 1)
+    container_name = parts[0]
+    prefix = parts[1].rstrip('/') if len(parts) > 1 else f"data_{job_id}"
+    
+    frames = await asyncio.to_thread(partition_frame, df, partition_by, rows_per_file)
+    
+    # A resumed attempt keeps the parts it already wrote
+    if checkpoints is None or not any(name.startswith(f"{checkpoint_prefix}/") for name in checkpoints.committed):
+        deleted = await azure_client.delete_prefix(container_name, f"{prefix}/")
+        if deleted:
+            logger.info(f"Job {job_id}: deleted {deleted} blobs of an earlier run under {container_name}/{prefix}")
+    
+    semaphore = asyncio.Semaphore(max(1, settings.BLOB_UPLOAD_CONCURRENCY))
+    
+    async def write_part(relative_path: str, frame: pd.DataFrame):
+        checkpoint = f"{checkpoint_prefix}/{relative_path}"
+        if checkpoints is not None and checkpoint in checkpoints:
+            return
         
+        async with semaphore:
+            payload, fmt = await asyncio.to_thread(serialize_data, frame, file_format)
+            await azure_client.upload_blob(
+                container_name,
+                f"{prefix}/{relative_path}.{fmt}",
+                payload,
+                CONTENT_TYPES.get(fmt, "application/octet-stream")
+            )
         
-        upload_file.close()
-        os.unlink(tmp.name)
+        if checkpoints is not None:
+            checkpoints.mark(checkpoint)
+    
+    await asyncio.gather(*[write_part(relative_path, frame) for relative_path, frame in frames])
+    
+    logger.info(f"Job {job_id}: wrote {len(frames)} parts to {container_name}/{prefix}")
+    return len(frames)
+
+async def send_to_event_hub_in_batches(azure_client: AzureClient, data: Union[List[Dict[str, Any]], pd.DataFrame], event_hub_name: str, checkpoints: Optional[JobCheckpoints] = None, checkpoint_prefix: str = "") -> int:
+    """
+    Send records to an Event Hub in batches of ``CHECKPOINT_BATCH_ROWS``,
+    skipping batches already in ``checkpoints``. Returns the number of
+    batches and raises if any batch fails.
+    """
+    if isinstance(data, pd.DataFrame):
+        records = await asyncio.to_thread(data.to_dict, orient="records")
+    else:
+        records = data
+    batch_rows = max(1, settings.CHECKPOINT_BATCH_ROWS)
+    starts = range(0, len(records), batch_rows)
+    
+    for index, start in enumerate(starts):
+        checkpoint = f"{checkpoint_prefix}#{index}"
+        if checkpoints is not None and checkpoint in checkpoints:
+            continue
         
-        return success
+        await azure_client.send_to_event_hub(event_hub_name, records[start:start + batch_rows])
         
-    except Exception as e:
-        logger.error(f"Error uploading to blob: {str(e)}")
-        return False
+        if checkpoints is not None:
+            checkpoints.mark(checkpoint)
+    
+    return len(starts)
 
 async def check_job_status(job_id: str) -> ProcessingStatus:
     """
@@ -315,11 +672,27 @@ async def check_job_status(job_id: str) -> ProcessingStatus:
     """
     from app.api.dependencies import get_azure_client
     
-    azure_client = get_azure_client()
+    azure_client = await get_azure_client()
     status = await azure_client.get_job_status(job_id)
     
+    if status and status["status"] in ("failed", "completed_with_errors"):
+        # The failed attempt may already be queued to run again
+        queued = await asyncio.to_thread(get_job_registry().get, job_id)
+        if queued and queued["status"] in ("pending", "running"):
+            status["status"] = "retrying"
+            status["details"]["attempts"] = queued["attempts"]
+    
     if not status:
-        raise Exception(f"Job {job_id} not found")
+        # Queued jobs have no Azure row until a worker starts them
+        queued = await asyncio.to_thread(get_job_registry().get, job_id)
+        if not queued:
+            raise Exception(f"Job {job_id} not found")
+        
+        status = {
+            "status": "queued" if queued["status"] == "pending" else queued["status"],
+            "last_updated": queued["updated_at"],
+            "details": {"attempts": queued["attempts"], "owner": queued["owner"]}
+        }
     
     return ProcessingStatus(
         job_id=job_id,
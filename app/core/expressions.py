@@ -0,0 +1,776 @@
+# app/core/expressions.py
+"""
+A small, sandboxed expression language for ``filter`` and ``custom`` transformations.
+
+Expressions are parsed once (and cached), validated against the column schema,
+and evaluated as whole-column pandas/NumPy operations. Nothing is ever passed
+to ``eval``/``exec``, so tenants can only reference columns, literals, the
+operators below and the functions in ``FUNCTIONS``.
+
+    value > 100 and startswith(lower(name), 'a')
+    region in ('emea', 'apac') or discount is not null
+    total = price * quantity; label = concat(upper(region), '-', id)
+
+Operators, loosest binding first: ``or``/``|``, ``and``/``&``, ``not``/``~``,
+comparisons (``== != <> < <= > >=``, ``is [not] null``, ``[not] in (...)``),
+``+ -``, ``* / %``, unary ``-``. Column names that are not plain identifiers
+can be written in backticks: ```order total```. String literals compared with
+or subtracted from a datetime column are read as timestamps:
+``created > '2024-01-15'``, ``age = created - '2024-01-01'``.
+"""
+import re
+import numbers
+import operator
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that fail to parse or validate"""
+
+
+# Deepest nesting of parentheses, calls and operators; validation and
+# evaluation recurse over the tree, so this keeps them off the stack limit
+MAX_DEPTH = 50
+
+# Rows of an object column sampled to infer what it holds
+SCHEMA_SAMPLE_ROWS = 1000
+
+
+# Node types
+
+class Literal:
+    def __init__(self, value: Any):
+        self.value = value
+
+class Column:
+    def __init__(self, name: str):
+        self.name = name
+
+class Unary:
+    def __init__(self, op: str, operand):
+        self.op = op
+        self.operand = operand
+
+class Binary:
+    def __init__(self, op: str, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+class IsNull:
+    def __init__(self, operand, negated: bool):
+        self.operand = operand
+        self.negated = negated
+
+class In:
+    def __init__(self, operand, values: List[Any], negated: bool):
+        self.operand = operand
+        self.values = values
+        self.negated = negated
+
+class Call:
+    def __init__(self, name: str, args: List[Any]):
+        self.name = name
+        self.args = args
+
+
+# Tokenizer
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>[ \t\r]+)
+  | (?P<sep>[;\n])
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`[^`]+`)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>==|!=|<>|<=|>=|<|>|\+|-|\*|/|%|\(|\)|,|&|\||~|=)
+""", re.VERBOSE)
+
+_KEYWORDS = {"and", "or", "not", "is", "null", "true", "false", "in"}
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", "'": "'", '"': '"'}
+
+
+def _tokenize(source: str, statements: bool = True) -> List[Tuple[str, Any]]:
+    """Split source into tokens; newlines only separate statements when ``statements`` is set"""
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = _TOKEN_RE.match(source, position)
+        if not match:
+            raise ExpressionError(f"Unexpected character {source[position]!r} at position {position}")
+        kind = match.lastgroup
+        text = match.group()
+        position = match.end()
+
+        if kind == "ws" or (kind == "sep" and text == "\n" and not statements):
+            continue
+        elif kind == "number":
+            value = float(text) if any(c in text for c in ".eE") else int(text)
+            tokens.append(("literal", value))
+        elif kind == "string":
+            body = re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), text[1:-1])
+            tokens.append(("literal", body))
+        elif kind == "quoted":
+            tokens.append(("name", text[1:-1]))
+        elif kind == "name" and text.lower() in _KEYWORDS:
+            tokens.append(("keyword", text.lower()))
+        else:
+            tokens.append((kind, text))
+
+    tokens.append(("end", None))
+    return tokens
+
+
+# Parser
+
+_COMPARISONS = {"==", "!=", "<>", "<", "<=", ">", ">="}
+
+class _Parser:
+    def __init__(self, source: str, statements: bool = True):
+        self.tokens = _tokenize(source, statements)
+        self.index = 0
+        self.depth = 0
+
+    def nested(self, parse):
+        """Run a parse step one level deeper, refusing input nested past MAX_DEPTH"""
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ExpressionError(f"Expression is nested more than {MAX_DEPTH} levels deep")
+        try:
+            return parse()
+        finally:
+            self.depth -= 1
+
+    def peek(self, kind: str, value: Any = None) -> bool:
+        token_kind, token_value = self.tokens[self.index]
+        return token_kind == kind and (value is None or token_value == value)
+
+    def accept(self, kind: str, value: Any = None) -> Optional[Any]:
+        if self.peek(kind, value):
+            token = self.tokens[self.index]
+            self.index += 1
+            return token[1]
+        return None
+
+    def expect(self, kind: str, value: Any = None) -> Any:
+        if not self.peek(kind, value):
+            found = self.tokens[self.index][1]
+            raise ExpressionError(f"Expected {value or kind}, found {found!r}" if found is not None else f"Expected {value or kind}, found end of input")
+        return self.accept(kind, value)
+
+    def skip_separators(self):
+        while self.accept("sep"):
+            pass
+
+    def expression(self):
+        node = self.conjunction()
+        while self.accept("keyword", "or") or self.accept("op", "|"):
+            node = Binary("or", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept("keyword", "and") or self.accept("op", "&"):
+            node = Binary("and", node, self.negation())
+        return node
+
+    def negation(self):
+        if self.accept("keyword", "not") or self.accept("op", "~"):
+            return Unary("not", self.nested(self.negation))
+        return self.comparison()
+
+    def comparison(self):
+        node = self.additive()
+
+        if self.accept("keyword", "is"):
+            negated = bool(self.accept("keyword", "not"))
+            self.expect("keyword", "null")
+            return IsNull(node, negated)
+
+        negated = bool(self.accept("keyword", "not"))
+        if negated or self.peek("keyword", "in"):
+            self.expect("keyword", "in")
+            self.expect("op", "(")
+            values = [self.literal_value()]
+            while self.accept("op", ","):
+                values.append(self.literal_value())
+            self.expect("op", ")")
+            return In(node, values, negated)
+
+        op = self.tokens[self.index][1] if self.peek("op") else None
+        if op in _COMPARISONS:
+            self.index += 1
+            right = self.additive()
+            op = "!=" if op == "<>" else op
+            # ``x == null`` almost always means ``x is null``; NaN never compares equal
+            if op in ("==", "!=") and isinstance(right, Literal) and right.value is None:
+                return IsNull(node, op == "!=")
+            return Binary(op, node, right)
+
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.peek("op", "+") or self.peek("op", "-"):
+            node = Binary(self.accept("op"), node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek("op", "*") or self.peek("op", "/") or self.peek("op", "%"):
+            node = Binary(self.accept("op"), node, self.unary())
+        return node
+
+    def unary(self):
+        if self.accept("op", "-"):
+            operand = self.nested(self.unary)
+            if isinstance(operand, Literal) and isinstance(operand.value, (int, float)) and not isinstance(operand.value, bool):
+                return Literal(-operand.value)
+            return Unary("-", operand)
+        return self.primary()
+
+    def literal_value(self) -> Any:
+        node = self.unary()
+        if not isinstance(node, Literal):
+            raise ExpressionError("Only literals are allowed inside 'in (...)'")
+        return node.value
+
+    def primary(self):
+        if self.peek("literal"):
+            return Literal(self.accept("literal"))
+        if self.accept("keyword", "true"):
+            return Literal(True)
+        if self.accept("keyword", "false"):
+            return Literal(False)
+        if self.accept("keyword", "null"):
+            return Literal(None)
+        if self.accept("op", "("):
+            node = self.nested(self.expression)
+            self.expect("op", ")")
+            return node
+
+        name = self.accept("name")
+        if name is not None:
+            if self.accept("op", "("):
+                return self.call(name)
+            return Column(name)
+
+        found = self.tokens[self.index][1]
+        raise ExpressionError(f"Unexpected {found!r}" if found is not None else "Unexpected end of input")
+
+    def call(self, name: str):
+        function = name.lower()
+        if function not in FUNCTIONS:
+            raise ExpressionError(f"Unknown function '{name}'")
+
+        args = []
+        if not self.accept("op", ")"):
+            args.append(self.nested(self.expression))
+            while self.accept("op", ","):
+                args.append(self.nested(self.expression))
+            self.expect("op", ")")
+
+        spec = FUNCTIONS[function]
+        if len(args) < spec.min_args or (spec.max_args is not None and len(args) > spec.max_args):
+            raise ExpressionError(f"Wrong number of arguments for {function}(): {len(args)}")
+        for position in spec.literals:
+            if position < len(args) and not isinstance(args[position], Literal):
+                raise ExpressionError(f"Argument {position + 1} of {function}() must be a literal")
+        for position in spec.integers:
+            value = args[position].value if position < len(args) else 0
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ExpressionError(f"Argument {position + 1} of {function}() must be an integer")
+
+        return Call(function, args)
+
+
+# Schema validation
+
+NUMBER, STRING, BOOL, DATETIME, ANY = "number", "string", "bool", "datetime", "any"
+
+def _literal_kind(value: Any) -> str:
+    if value is None:
+        return ANY
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, (int, float)):
+        return NUMBER
+    return STRING
+
+def _check(expected: Tuple[str, ...], kind: str, context: str):
+    if kind != ANY and kind not in expected:
+        raise ExpressionError(f"{context} expects {' or '.join(expected)}, got {kind}")
+
+def _infer(node, schema: Dict[str, str]) -> str:
+    """Return the kind an expression evaluates to, raising on schema violations"""
+    if isinstance(node, Literal):
+        return _literal_kind(node.value)
+
+    if isinstance(node, Column):
+        if node.name not in schema:
+            raise ExpressionError(f"Unknown column '{node.name}'")
+        return schema[node.name]
+
+    if isinstance(node, Unary):
+        kind = _infer(node.operand, schema)
+        if node.op == "not":
+            _check((BOOL,), kind, "'not'")
+            return BOOL
+        _check((NUMBER,), kind, "unary '-'")
+        return NUMBER
+
+    if isinstance(node, (IsNull, In)):
+        kind = _infer(node.operand, schema)
+        if isinstance(node, In):
+            for value in node.values:
+                value_kind = _literal_kind(value)
+                if kind == DATETIME and value_kind == STRING:
+                    _timestamp(value)
+                elif ANY not in (kind, value_kind) and value_kind != kind:
+                    raise ExpressionError(f"'in' compares {kind} with {value_kind}")
+        return BOOL
+
+    if isinstance(node, Call):
+        spec = FUNCTIONS[node.name]
+        kinds = [_infer(arg, schema) for arg in node.args]
+        for position, kind in enumerate(kinds):
+            expected = spec.arg_kinds[min(position, len(spec.arg_kinds) - 1)] if spec.arg_kinds else None
+            if expected:
+                _check(expected, kind, f"{node.name}() argument {position + 1}")
+        return spec.result(kinds)
+
+    left = _infer(node.left, schema)
+    right = _infer(node.right, schema)
+
+    if node.op in ("and", "or"):
+        _check((BOOL,), left, f"'{node.op}'")
+        _check((BOOL,), right, f"'{node.op}'")
+        return BOOL
+
+    if node.op in _COMPARISONS:
+        if {left, right} == {DATETIME, STRING}:
+            literal = node.right if right == STRING else node.left
+            if not isinstance(literal, Literal):
+                raise ExpressionError("Datetimes can only be compared with string literals")
+            _timestamp(literal.value)
+        elif ANY not in (left, right) and left != right and {left, right} != {NUMBER, BOOL}:
+            raise ExpressionError(f"Cannot compare {left} with {right}")
+        return BOOL
+
+    if node.op == "+" and STRING in (left, right):
+        _check((STRING,), left, "'+'")
+        _check((STRING,), right, "'+'")
+        return STRING
+
+    if DATETIME in (left, right):
+        if node.op != "-":
+            raise ExpressionError(f"'{node.op}' is not supported on datetimes")
+        other, kind = (node.right, right) if left == DATETIME else (node.left, left)
+        if kind == STRING:
+            if not isinstance(other, Literal):
+                raise ExpressionError("Datetimes can only be subtracted with string literals")
+            _timestamp(other.value)
+        elif kind not in (DATETIME, ANY):
+            raise ExpressionError(f"'-' cannot combine datetime with {kind}")
+        return ANY
+
+    _check((NUMBER, BOOL), left, f"'{node.op}'")
+    _check((NUMBER, BOOL), right, f"'{node.op}'")
+    return NUMBER
+
+
+def _timestamp(value: str, tz=None):
+    """Read a string literal as a timestamp, in ``tz`` when it names no zone of its own"""
+    import pandas as pd
+
+    try:
+        timestamp = pd.Timestamp(value)
+    except ValueError:
+        raise ExpressionError(f"Invalid date or time {value!r}") from None
+    if timestamp is pd.NaT:
+        raise ExpressionError(f"Invalid date or time {value!r}")
+
+    if tz is not None and timestamp.tzinfo is None:
+        return timestamp.tz_localize(tz)
+    if tz is None and timestamp.tzinfo is not None:
+        return timestamp.tz_convert(None)
+    return timestamp
+
+def _coerce_datetime(value, other):
+    """A string compared with or subtracted from a datetime column, as a timestamp in the column's zone"""
+    from pandas.api import types
+
+    dtype = getattr(other, "dtype", None)
+    if isinstance(value, str) and dtype is not None and types.is_datetime64_any_dtype(dtype):
+        return _timestamp(value, getattr(dtype, "tz", None))
+    return value
+
+def _depth(node) -> int:
+    """Height of the tree, computed without recursion"""
+    height = 0
+    stack = [(node, 1)]
+    while stack:
+        current, level = stack.pop()
+        height = max(height, level)
+        stack.extend((child, level + 1) for child in _children(current))
+    return height
+
+def _children(node) -> list:
+    return getattr(node, "args", None) or [
+        child for child in (getattr(node, "operand", None), getattr(node, "left", None), getattr(node, "right", None))
+        if child is not None
+    ]
+
+def _columns(node) -> set:
+    if isinstance(node, Column):
+        return {node.name}
+    if isinstance(node, Literal):
+        return set()
+    children = _children(node)
+    return set().union(*[_columns(child) for child in children]) if children else set()
+
+
+def schema_of(df) -> Dict[str, str]:
+    """
+    Map each DataFrame column to the expression kind of its dtype
+    """
+    from pandas.api import types
+
+    schema = {}
+    for name, dtype in df.dtypes.items():
+        if types.is_object_dtype(dtype):
+            # Object columns may hold anything; judge by a sample, evaluation checks the rest
+            schema[name] = _INFERRED_KINDS.get(types.infer_dtype(df[name].head(SCHEMA_SAMPLE_ROWS), skipna=True), ANY)
+            continue
+        if types.is_bool_dtype(dtype):
+            schema[name] = BOOL
+        elif types.is_numeric_dtype(dtype):
+            schema[name] = NUMBER
+        elif types.is_datetime64_any_dtype(dtype):
+            schema[name] = DATETIME
+        elif types.is_string_dtype(dtype):
+            schema[name] = STRING
+        elif isinstance(dtype, types.CategoricalDtype):
+            schema[name] = _category_kind(dtype)
+        else:
+            schema[name] = ANY
+    return schema
+
+# pandas' infer_dtype names for the values an object column holds
+_INFERRED_KINDS = {
+    "string": STRING,
+    "integer": NUMBER,
+    "floating": NUMBER,
+    "mixed-integer-float": NUMBER,
+    "decimal": NUMBER,
+    "boolean": BOOL,
+}
+
+def _category_kind(dtype) -> str:
+    from pandas.api import types
+
+    categories = dtype.categories.dtype
+    if types.is_numeric_dtype(categories):
+        return NUMBER
+    return STRING if types.is_string_dtype(categories) else ANY
+
+
+# Evaluation
+
+def _as_series(value, index):
+    import pandas as pd
+
+    if isinstance(value, pd.Series):
+        return value
+    return pd.Series(value, index=index, dtype=object if value is None else None)
+
+def _as_bool(value, index):
+    """Coerce a predicate result to a boolean mask, treating null as false"""
+    import pandas as pd
+
+    if isinstance(value, pd.Series):
+        if value.dtype == bool:
+            return value
+        return value.fillna(False).astype(bool)
+    return pd.Series(bool(value) if value is not None else False, index=index)
+
+def _text(value, index):
+    series = _as_series(value, index)
+    # Categorical and object columns both expose .str once cast to the string dtype
+    return series if series.dtype == "string" else series.astype("string")
+
+def _plain(value, index):
+    """
+    A categorical column as its categories' own dtype; categoricals refuse
+    ordering comparisons, arithmetic and values outside their categories
+    """
+    from pandas.api import types
+
+    dtype = getattr(value, "dtype", None)
+    if not isinstance(dtype, types.CategoricalDtype):
+        return value
+    categories = dtype.categories.dtype
+    if types.is_string_dtype(categories):
+        return _text(value, index)
+    if types.is_integer_dtype(categories) and value.isna().any():
+        return value.astype("float64")
+    return value.astype(categories)
+
+_BINARY_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+def _evaluate(node, df):
+    import pandas as pd
+
+    if isinstance(node, Literal):
+        return node.value
+
+    if isinstance(node, Column):
+        return df[node.name]
+
+    if isinstance(node, Unary):
+        if node.op == "not":
+            return ~_as_bool(_evaluate(node.operand, df), df.index)
+        return -_arithmetic("-", _plain(_evaluate(node.operand, df), df.index))
+
+    if isinstance(node, IsNull):
+        mask = pd.isna(_evaluate(node.operand, df))
+        mask = _as_series(mask, df.index) if not isinstance(mask, pd.Series) else mask
+        return ~mask if node.negated else mask
+
+    if isinstance(node, In):
+        operand = _as_series(_evaluate(node.operand, df), df.index)
+        mask = operand.isin([_coerce_datetime(value, operand) for value in node.values])
+        return ~mask if node.negated else mask
+
+    if isinstance(node, Call):
+        args = [_evaluate(arg, df) for arg in node.args]
+        return FUNCTIONS[node.name].impl(df.index, *args)
+
+    if node.op in ("and", "or"):
+        left = _as_bool(_evaluate(node.left, df), df.index)
+        right = _as_bool(_evaluate(node.right, df), df.index)
+        return left & right if node.op == "and" else left | right
+
+    left = _evaluate(node.left, df)
+    right = _evaluate(node.right, df)
+    if node.op not in ("==", "!="):
+        left, right = _plain(left, df.index), _plain(right, df.index)
+    if node.op in _COMPARISONS or node.op == "-":
+        left, right = _coerce_datetime(left, right), _coerce_datetime(right, left)
+    if node.op == "+" and isinstance(left, str) and isinstance(right, str):
+        return left + right
+    if node.op == "+" and (isinstance(left, str) or isinstance(right, str) or _is_text(left) or _is_text(right)):
+        return _text(left, df.index) + _text(right, df.index)
+    if node.op not in _COMPARISONS:
+        left, right = _arithmetic(node.op, left), _arithmetic(node.op, right)
+    return _BINARY_OPS[node.op](left, right)
+
+def _is_text(value) -> bool:
+    from pandas.api import types
+
+    dtype = getattr(value, "dtype", None)
+    if dtype is None or not types.is_string_dtype(dtype):
+        return False
+    return not types.is_object_dtype(dtype) or types.infer_dtype(value, skipna=True) == "string"
+
+def _arithmetic(op: str, value):
+    """
+    Check an arithmetic operand at evaluation: object columns typed by a
+    sample, or left as ANY, may hold values pandas would happily repeat
+    or concatenate (``name * 3``)
+    """
+    from pandas.api import types
+
+    dtype = getattr(value, "dtype", None)
+    if dtype is None:
+        valid = value is None or isinstance(value, numbers.Number) or (op == "-" and isinstance(value, (datetime, timedelta)))
+    elif types.is_object_dtype(dtype):
+        valid = _INFERRED_KINDS.get(types.infer_dtype(value, skipna=True)) in (NUMBER, BOOL)
+    else:
+        valid = types.is_numeric_dtype(dtype) or (
+            op == "-" and (types.is_datetime64_any_dtype(dtype) or types.is_timedelta64_dtype(dtype))
+        )
+    if not valid:
+        raise ExpressionError(f"'{op}' expects numbers, got {dtype if dtype is not None else type(value).__name__}")
+    return value
+
+
+# Functions
+
+class _Function:
+    def __init__(
+        self, min_args: int, max_args: Optional[int], result, impl, arg_kinds=None,
+        literals: Tuple[int, ...] = (), integers: Tuple[int, ...] = ()
+    ):
+        self.min_args = min_args
+        self.max_args = max_args
+        self.result = result if callable(result) else (lambda kinds, kind=result: kind)
+        self.impl = impl
+        self.arg_kinds = arg_kinds
+        self.literals = literals
+        # Positions that must be integer literals; a subset of ``literals``
+        self.integers = integers
+
+def _first_known(kinds: List[str]) -> str:
+    return next((kind for kind in kinds if kind != ANY), ANY)
+
+def _coalesce(index, *args):
+    result = _plain(_as_series(args[0], index), index)
+    for arg in args[1:]:
+        result = result.where(result.notna(), _plain(arg, index))
+    return result
+
+def _concat(index, *args):
+    result = _text(args[0], index)
+    for arg in args[1:]:
+        result = result + _text(arg, index)
+    return result
+
+def _if(index, condition, when_true, when_false):
+    import numpy as np
+    import pandas as pd
+
+    mask = _as_bool(condition, index).to_numpy()
+    when_true, when_false = _plain(_as_series(when_true, index), index), _plain(_as_series(when_false, index), index)
+    return pd.Series(np.where(mask, when_true, when_false), index=index)
+
+def _numeric(function):
+    def impl(index, value, *args):
+        import numpy as np
+
+        return getattr(np, function)(_plain(_as_series(value, index), index), *args)
+    return impl
+
+_TEXT = ((STRING,),)
+_NUMERIC = ((NUMBER,),)
+
+FUNCTIONS: Dict[str, _Function] = {
+    "lower": _Function(1, 1, STRING, lambda index, s: _text(s, index).str.lower(), _TEXT),
+    "upper": _Function(1, 1, STRING, lambda index, s: _text(s, index).str.upper(), _TEXT),
+    "strip": _Function(1, 1, STRING, lambda index, s: _text(s, index).str.strip(), _TEXT),
+    "length": _Function(1, 1, NUMBER, lambda index, s: _text(s, index).str.len(), _TEXT),
+    "contains": _Function(2, 2, BOOL, lambda index, s, sub: _text(s, index).str.contains(sub, regex=False), _TEXT, (1,)),
+    "startswith": _Function(2, 2, BOOL, lambda index, s, prefix: _text(s, index).str.startswith(prefix), _TEXT, (1,)),
+    "endswith": _Function(2, 2, BOOL, lambda index, s, suffix: _text(s, index).str.endswith(suffix), _TEXT, (1,)),
+    "substr": _Function(
+        2, 3, STRING,
+        lambda index, s, start, length=None: _text(s, index).str.slice(start, None if length is None else start + length),
+        ((STRING,), (NUMBER,)), (1, 2), (1, 2)
+    ),
+    "concat": _Function(1, None, STRING, _concat),
+    "coalesce": _Function(1, None, _first_known, _coalesce),
+    "is_null": _Function(1, 1, BOOL, lambda index, value: _as_series(value, index).isna()),
+    "abs": _Function(1, 1, NUMBER, _numeric("abs"), _NUMERIC),
+    "floor": _Function(1, 1, NUMBER, _numeric("floor"), _NUMERIC),
+    "ceil": _Function(1, 1, NUMBER, _numeric("ceil"), _NUMERIC),
+    "round": _Function(1, 2, NUMBER, lambda index, value, digits=0: _plain(_as_series(value, index), index).round(digits), _NUMERIC, (1,), (1,)),
+    "if": _Function(3, 3, lambda kinds: _first_known(kinds[1:]), _if, ((BOOL,), None)),
+}
+
+
+# Public API
+
+class Expression:
+    """A parsed expression; cheap to evaluate repeatedly against new batches"""
+
+    def __init__(self, source: str, node):
+        # Operator chains such as a + a + ... nest without parentheses
+        if _depth(node) > MAX_DEPTH * 2:
+            raise ExpressionError(f"Expression is nested more than {MAX_DEPTH * 2} levels deep")
+        self.source = source
+        self.node = node
+        self.columns = frozenset(_columns(node))
+
+    def validate(self, schema: Dict[str, str]) -> str:
+        """Check the expression against a column schema and return its result kind"""
+        try:
+            return _infer(self.node, schema)
+        except ExpressionError as e:
+            raise ExpressionError(f"{e} in expression: {self.source}") from None
+
+    def evaluate(self, df):
+        """Evaluate against a DataFrame, returning a Series (or a scalar for constant expressions)"""
+        return _evaluate(self.node, df)
+
+
+@lru_cache(maxsize=1024)
+def parse_expression(source: str) -> Expression:
+    """
+    Parse a single expression; results are cached by source text. Newlines
+    are whitespace, so long conditions can span several lines.
+    """
+    parser = _Parser(source, statements=False)
+    parser.skip_separators()
+    node = parser.expression()
+    parser.skip_separators()
+    if not parser.peek("end"):
+        raise ExpressionError(f"Unexpected {parser.tokens[parser.index][1]!r} in expression: {source}")
+    return Expression(source, node)
+
+
+@lru_cache(maxsize=1024)
+def parse_assignments(source: str) -> Tuple[Tuple[str, Expression], ...]:
+    """
+    Parse ``column = expression`` statements separated by newlines or ``;``
+    """
+    parser = _Parser(source)
+    assignments = []
+
+    parser.skip_separators()
+    while not parser.peek("end"):
+        start = parser.index
+        name = parser.expect("name")
+        parser.expect("op", "=")
+        node = parser.expression()
+        assignments.append((name, Expression(f"{name} = ...", node)))
+        if not parser.peek("end"):
+            if not parser.peek("sep"):
+                raise ExpressionError(f"Expected end of statement after assignment to '{name}'")
+            parser.skip_separators()
+        if parser.index == start:
+            break
+
+    if not assignments:
+        raise ExpressionError("Expected at least one 'column = expression' statement")
+    return tuple(assignments)
+
+
+def apply_filter(df, condition: str):
+    """
+    Keep the rows for which ``condition`` is true; null results drop the row
+    """
+    expression = parse_expression(condition)
+    result_kind = expression.validate(schema_of(df))
+    if result_kind not in (BOOL, ANY):
+        raise ExpressionError(f"Filter condition must be a boolean expression, got {result_kind}: {condition}")
+    return df.loc[_as_bool(expression.evaluate(df), df.index)]
+
+
+def apply_assignments(df, code: str):
+    """
+    Add or overwrite columns from ``column = expression`` statements, in order
+    """
+    assignments = parse_assignments(code)
+    schema = schema_of(df)
+
+    for name, expression in assignments:
+        schema[name] = expression.validate(schema)
+
+    df = df.copy()
+    for name, expression in assignments:
+        df[name] = expression.evaluate(df)
+    return df
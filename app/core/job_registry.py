@@ -0,0 +1,566 @@
+# app/core/job_registry.py
+"""
+Job registry shared by all worker processes on a host.
+
+Jobs submitted to any worker are stored in a SQLite database and claimed
+under a time-limited lease, so exactly one worker runs each job. A worker
+that dies stops renewing its leases and its jobs become claimable again
+once the lease expires. Failed jobs are requeued with backoff, and the
+batches a job has already committed are checkpointed here so a retry
+resumes where the failed attempt stopped.
+
+Pending jobs are claimed in weighted fair order across tenants: each tenant
+has a virtual time that advances by ``1 / weight`` per job it is given, and
+the tenant furthest behind goes next. A tenant with thousands of queued jobs
+therefore cannot starve one that submits a few.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from app.core.monitoring import TENANT_JOBS
+from app.core.resilience import backoff_delay
+from app.core.tenancy import DEFAULT_TENANT
+from config.logging_config import log_context
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+FINISHED_STATES = ("completed", "completed_with_errors", "failed", "cancelled")
+RETRYABLE_STATES = ("completed_with_errors", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    available_at REAL,
+    tenant TEXT NOT NULL DEFAULT 'default',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, lease_expires, created_at);
+CREATE TABLE IF NOT EXISTS tenants (
+    tenant TEXT PRIMARY KEY,
+    weight REAL NOT NULL,
+    virtual_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scheduler (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    virtual_time REAL NOT NULL
+);
+INSERT OR IGNORE INTO scheduler (id, virtual_time) VALUES (0, 0);
+CREATE TABLE IF NOT EXISTS streams (
+    stream_id TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    tenant TEXT NOT NULL DEFAULT 'default',
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    job_id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, name)
+);
+"""
+
+
+class JobRegistry:
+    """SQLite-backed job table with lease-based claiming"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.JOB_REGISTRY_PATH
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Registries from older releases lack the backoff and tenant columns
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "available_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN available_at REAL")
+            if "tenant" not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN tenant TEXT NOT NULL DEFAULT '{DEFAULT_TENANT}'")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_tenant_pending ON jobs (tenant, status, created_at)")
+            if "tenant" not in {row["name"] for row in conn.execute("PRAGMA table_info(streams)")}:
+                conn.execute(f"ALTER TABLE streams ADD COLUMN tenant TEXT NOT NULL DEFAULT '{DEFAULT_TENANT}'")
+            conn.execute("INSERT OR IGNORE INTO tenants (tenant, weight, virtual_time) VALUES (?, 1, 0)", (DEFAULT_TENANT,))
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; the registry is used from asyncio.to_thread workers
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, job_id: str, kind: str, payload: Dict[str, Any], tenant: str = DEFAULT_TENANT, weight: float = 1.0):
+        """Queue a job for any worker to claim, on behalf of ``tenant``"""
+        conn = self._connect()
+        now = time.time()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A tenant that was idle rejoins at the current virtual time instead of
+            # cashing in the turns it didn't use
+            conn.execute(
+                """
+                INSERT INTO tenants (tenant, weight, virtual_time)
+                VALUES (?, ?, (SELECT virtual_time FROM scheduler WHERE id = 0))
+                ON CONFLICT (tenant) DO UPDATE SET
+                    weight = excluded.weight,
+                    virtual_time = CASE
+                        WHEN EXISTS (SELECT 1 FROM jobs WHERE tenant = excluded.tenant AND status = ?) THEN virtual_time
+                        ELSE MAX(virtual_time, excluded.virtual_time)
+                    END
+                """,
+                (tenant, weight, PENDING)
+            )
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, payload, status, tenant, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), PENDING, tenant, now, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take a running job whose lease expired, or else the
+        oldest due job of the tenant furthest behind in virtual time, and
+        lease it to ``owner``. Returns None when nothing is claimable.
+        """
+        conn = self._connect()
+        now = time.time()
+
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't pick the same row
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Reclaimed jobs were charged to their tenant when first claimed
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND lease_expires < ? ORDER BY created_at LIMIT 1",
+                (RUNNING, now)
+            ).fetchone()
+
+            if row is None:
+                tenant = conn.execute(
+                    """
+                    SELECT tenant, weight, virtual_time FROM tenants t
+                    WHERE EXISTS (
+                        SELECT 1 FROM jobs j
+                        WHERE j.tenant = t.tenant AND j.status = ? AND COALESCE(j.available_at, 0) <= ?
+                    )
+                    ORDER BY virtual_time LIMIT 1
+                    """,
+                    (PENDING, now)
+                ).fetchone()
+
+                if tenant is not None:
+                    row = conn.execute(
+                        """
+                        SELECT * FROM jobs
+                        WHERE tenant = ? AND status = ? AND COALESCE(available_at, 0) <= ?
+                        ORDER BY created_at LIMIT 1
+                        """,
+                        (tenant["tenant"], PENDING, now)
+                    ).fetchone()
+                    conn.execute(
+                        "UPDATE tenants SET virtual_time = ? WHERE tenant = ?",
+                        (tenant["virtual_time"] + 1 / tenant["weight"], tenant["tenant"])
+                    )
+                    conn.execute("UPDATE scheduler SET virtual_time = ? WHERE id = 0", (tenant["virtual_time"],))
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (RUNNING, owner, now + lease_seconds, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row["status"] == RUNNING:
+            logger.warning(f"Reclaimed job {row['job_id']} from {row['owner']} after its lease expired")
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend a lease; False means the job was reclaimed or finished elsewhere"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE job_id = ? AND owner = ? AND status = ?",
+            (now + lease_seconds, now, job_id, owner, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, owner: str, status: str) -> bool:
+        """Record a final status for a job this owner holds"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, lease_expires = NULL, updated_at = ? WHERE job_id = ? AND owner = ? AND status = ?",
+            (status, time.time(), job_id, owner, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: str, owner: str, delay: float) -> bool:
+        """Put a job this owner holds back in the queue, claimable after ``delay`` seconds"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_expires = NULL, available_at = ?, updated_at = ? WHERE job_id = ? AND owner = ? AND status = ?",
+            (PENDING, now + delay, now, job_id, owner, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def retry(self, job_id: str) -> bool:
+        """Requeue a failed job with a fresh attempt budget; it resumes from its checkpoints"""
+        cursor = self._connect().execute(
+            f"UPDATE jobs SET status = ?, owner = NULL, available_at = NULL, attempts = 0, updated_at = ? WHERE job_id = ? AND status IN ({','.join('?' * len(RETRYABLE_STATES))})",
+            (PENDING, time.time(), job_id, *RETRYABLE_STATES)
+        )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not finished; pending jobs will never be claimed"""
+        cursor = self._connect().execute(
+            f"UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status NOT IN ({','.join('?' * len(FINISHED_STATES))})",
+            (time.time(), job_id, *FINISHED_STATES)
+        )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT job_id, kind, status, tenant, owner, attempts, created_at, updated_at FROM jobs WHERE job_id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        for field in ("created_at", "updated_at"):
+            job[field] = datetime.datetime.utcfromtimestamp(job[field]).isoformat()
+        return job
+
+    def record_upload(self, job_id: str, tenant: str):
+        """Remember the tenant of a direct file upload, which runs outside the queue"""
+        self._connect().execute(
+            "INSERT INTO uploads (job_id, tenant, created_at) VALUES (?, ?, ?)",
+            (job_id, tenant, time.time())
+        )
+
+    def job_tenant(self, job_id: str) -> Optional[str]:
+        """The tenant that started a queued job or file upload, or None if unknown"""
+        row = self._connect().execute(
+            "SELECT tenant FROM jobs WHERE job_id = ? UNION ALL SELECT tenant FROM uploads WHERE job_id = ?",
+            (job_id, job_id)
+        ).fetchone()
+        return row["tenant"] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        return {
+            row["status"]: row["n"]
+            for row in self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        }
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Number of pending jobs per tenant"""
+        return {
+            row["tenant"]: row["n"]
+            for row in self._connect().execute("SELECT tenant, COUNT(*) AS n FROM jobs WHERE status = ? GROUP BY tenant", (PENDING,))
+        }
+
+    def create_stream(self, stream_id: str, config: Dict[str, Any], tenant: str = DEFAULT_TENANT):
+        """Register a push stream of ``tenant`` so every worker can accept its records"""
+        self._connect().execute(
+            "INSERT INTO streams (stream_id, config, tenant, created_at) VALUES (?, ?, ?, ?)",
+            (stream_id, json.dumps(config), tenant, time.time())
+        )
+
+    def get_stream(self, stream_id: str, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A stream's config, or None if it doesn't exist or belongs to another tenant than ``tenant``"""
+        row = self._connect().execute("SELECT config, tenant FROM streams WHERE stream_id = ?", (stream_id,)).fetchone()
+        if row is None or (tenant is not None and row["tenant"] != tenant):
+            return None
+        return json.loads(row["config"])
+
+    def delete_stream(self, stream_id: str, tenant: Optional[str] = None) -> bool:
+        if tenant is None:
+            cursor = self._connect().execute("DELETE FROM streams WHERE stream_id = ?", (stream_id,))
+        else:
+            cursor = self._connect().execute("DELETE FROM streams WHERE stream_id = ? AND tenant = ?", (stream_id, tenant))
+        return cursor.rowcount == 1
+
+    def save_checkpoints(self, job_id: str, names: Iterable[str]):
+        """Record batches of a job as committed"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO checkpoints (job_id, name, created_at) VALUES (?, ?, ?)",
+                [(job_id, name, now) for name in names]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def checkpoints(self, job_id: str) -> Set[str]:
+        """Names of the batches a job has committed"""
+        return {
+            row["name"]
+            for row in self._connect().execute("SELECT name FROM checkpoints WHERE job_id = ?", (job_id,))
+        }
+
+    def clear_checkpoints(self, job_id: str):
+        self._connect().execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+
+
+STAGED = "staged"
+
+class JobCheckpoints:
+    """
+    Batches of one job that have reached their sink.
+
+    Commits are kept in memory while an attempt runs and only written to the
+    registry, together with a local copy of the data being written, when the
+    attempt fails; the happy path never touches disk. A retry on this host
+    then reads the staged data instead of the source and skips every batch
+    already committed. Without staged data (the worker died mid-job) the
+    checkpoints are discarded, since a fresh read of the source may not cut
+    into the same batches.
+    """
+
+    def __init__(self, job_id: str, registry: Optional[JobRegistry] = None, committed: Optional[Set[str]] = None):
+        self.job_id = job_id
+        self.registry = registry
+        self.committed = set(committed or ())
+        self._saved = set(self.committed)
+
+    @classmethod
+    async def load(cls, job_id: str) -> "JobCheckpoints":
+        if not settings.CHECKPOINT_ENABLED:
+            return cls(job_id)
+
+        registry = get_job_registry()
+        committed = await asyncio.to_thread(registry.checkpoints, job_id)
+        checkpoints = cls(job_id, registry, committed)
+
+        if committed and (STAGED not in committed or not os.path.exists(checkpoints.staged_path)):
+            logger.warning(f"Job {job_id}: no staged data to resume from, discarding {len(committed)} checkpoints")
+            await checkpoints.clear()
+        return checkpoints
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.committed
+
+    def __len__(self) -> int:
+        return len(self.committed - {STAGED})
+
+    @property
+    def staged_path(self) -> str:
+        return os.path.join(settings.CHECKPOINT_DIR, f"{self.job_id}.pkl")
+
+    def mark(self, name: str):
+        """Note a batch as committed to its sink"""
+        self.committed.add(name)
+
+    async def load_data(self) -> Any:
+        """The data staged by a failed attempt, or None"""
+        if STAGED not in self.committed:
+            return None
+
+        def read():
+            with open(self.staged_path, "rb") as f:
+                return pickle.load(f)
+
+        return await asyncio.to_thread(read)
+
+    async def save(self, data: Any):
+        """Persist the commits so far, staging ``data`` for the retry if it isn't already"""
+        if self.registry is None:
+            return
+
+        if STAGED not in self.committed:
+            def write():
+                os.makedirs(settings.CHECKPOINT_DIR, exist_ok=True)
+                tmp_path = f"{self.staged_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.staged_path)
+
+            await asyncio.to_thread(write)
+            self.committed.add(STAGED)
+
+        unsaved = self.committed - self._saved
+        if unsaved:
+            await asyncio.to_thread(self.registry.save_checkpoints, self.job_id, unsaved)
+            self._saved |= unsaved
+
+    async def clear(self):
+        """Forget the job's checkpoints once it no longer needs them"""
+        if self.registry is None or not self._saved:
+            self.committed.clear()
+            return
+
+        def remove():
+            self.registry.clear_checkpoints(self.job_id)
+            if os.path.exists(self.staged_path):
+                os.unlink(self.staged_path)
+
+        await asyncio.to_thread(remove)
+        self.committed.clear()
+        self._saved.clear()
+
+
+class JobWorker:
+    """
+    Claims jobs from the registry and runs them, up to ``concurrency`` at a
+    time, renewing each lease while the job runs. A job that fails is put
+    back in the queue with jittered exponential backoff until it has run
+    ``max_attempts`` times.
+    """
+
+    def __init__(
+        self,
+        registry: JobRegistry,
+        handlers: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[Any]]],
+        concurrency: int,
+        lease_seconds: float,
+        poll_interval: float,
+        max_attempts: int = 1,
+        retry_delay: float = 0.0
+    ):
+        self.registry = registry
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def notify(self):
+        """Wake the claim loop early, e.g. right after a local submit"""
+        self._wakeup.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Job worker {self.owner} started (concurrency {self.concurrency})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            await self._slots.acquire()
+            # Cleared before claiming so a submit that lands mid-claim still wakes us
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self.registry.claim, self.owner, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Failed to claim job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._running[job["job_id"]] = asyncio.create_task(self._run(job))
+
+    async def _renew(self, job_id: str, runner: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.registry.renew, job_id, self.owner, self.lease_seconds):
+                # Cancelled, or reclaimed by another worker after we stalled; stop duplicating work
+                logger.warning(f"Lost lease on job {job_id}, stopping it")
+                runner.cancel()
+                return
+
+    async def _run(self, job: Dict[str, Any]):
+        with log_context(job_id=job["job_id"]):
+            await self._run_job(job)
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        renewer = asyncio.create_task(self._renew(job_id, asyncio.current_task()))
+        status = "failed"
+
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                logger.error(f"No handler for job {job_id} of kind {job['kind']}")
+            else:
+                result = await handler(job_id, job["payload"])
+                status = "completed" if result else "failed"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} raised: {str(e)}")
+        finally:
+            renewer.cancel()
+            self._running.pop(job_id, None)
+            self._slots.release()
+
+        if status != "completed" and job["attempts"] < self.max_attempts:
+            delay = backoff_delay(job["attempts"], self.retry_delay, self.retry_delay * 2 ** self.max_attempts)
+            if await asyncio.to_thread(self.registry.release, job_id, self.owner, delay):
+                logger.warning(f"Job {job_id} failed (attempt {job['attempts']}/{self.max_attempts}), retrying in {delay:.1f}s")
+                return
+
+        await asyncio.to_thread(self.registry.finish, job_id, self.owner, status)
+        TENANT_JOBS.labels(job.get("tenant", DEFAULT_TENANT), status).inc()
+
+
+_registry: Optional[JobRegistry] = None
+
+def get_job_registry() -> JobRegistry:
+    """Get or create the registry singleton for this process"""
+    global _registry
+    if _registry is None:
+        _registry = JobRegistry()
+    return _registry
@@ -3,7 +3,10 @@ import time
 import logging
 from fastapi import FastAPI, Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess, start_http_server
+)
 import psutil
 import asyncio
 from typing import Callable
@@ -33,6 +36,35 @@ DATA_VOLUME = Counter(
     'Data Volume Processed in Bytes',
     ['destination_type']
 )
+STREAM_RECORDS = Counter(
+    'app_stream_records',
+    'Records Pushed to Streams',
+    ['outcome']
+)
+STREAM_BATCH_LATENCY = Histogram(
+    'app_stream_batch_latency_seconds',
+    'Time to Transform and Write a Stream Micro-batch'
+)
+TENANT_REQUESTS = Counter(
+    'app_tenant_requests',
+    'API Requests per Tenant',
+    ['tenant', 'outcome']
+)
+TENANT_JOBS = Counter(
+    'app_tenant_jobs',
+    'Jobs Finished per Tenant',
+    ['tenant', 'status']
+)
+# Read from the shared registry, so every worker reports the same value
+TENANT_QUEUE_DEPTH = Gauge(
+    'app_tenant_queue_depth',
+    'Pending Jobs per Tenant',
+    ['tenant'],
+    multiprocess_mode='livemax'
+)
+
+# How often the queue depth gauge is refreshed from the job registry
+QUEUE_DEPTH_INTERVAL = 5
 
 class MonitoringMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
@@ -85,6 +117,43 @@ async def monitor_system_resources():
         
         await asyncio.sleep(60)  
 
+async def monitor_tenant_queues():
+    """
+    Periodically update the pending job count of each tenant
+    """
+    from app.core.job_registry import get_job_registry
+    
+    seen = set()
+    while True:
+        try:
+            depths = await asyncio.to_thread(get_job_registry().queue_depths)
+            # Tenants whose queue drained drop out of the query but should read 0
+            for tenant in seen | set(depths):
+                TENANT_QUEUE_DEPTH.labels(tenant).set(depths.get(tenant, 0))
+            seen |= set(depths)
+        except Exception as e:
+            logger.error(f"Failed to read tenant queue depths: {str(e)}")
+        
+        await asyncio.sleep(QUEUE_DEPTH_INTERVAL)
+
+def multiprocess_mode() -> bool:
+    """
+    Whether metrics are shared between worker processes through
+    PROMETHEUS_MULTIPROC_DIR (which must be set before the workers start)
+    """
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+def metrics_registry():
+    """
+    Registry to expose: this process's metrics, or all workers' combined
+    """
+    if not multiprocess_mode():
+        return REGISTRY
+    
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
 def setup_monitoring(app: FastAPI):
     """
     Monitoring for the application
@@ -93,11 +162,26 @@ def setup_monitoring(app: FastAPI):
     app.add_middleware(MonitoringMiddleware)
     
     
-    metrics_port = int(os.environ.get("METRICS_PORT", "9090"))
-    start_http_server(metrics_port)
-    logger.info(f"Prometheus metrics available at http://localhost:{metrics_port}")
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
     
     
     @app.on_event("startup")
     async def start_monitoring():
-        asyncio.create_task(monitor_system_resources())
\ No newline at end of file
+        if multiprocess_mode():
+            # Every worker would race for the same port; /metrics on the app port aggregates them instead
+            logger.info("Prometheus multiprocess mode, metrics available at /metrics")
+        else:
+            # Bound on startup rather than at import, so importing the app has no side effects
+            metrics_port = int(os.environ.get("METRICS_PORT", "9090"))
+            start_http_server(metrics_port)
+            logger.info(f"Prometheus metrics available at http://localhost:{metrics_port}")
+        
+        asyncio.create_task(monitor_system_resources())
+        asyncio.create_task(monitor_tenant_queues())
+    
+    @app.on_event("shutdown")
+    async def stop_monitoring():
+        if multiprocess_mode():
+            multiprocess.mark_process_dead(os.getpid())
\ No newline at end of file
@@ -0,0 +1,206 @@
+# app/core/resilience.py
+"""
+Retries with jittered exponential backoff and per-endpoint circuit breakers
+for sources and sinks.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, throttling and server-side failures
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Matched by class name so callers needn't import every SDK to classify errors
+TRANSIENT_ERROR_NAMES = {
+    "ClientConnectionError",
+    "ClientConnectorError",
+    "ClientOSError",
+    "ClientPayloadError",
+    "ServerDisconnectedError",
+    "ServerTimeoutError",
+    "ServiceRequestError",
+    "ServiceResponseError",
+    "ServiceRequestTimeoutError",
+    "ServiceResponseTimeoutError",
+    "OperationTimeoutError",
+    "EventHubError",
+    "ConnectionLostError",
+    "OperationalError",
+    "InterfaceError",
+    "DisconnectionError",
+}
+
+
+class RetryStats:
+    """Attempts made by the ``retry_async`` calls inside a ``track_retries`` block"""
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+
+    def record(self, attempts: int):
+        self.calls += 1
+        self.attempts = max(self.attempts, attempts)
+        self.retries += attempts - 1
+
+
+_retry_stats: contextvars.ContextVar[Optional[RetryStats]] = contextvars.ContextVar("retry_stats", default=None)
+
+@contextmanager
+def track_retries() -> Iterator[RetryStats]:
+    """Count the attempts of every retried call in the block, including by tasks it starts"""
+    stats = RetryStats()
+    token = _retry_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _retry_stats.reset(token)
+
+
+class TransientError(Exception):
+    """A failure that is expected to succeed if retried, e.g. HTTP 503"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an error is worth retrying"""
+    if isinstance(error, (TransientError, CircuitOpenError, asyncio.TimeoutError, ConnectionError, TimeoutError)):
+        return True
+
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUSES
+
+    if getattr(error, "connection_invalidated", False):
+        return True
+
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint after ``failure_threshold`` consecutive
+    failures, then lets a single trial call through after ``reset_timeout``
+    seconds; success closes the circuit again
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError; returns whether it is the half-open trial"""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        if state == "half_open":
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def end_trial(self):
+        self._trial_in_flight = False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get or create the process-wide circuit breaker for an endpoint"""
+    from config.settings import settings
+
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_SECONDS
+        )
+    return breaker
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff for the given 1-based attempt"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+async def retry_async(
+    func: Callable[[], Awaitable[T]],
+    *,
+    name: str,
+    attempts: int,
+    base_delay: float,
+    max_delay: float = 30.0,
+    breaker: Optional[CircuitBreaker] = None,
+    retry_if: Callable[[BaseException], bool] = is_transient
+) -> T:
+    """
+    Call ``func`` until it succeeds, retrying transient failures up to
+    ``attempts`` times in total. Non-transient errors are raised at once.
+    """
+    attempts = max(1, attempts)
+    stats = _retry_stats.get()
+
+    for attempt in range(1, attempts + 1):
+        try:
+            trial = breaker.before_call() if breaker else False
+            try:
+                result = await func()
+            finally:
+                if trial:
+                    # A trial call that was cancelled must not leave the circuit stuck open
+                    breaker.end_trial()
+        except Exception as e:
+            # A bad request or missing resource says nothing about the endpoint's health
+            if breaker and not isinstance(e, CircuitOpenError) and is_transient(e):
+                breaker.record_failure()
+            if attempt == attempts or not retry_if(e):
+                if stats:
+                    stats.record(attempt)
+                raise
+
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"{name} failed (attempt {attempt}/{attempts}), retrying in {delay:.2f}s: {str(e)}")
+            await asyncio.sleep(delay)
+        else:
+            if breaker:
+                breaker.record_success()
+            if stats:
+                stats.record(attempt)
+            return result
@@ -0,0 +1,268 @@
+# app/core/schema_cache.py
+import datetime
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import pandas as pd
+from pandas.api import types
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_VALUES = 10000
+
+# Tried in order on a sample of each string column
+DATETIME_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%Y/%m/%d",
+]
+DATETIME_SAMPLE_SIZE = 200
+
+# Bumped when learned schemas change meaning; older cache files are ignored
+SCHEMA_VERSION = 2
+
+
+class SchemaDrift(Exception):
+    """Raised when data no longer matches its cached schema"""
+
+
+def source_key(source: str) -> str:
+    """
+    Identify a feed by its location alone. Query strings (such as SAS tokens,
+    which change on every run) and credentials are dropped, so the key is
+    stable and safe to log.
+    """
+    parts = urlsplit(source)
+    if not parts.scheme or not parts.netloc:
+        return source
+    netloc = parts.netloc.rsplit("@", 1)[-1]
+    return urlunsplit((parts.scheme, netloc, parts.path, "", ""))
+
+
+def _cache_path(source: str, file_format: str) -> str:
+    key = hashlib.sha1(f"{file_format}:{source_key(source)}".encode("utf-8")).hexdigest()
+    return os.path.join(settings.SCHEMA_CACHE_DIR, f"{key}.json")
+
+
+def load_schema(source: str, file_format: str) -> Optional[Dict[str, Any]]:
+    """Return the cached schema for a source, if any"""
+    path = _cache_path(source, file_format)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            schema = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable schema cache {path}: {str(e)}")
+        return None
+
+    if schema.get("version") != SCHEMA_VERSION:
+        return None
+    return schema
+
+
+def save_schema(source: str, file_format: str, schema: Dict[str, Any]):
+    """Persist a schema for a source, atomically replacing any previous one"""
+    path = _cache_path(source, file_format)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            **schema,
+            "version": SCHEMA_VERSION,
+            "source": source_key(source),
+            "learned_at": datetime.datetime.utcnow().isoformat()
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def invalidate_schema(source: str, file_format: str):
+    """Drop the cached schema for a source"""
+    try:
+        os.remove(_cache_path(source, file_format))
+    except FileNotFoundError:
+        pass
+
+
+def _detect_datetime_format(values: pd.Series) -> Optional[str]:
+    sample = values.dropna()
+    sample = sample.sample(DATETIME_SAMPLE_SIZE, random_state=0) if len(sample) > DATETIME_SAMPLE_SIZE else sample
+    if sample.empty or not sample.map(lambda v: isinstance(v, str)).all():
+        return None
+
+    for fmt in DATETIME_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt)
+            return fmt
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def learn_schema(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Derive a compact schema from a DataFrame read with default inference.
+
+    Integers are kept at 64 bits: later files are parsed with the cached
+    type, and pandas silently wraps values that overflow a narrower one.
+    String columns that parse with a known datetime format become datetimes,
+    and low-cardinality strings become categoricals.
+    """
+    dtypes = {}
+    datetime_formats = {}
+
+    for column in df.columns:
+        series = df[column]
+
+        if types.is_bool_dtype(series.dtype) or types.is_float_dtype(series.dtype):
+            dtypes[column] = str(series.dtype)
+
+        elif types.is_integer_dtype(series.dtype):
+            dtypes[column] = "uint64" if types.is_unsigned_integer_dtype(series.dtype) and series.dtype.itemsize == 8 else "int64"
+
+        elif types.is_datetime64_any_dtype(series.dtype):
+            dtypes[column] = str(series.dtype)
+
+        elif types.is_object_dtype(series.dtype) or types.is_string_dtype(series.dtype):
+            fmt = _detect_datetime_format(series)
+            if fmt:
+                dtypes[column] = "datetime64[ns]"
+                datetime_formats[column] = fmt
+                continue
+
+            distinct = series.nunique(dropna=True)
+            if len(series) and distinct <= CATEGORY_MAX_VALUES and distinct <= len(series) * CATEGORY_MAX_RATIO:
+                dtypes[column] = "category"
+            else:
+                dtypes[column] = "object"
+
+        else:
+            dtypes[column] = str(series.dtype)
+
+    return {
+        "columns": [str(column) for column in df.columns],
+        "dtypes": dtypes,
+        "datetime_formats": datetime_formats
+    }
+
+
+def csv_read_options(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments for ``pd.read_csv`` that apply a cached schema while parsing"""
+    datetime_formats = schema.get("datetime_formats", {})
+    return {
+        "dtype": {
+            column: dtype for column, dtype in schema["dtypes"].items()
+            if column not in datetime_formats and not dtype.startswith("datetime")
+        },
+        "parse_dates": list(datetime_formats) or False,
+        "date_format": datetime_formats or None,
+    }
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Cast an already-loaded DataFrame to a schema.
+
+    Raises SchemaDrift if the columns differ or a value does not fit its type.
+    """
+    check_columns(df, schema)
+    datetime_formats = schema.get("datetime_formats", {})
+
+    try:
+        converted = {}
+        for column, dtype in schema["dtypes"].items():
+            if str(df[column].dtype) == dtype:
+                continue
+            if column in datetime_formats:
+                converted[column] = pd.to_datetime(df[column], format=datetime_formats[column])
+            elif dtype.startswith("datetime"):
+                converted[column] = pd.to_datetime(df[column])
+            elif types.is_integer_dtype(dtype) and not types.is_integer_dtype(df[column].dtype):
+                raise SchemaDrift(f"Column '{column}' is no longer {dtype}")
+            else:
+                converted[column] = df[column].astype(dtype)
+    except SchemaDrift:
+        raise
+    except (ValueError, TypeError, OverflowError) as e:
+        raise SchemaDrift(str(e))
+
+    if converted:
+        df = df.copy()
+        for column, values in converted.items():
+            df[column] = values
+
+    check_dtypes(df, schema)
+    return df
+
+
+def check_columns(df: pd.DataFrame, schema: Dict[str, Any]):
+    """Raise SchemaDrift unless the DataFrame has exactly the cached columns"""
+    columns = [str(column) for column in df.columns]
+    if columns != schema["columns"]:
+        added = sorted(set(columns) - set(schema["columns"]))
+        removed = sorted(set(schema["columns"]) - set(columns))
+        raise SchemaDrift(f"Columns changed (added: {added}, removed: {removed})" if added or removed else "Column order changed")
+
+
+def check_dtypes(df: pd.DataFrame, schema: Dict[str, Any]):
+    """Raise SchemaDrift if a column was not parsed as its cached dtype"""
+    for column, dtype in schema["dtypes"].items():
+        actual = str(df[column].dtype)
+        if actual != dtype and not (dtype.startswith("datetime") and actual.startswith("datetime")):
+            raise SchemaDrift(f"Column '{column}' parsed as {actual}, expected {dtype}")
+
+
+def read_with_schema(reader, cache_key: str, file_format: str) -> pd.DataFrame:
+    """
+    Read a CSV or JSON source, applying and maintaining its cached schema.
+
+    ``reader(**options)`` performs the actual read; ``cache_key`` identifies
+    the recurring feed. On drift the cache is invalidated and the data is
+    re-read with default inference, and a fresh schema is learned from it.
+    """
+    schema = load_schema(cache_key, file_format) if settings.SCHEMA_CACHE_ENABLED else None
+
+    if schema:
+        try:
+            if file_format == "csv":
+                df = reader(**csv_read_options(schema))
+                check_columns(df, schema)
+                check_dtypes(df, schema)
+                return df
+
+            # read_json cannot take per-column types; skip its inference and cast instead
+            return apply_schema(reader(dtype=False, convert_dates=False), schema)
+
+        except (SchemaDrift, ValueError, TypeError, OverflowError) as e:
+            logger.warning(f"Schema drift detected for {source_key(cache_key)}, relearning: {str(e)}")
+            invalidate_schema(cache_key, file_format)
+
+    df = reader()
+    if not settings.SCHEMA_CACHE_ENABLED:
+        return df
+
+    schema = learn_schema(df)
+    try:
+        df = apply_schema(df, schema)
+        save_schema(cache_key, file_format, schema)
+    except SchemaDrift as e:
+        logger.warning(f"Could not apply learned schema for {source_key(cache_key)}: {str(e)}")
+
+    return df
@@ -0,0 +1,327 @@
+# app/core/streaming.py
+"""
+Micro-batched ingestion for push streams.
+
+Records pushed to a stream (NDJSON over HTTP, or WebSocket messages) go into
+a bounded queue per stream in each worker process. One flusher per queue
+cuts it into batches of at most ``max_batch_records`` records or
+``max_batch_seconds`` of waiting, applies the stream's transformations to
+each batch and writes it to every destination, while the next batch fills.
+When the queue is full producers wait, which stops the server reading from
+their connections, so a slow sink slows producers down instead of growing
+memory.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.azure_client import AzureClient
+from app.core.data_processor import transform_data
+from app.core.job_registry import get_job_registry
+from app.core.monitoring import STREAM_BATCH_LATENCY, STREAM_RECORDS
+from app.core.tenancy import DEFAULT_TENANT
+from app.schemas.models import StreamConfig
+from config.logging_config import log_context
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# How often a flusher checks that its stream hasn't been deleted through another worker
+REGISTRY_CHECK_SECONDS = 5.0
+
+_CLOSE = object()
+
+
+class InvalidRecord(ValueError):
+    """A pushed line that is not a JSON object"""
+
+
+class RecordTooLarge(InvalidRecord):
+    """A pushed line longer than ``STREAM_MAX_LINE_BYTES``"""
+
+
+class StreamClosed(Exception):
+    """The stream was deleted or the worker is shutting down"""
+
+
+def parse_ndjson_line(line: bytes, line_number: int) -> Dict[str, Any]:
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise InvalidRecord(f"Line {line_number}: invalid JSON ({str(e)})")
+    if not isinstance(record, dict):
+        raise InvalidRecord(f"Line {line_number}: expected a JSON object")
+    return record
+
+
+def parse_ndjson(text: str) -> List[Dict[str, Any]]:
+    """Parse a complete NDJSON document, e.g. one WebSocket message"""
+    return [
+        parse_ndjson_line(line, line_number)
+        for line_number, line in enumerate(text.split("\n"), 1)
+        if line.strip()
+    ]
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_line_bytes: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Parse NDJSON records from a byte stream as it arrives; a line longer
+    than ``max_line_bytes`` raises RecordTooLarge instead of being buffered
+    """
+    max_line_bytes = max_line_bytes or settings.STREAM_MAX_LINE_BYTES
+    buffer = b""
+    line_number = 0
+
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_number += 1
+            if len(line) > max_line_bytes:
+                raise RecordTooLarge(f"Line {line_number}: longer than {max_line_bytes} bytes")
+            if line.strip():
+                yield parse_ndjson_line(line, line_number)
+        if len(buffer) > max_line_bytes:
+            raise RecordTooLarge(f"Line {line_number + 1}: longer than {max_line_bytes} bytes")
+
+    if buffer.strip():
+        yield parse_ndjson_line(buffer, line_number + 1)
+
+
+class MicroBatcher:
+    """Queue and flusher for one stream in this worker process"""
+
+    def __init__(self, stream_id: str, config: StreamConfig, azure_client: AzureClient, tenant: str = DEFAULT_TENANT):
+        self.stream_id = stream_id
+        self.config = config
+        self.tenant = tenant
+        self.azure_client = azure_client
+        self.max_batch_records = config.max_batch_records or settings.STREAM_MAX_BATCH_RECORDS
+        self.max_batch_seconds = config.max_batch_seconds or settings.STREAM_MAX_BATCH_SECONDS
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.STREAM_QUEUE_SIZE))
+        self.producers = 0
+        self.closed = False
+        self.stats = {"received": 0, "written": 0, "batches": 0, "failed_batches": 0}
+
+        self._checked_at = time.monotonic()
+        with log_context(stream_id=stream_id):
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, record: Dict[str, Any]):
+        """Queue a record, waiting while the queue is full"""
+        if self.closed:
+            raise StreamClosed(f"Stream {self.stream_id} is closed")
+        await self.queue.put(record)
+        self.stats["received"] += 1
+        STREAM_RECORDS.labels("received").inc()
+
+    async def close(self):
+        """Stop accepting records and flush the ones already queued"""
+        if not self.closed:
+            self.closed = True
+            await self.queue.put(_CLOSE)
+        await self._task
+
+    async def _next_batch(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """The next batch, and whether the flusher should stop after it"""
+        loop = asyncio.get_running_loop()
+        try:
+            first = await asyncio.wait_for(self.queue.get(), timeout=settings.STREAM_IDLE_SECONDS)
+        except asyncio.TimeoutError:
+            # Idle; free the batcher unless a producer is still connected
+            if self.producers == 0 and self.queue.empty():
+                self.closed = True
+                return [], True
+            return [], False
+
+        if first is _CLOSE:
+            return [], True
+
+        batch = [first]
+        deadline = loop.time() + self.max_batch_seconds
+        while len(batch) < self.max_batch_records:
+            if not self.queue.empty():
+                record = self.queue.get_nowait()
+            else:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            if record is _CLOSE:
+                return batch, True
+            batch.append(record)
+
+        return batch, False
+
+    async def _run(self):
+        flushing: Optional[asyncio.Task] = None
+        try:
+            while True:
+                batch, done = await self._next_batch()
+                if batch:
+                    # One flush in flight at a time keeps batches in order
+                    if flushing:
+                        await flushing
+                    flushing = asyncio.create_task(self._flush(batch))
+
+                if not done and time.monotonic() - self._checked_at >= REGISTRY_CHECK_SECONDS:
+                    self._checked_at = time.monotonic()
+                    if await asyncio.to_thread(get_job_registry().get_stream, self.stream_id) is None:
+                        logger.info(f"Stream {self.stream_id} was deleted, closing")
+                        self.closed = True
+                        done = True
+
+                if done:
+                    break
+        except Exception as e:
+            logger.error(f"Stream {self.stream_id}: flusher failed, closing: {str(e)}")
+        finally:
+            # Producers wait on the queue; a stopped flusher must not leave them blocked
+            self.closed = True
+
+            # Anything still queued arrived after close or can no longer be flushed; drain it
+            dropped = 0
+            while not self.queue.empty():
+                if self.queue.get_nowait() is not _CLOSE:
+                    dropped += 1
+            if dropped:
+                logger.warning(f"Stream {self.stream_id}: discarded {dropped} queued records")
+
+            if flushing:
+                await flushing
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        try:
+            records = batch
+            if self.config.transformations:
+                records = await transform_data(batch, self.config.transformations)
+        except Exception as e:
+            logger.error(f"Stream {self.stream_id}: transformations failed, dropping {len(batch)} records: {str(e)}")
+            self.stats["failed_batches"] += 1
+            STREAM_RECORDS.labels("failed").inc(len(batch))
+            return
+
+        results = await asyncio.gather(*[
+            self._write(destination, records)
+            for destination in self.config.destinations
+        ], return_exceptions=True)
+
+        failed = [
+            (destination, result)
+            for destination, result in zip(self.config.destinations, results)
+            if isinstance(result, Exception)
+        ]
+        for destination, error in failed:
+            logger.error(f"Stream {self.stream_id}: write of {len(records)} records to {destination} failed: {str(error)}")
+
+        self.stats["batches"] += 1
+        if failed:
+            self.stats["failed_batches"] += 1
+            STREAM_RECORDS.labels("failed").inc(len(batch))
+        else:
+            self.stats["written"] += len(records)
+            STREAM_RECORDS.labels("written").inc(len(records))
+        STREAM_BATCH_LATENCY.observe(time.perf_counter() - start)
+
+    async def _write(self, destination: str, records: List[Dict[str, Any]]):
+        if not records:
+            return
+
+        if destination.startswith("eventhub:"):
+            await self.azure_client.send_to_event_hub(destination[9:], records)
+            return
+
+        parts = destination[5:].strip("/").split("/", 1)
+        container_name = parts[0]
+        template = parts[1] if len(parts) > 1 else f"streams/{self.stream_id}/{{date}}/{{hour}}.ndjson"
+
+        # Append blobs cap out at 50,000 blocks; {date}/{hour} paths roll over before that
+        now = datetime.datetime.utcnow()
+        blob_path = template.replace("{date}", now.strftime("%Y-%m-%d")).replace("{hour}", now.strftime("%H"))
+
+        payload = await asyncio.to_thread(
+            lambda: "".join(json.dumps(record, default=str) + "\n" for record in records).encode("utf-8")
+        )
+        await self.azure_client.append_to_blob(container_name, blob_path, payload)
+
+
+class StreamManager:
+    """The micro-batchers of this worker process, created on first push"""
+
+    def __init__(self):
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._lock = asyncio.Lock()
+
+    async def _get(self, stream_id: str, tenant: str) -> Optional[MicroBatcher]:
+        batcher = self._batchers.get(stream_id)
+        if batcher and not batcher.closed:
+            return batcher if batcher.tenant == tenant else None
+
+        async with self._lock:
+            batcher = self._batchers.get(stream_id)
+            if batcher and not batcher.closed:
+                return batcher if batcher.tenant == tenant else None
+
+            config = await asyncio.to_thread(get_job_registry().get_stream, stream_id, tenant)
+            if config is None:
+                return None
+
+            from app.api.dependencies import get_azure_client
+
+            batcher = MicroBatcher(stream_id, StreamConfig(**config), await get_azure_client(), tenant)
+            self._batchers[stream_id] = batcher
+            return batcher
+
+    @asynccontextmanager
+    async def producer(self, stream_id: str, tenant: str = DEFAULT_TENANT) -> AsyncIterator[Optional[MicroBatcher]]:
+        """
+        The stream's batcher for the duration of one connection, or None if
+        the stream doesn't exist or belongs to another tenant. A batcher with
+        producers is never idled out.
+        """
+        batcher = await self._get(stream_id, tenant)
+        if batcher is None:
+            yield None
+            return
+
+        batcher.producers += 1
+        try:
+            yield batcher
+        finally:
+            batcher.producers -= 1
+
+    def stats(self, stream_id: str) -> Optional[Dict[str, Any]]:
+        """This worker's counters for a stream, if it has a batcher for it"""
+        batcher = self._batchers.get(stream_id)
+        if batcher is None:
+            return None
+        return {**batcher.stats, "queued": batcher.queue.qsize(), "closed": batcher.closed}
+
+    async def close(self, stream_id: str):
+        batcher = self._batchers.pop(stream_id, None)
+        if batcher:
+            await batcher.close()
+
+    async def close_all(self):
+        await asyncio.gather(*[self.close(stream_id) for stream_id in list(self._batchers)])
+
+
+_manager: Optional[StreamManager] = None
+
+def get_stream_manager() -> StreamManager:
+    """Get or create the stream manager for this process"""
+    global _manager
+    if _manager is None:
+        _manager = StreamManager()
+    return _manager
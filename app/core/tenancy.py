@@ -0,0 +1,145 @@
+# app/core/tenancy.py
+"""
+Tenants identified by API key, with per-tenant rate limits and scheduling weights.
+
+``API_KEYS`` lists keys as ``tenant:key``, or bare ``key`` for a tenant of
+its own; ``API_KEY`` is a key of the default tenant. ``TENANT_WEIGHTS`` and ``TENANT_RATE_LIMITS`` override the weight
+(share of job worker capacity) and requests per second of named tenants.
+The index is parsed once; looking a key up is a dict access.
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Tenant of requests when no API keys are configured, and of jobs queued before tenants existed
+DEFAULT_TENANT = "default"
+
+
+class Tenant:
+    def __init__(self, name: str, weight: float = 1.0, rate: float = 0.0, burst: int = 1):
+        self.name = name
+        self.weight = weight
+        self.rate = rate
+        self.burst = burst
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` acquisitions per second on average and bursts of up to
+    ``capacity``; a rate of 0 means unlimited
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+def _parse_pairs(spec: str, setting: str, minimum: float = 0.0) -> Dict[str, float]:
+    """Parse ``name=number`` pairs, e.g. TENANT_WEIGHTS=analytics=3,batch=1"""
+    values = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, value = item.partition("=")
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        if not sep or number is None or number < minimum:
+            raise ValueError(f"Invalid {setting} entry {item!r}, expected name=number")
+        values[name.strip()] = number
+    return values
+
+
+class TenantIndex:
+    """API key to tenant lookup, plus each tenant's token bucket"""
+
+    def __init__(self, api_keys: str, weights: str = "", rate_limits: str = "", default_rate: float = 0.0, burst: int = 1, default_key: str = ""):
+        weight_overrides = _parse_pairs(weights, "TENANT_WEIGHTS", minimum=1e-9)
+        rate_overrides = _parse_pairs(rate_limits, "TENANT_RATE_LIMITS")
+
+        def tenant(name: str) -> Tenant:
+            return Tenant(
+                name,
+                weight=weight_overrides.get(name, 1.0),
+                rate=rate_overrides.get(name, default_rate),
+                burst=burst
+            )
+
+        self.tenants: Dict[str, Tenant] = {}
+        self._by_key: Dict[str, Tenant] = {}
+        for entry in filter(None, (part.strip() for part in api_keys.split(","))):
+            name, sep, key = entry.partition(":")
+            if not sep:
+                # A bare key gets a tenant named after its fingerprint, never the key itself
+                key, name = entry, f"key-{hashlib.sha256(entry.encode()).hexdigest()[:8]}"
+            if not name or not key:
+                raise ValueError("Invalid API_KEYS entry, expected tenant:key or key")
+            if key in self._by_key:
+                raise ValueError(f"API key for tenant {name} is also assigned to {self._by_key[key].name}")
+            self._by_key[key] = self.tenants.setdefault(name, tenant(name))
+
+        self.default = self.tenants.get(DEFAULT_TENANT) or tenant(DEFAULT_TENANT)
+        if default_key and default_key not in self._by_key:
+            self._by_key[default_key] = self.tenants.setdefault(DEFAULT_TENANT, self.default)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any API keys are configured; without them every request is refused"""
+        return bool(self._by_key)
+
+    def lookup(self, api_key: Optional[str]) -> Optional[Tenant]:
+        if not api_key:
+            return None
+        return self._by_key.get(api_key)
+
+    def acquire(self, tenant: Tenant) -> float:
+        """Charge one request to a tenant; 0 if allowed, else seconds to wait"""
+        bucket = self._buckets.get(tenant.name)
+        if bucket is None:
+            bucket = self._buckets.setdefault(tenant.name, TokenBucket(tenant.rate, tenant.burst))
+        return bucket.acquire()
+
+
+_index: Optional[TenantIndex] = None
+
+def get_tenant_index() -> TenantIndex:
+    """Build the tenant index from settings on first use"""
+    global _index
+    if _index is None:
+        _index = TenantIndex(
+            settings.API_KEYS,
+            weights=settings.TENANT_WEIGHTS,
+            rate_limits=settings.TENANT_RATE_LIMITS,
+            default_rate=settings.RATE_LIMIT_PER_SECOND,
+            burst=settings.RATE_LIMIT_BURST,
+            default_key=settings.API_KEY
+        )
+        if _index.enabled:
+            logger.info(f"Loaded API keys for {len(_index.tenants)} tenants")
+        else:
+            logger.warning("No API_KEY or API_KEYS configured, every request will be refused")
+    return _index
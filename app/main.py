@@ -1,9 +1,15 @@
 from fastapi import FastAPI, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import router
+from app.api.routes import router, health_router
+from app.api.dependencies import initialize_backends
 from app.core.monitoring import setup_monitoring
+from app.core.job_registry import JobWorker, get_job_registry
+from app.core.tenancy import get_tenant_index
+import asyncio
 import logging
-from config.logging_config import setup_logging
+import sys
+from config.logging_config import setup_logging, shutdown_logging
+from config.settings import settings
 
 
 setup_logging()
@@ -28,11 +34,47 @@ setup_monitoring(app)
 
 
 app.include_router(router)
+app.include_router(health_router)
+
+async def run_ingest_job(job_id: str, payload: dict) -> bool:
+    # Imported on first use so the data processing stack stays off the startup path
+    from app.core.data_processor import run_ingest_job as run
+    return await run(job_id, payload)
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Azure Data Pipeline service")
+    # Parsed once here, so a bad API_KEYS entry fails startup instead of a request
+    get_tenant_index()
+    
+    # Don't block startup on Azure round trips; /health/ready reports when this is done
+    app.state.backend_init = asyncio.create_task(initialize_backends())
+    
+    app.state.job_worker = JobWorker(
+        get_job_registry(),
+        {"ingest": run_ingest_job},
+        concurrency=settings.MAX_WORKERS,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_delay=settings.JOB_RETRY_DELAY
+    )
+    app.state.job_worker.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("Shutting down Azure Data Pipeline service")
\ No newline at end of file
+    logger.info("Shutting down Azure Data Pipeline service")
+    backend_init = getattr(app.state, "backend_init", None)
+    if backend_init and not backend_init.done():
+        backend_init.cancel()
+    
+    job_worker = getattr(app.state, "job_worker", None)
+    if job_worker:
+        # Unfinished jobs are picked up by other workers once their leases expire
+        await job_worker.stop()
+    
+    if "app.core.streaming" in sys.modules:
+        # Flush what producers already pushed to this worker
+        await sys.modules["app.core.streaming"].get_stream_manager().close_all()
+    
+    shutdown_logging()
\ No newline at end of file
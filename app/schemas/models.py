@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field, HttpUrl, validator
 from typing import List, Dict, Any, Optional, Union
 from enum import Enum
 import datetime
+from app.core.expressions import parse_expression, parse_assignments
 
 class SourceType(str, Enum):
     API = "api"
@@ -29,7 +30,34 @@ class Transformation(BaseModel):
     mapping: Optional[Dict[str, str]] = None  
     group_by: Optional[List[str]] = None  
     aggregations: Optional[Dict[str, str]] = None  
-    code: Optional[str] = None  
+    code: Optional[str] = None  # ``column = expression`` statements, see app.core.expressions
+    
+    @validator('condition', always=True)
+    def validate_condition(cls, v, values):
+        if values.get('type') == TransformationType.FILTER:
+            if not v:
+                raise ValueError("condition is required for filter transformations")
+            parse_expression(v)
+        return v
+    
+    @validator('code', always=True)
+    def validate_code(cls, v, values):
+        if values.get('type') == TransformationType.CUSTOM:
+            if not v:
+                raise ValueError("code is required for custom transformations")
+            parse_assignments(v)
+        return v
+
+def check_destinations(v: Union[str, List[str]]) -> Union[str, List[str]]:
+    destinations = [v] if isinstance(v, str) else v
+    if not destinations:
+        raise ValueError("At least one destination is required")
+    if len(set(destinations)) != len(destinations):
+        raise ValueError("Destinations must be unique")
+    for destination in destinations:
+        if not (destination.startswith("blob:") or destination.startswith("eventhub:")):
+            raise ValueError("Destination must start with 'blob:' or 'eventhub:'")
+    return v
 
 class DataSourceConfig(BaseModel):
     source_type: SourceType
@@ -38,13 +66,13 @@ class DataSourceConfig(BaseModel):
     source_query: Optional[str] = None  
     file_format: Optional[FileFormat] = None  
     transformations: Optional[List[Transformation]] = None
-    destination: str  
+    destination: Union[str, List[str]]
+    partition_by: Optional[List[str]] = None  # blob sinks only, Hive-style col=value directories
+    rows_per_file: Optional[int] = Field(None, gt=0)  # blob sinks only, max rows per part
     
     @validator('destination')
     def validate_destination(cls, v):
-        if not (v.startswith("blob:") or v.startswith("eventhub:")):
-            raise ValueError("Destination must start with 'blob:' or 'eventhub:'")
-        return v
+        return check_destinations(v)
     
     @validator('source_query')
     def validate_source_query(cls, v, values):
@@ -57,6 +85,31 @@ class DataSourceConfig(BaseModel):
         if values.get('source_type') == SourceType.FILE and not v:
             raise ValueError("file_format is required for file sources")
         return v
+    
+    @property
+    def destinations(self) -> List[str]:
+        """All sinks the job writes to, whether one or many were given"""
+        return [self.destination] if isinstance(self.destination, str) else list(self.destination)
+
+class StreamConfig(BaseModel):
+    transformations: Optional[List[Transformation]] = None  # applied to each micro-batch
+    destination: Union[str, List[str]]  # blob: sinks are append blobs of NDJSON; {date} and {hour} expand per batch
+    max_batch_records: Optional[int] = Field(None, gt=0)  # defaults to STREAM_MAX_BATCH_RECORDS
+    max_batch_seconds: Optional[float] = Field(None, gt=0)  # defaults to STREAM_MAX_BATCH_SECONDS
+    
+    @validator('destination')
+    def validate_destination(cls, v):
+        return check_destinations(v)
+    
+    @property
+    def destinations(self) -> List[str]:
+        """All sinks the stream writes to, whether one or many were given"""
+        return [self.destination] if isinstance(self.destination, str) else list(self.destination)
+
+class StreamStatus(BaseModel):
+    stream_id: str
+    status: str
+    details: Optional[Dict[str, Any]] = None
 
 class JobStatus(BaseModel):
     job_id: str
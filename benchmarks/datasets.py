@@ -0,0 +1,52 @@
+# benchmarks/datasets.py
+"""Synthetic datasets shaped like a typical sales feed"""
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+REGIONS = ["emea", "apac", "amer", "latam", "mena", "nordics", "dach", "benelux"]
+PRODUCTS = [f"sku-{i:05d}" for i in range(5000)]
+
+
+def generate(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Build a DataFrame with numeric, low- and high-cardinality string and date columns"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01")
+
+    return pd.DataFrame({
+        "id": np.arange(rows, dtype=np.int64),
+        "region": rng.choice(REGIONS, rows),
+        "product": rng.choice(PRODUCTS, rows),
+        "customer": [f"cust-{value:08x}" for value in rng.integers(0, 2 ** 31, rows)],
+        "order_date": (start + rng.integers(0, 365, rows).astype("timedelta64[D]")).astype(str),
+        "quantity": rng.integers(1, 50, rows),
+        "price": rng.gamma(2.0, 20.0, rows).round(2),
+        "discount": np.where(rng.random(rows) < 0.2, np.nan, rng.random(rows).round(2)),
+    })
+
+
+def write(df: pd.DataFrame, directory: str, formats=("csv", "parquet", "json")) -> Dict[str, str]:
+    """Write a dataset in each format and return ``{format: path}``"""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+
+    for file_format in formats:
+        if file_format == "csv":
+            path = os.path.join(directory, "data.csv")
+            df.to_csv(path, index=False)
+        elif file_format == "parquet":
+            path = os.path.join(directory, "data.parquet")
+            df.to_parquet(path, index=False)
+        elif file_format == "json":
+            path = os.path.join(directory, "data.json")
+            df.to_json(path, orient="records")
+        elif file_format == "ndjson":
+            path = os.path.join(directory, "data.ndjson")
+            df.to_json(path, orient="records", lines=True)
+        else:
+            raise ValueError(f"Unsupported benchmark format: {file_format}")
+        paths[file_format] = path
+
+    return paths
@@ -0,0 +1,241 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for the Azure services and remote sources used by the pipeline.
+
+``FakeAzureClient`` is the real ``AzureClient`` with its Blob, Event Hub and
+Table SDK clients swapped for in-memory ones, so the client's own batching,
+block splitting and retries run as in production. The fakes enforce the
+service limits that code relies on and can add a fixed latency to every
+service call to approximate network round trips. ``SourceServer`` is an
+in-process aiohttp server that serves synthetic datasets to the ``api`` and
+``file`` (http) source types.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+from azure.eventhub import EventDataBatch
+from azure.storage.blob import BlobProperties
+
+from app.core.azure_client import AzureClient
+
+# Service limits of append blobs and of Event Hub (standard tier) messages
+MAX_APPEND_BLOCK_BYTES = 4 * 1024 * 1024
+MAX_APPEND_BLOCKS = 50000
+MAX_EVENT_BATCH_BYTES = 1046528
+
+
+def _service_error(status: int, message: str) -> HttpResponseError:
+    error = HttpResponseError(message=message)
+    error.status_code = status
+    return error
+
+
+class _FakeService:
+    """Base of the fake SDK clients: async context managers with per-call latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def _round_trip(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeBlobService(_FakeService):
+    """
+    Blob service over ``blobs``, which maps ``container/path`` to the blob's
+    size, whether it is an append blob and its committed block count. Only
+    sizes are kept so large benchmark runs don't double their memory use.
+    """
+
+    def __init__(self, client: "FakeAzureClient"):
+        super().__init__(client.latency)
+        self.client = client
+
+    def get_container_client(self, container_name: str) -> "FakeContainer":
+        return FakeContainer(self, container_name)
+
+    def get_blob_client(self, container: str, blob: str) -> "FakeBlob":
+        return FakeBlob(self, f"{container}/{blob}")
+
+
+class FakeContainer:
+    def __init__(self, service: FakeBlobService, container_name: str):
+        self.service = service
+        self.container_name = container_name
+
+    def get_blob_client(self, blob: str) -> "FakeBlob":
+        return self.service.get_blob_client(self.container_name, blob)
+
+    async def list_blobs(self, name_starts_with: Optional[str] = None, **kwargs):
+        await self.service._round_trip()
+        prefix = f"{self.container_name}/{name_starts_with or ''}"
+        for key in [key for key in self.service.client.blobs if key.startswith(prefix)]:
+            yield BlobProperties(name=key[len(self.container_name) + 1:])
+
+    async def delete_blob(self, blob: str, **kwargs):
+        await self.service._round_trip()
+        if self.service.client.blobs.pop(f"{self.container_name}/{blob}", None) is None:
+            raise ResourceNotFoundError(f"Blob {self.container_name}/{blob} does not exist")
+
+
+class FakeBlob:
+    def __init__(self, service: FakeBlobService, key: str):
+        self.service = service
+        self.client = service.client
+        self.key = key
+
+    async def upload_blob(self, data: bytes, overwrite: bool = False, **kwargs):
+        await self.service._round_trip()
+        if self.key in self.client.blobs and not overwrite:
+            raise ResourceExistsError(f"Blob {self.key} already exists")
+        self.client.blobs[self.key] = {"size": len(data), "append": False, "blocks": 1}
+        self.client.bytes_written += len(data)
+
+    async def create_append_blob(self, if_none_match: Optional[str] = None, **kwargs):
+        await self.service._round_trip()
+        if self.key in self.client.blobs and if_none_match == "*":
+            raise ResourceExistsError(f"Blob {self.key} already exists")
+        self.client.blobs[self.key] = {"size": 0, "append": True, "blocks": 0}
+
+    async def append_block(self, data: bytes, **kwargs):
+        await self.service._round_trip()
+        blob = self.client.blobs.get(self.key)
+        if blob is None:
+            raise ResourceNotFoundError(f"Blob {self.key} does not exist")
+        if not blob["append"]:
+            raise _service_error(409, f"Blob {self.key} is not an append blob")
+        if len(data) > MAX_APPEND_BLOCK_BYTES:
+            raise _service_error(413, f"Block of {len(data)} bytes exceeds {MAX_APPEND_BLOCK_BYTES}")
+        if blob["blocks"] >= MAX_APPEND_BLOCKS:
+            raise _service_error(409, f"Blob {self.key} has reached {MAX_APPEND_BLOCKS} blocks")
+        blob["size"] += len(data)
+        blob["blocks"] += 1
+        self.client.bytes_written += len(data)
+
+
+class FakeEventHubProducer(_FakeService):
+    """Producer for one Event Hub; batches are the SDK's own, size limits included"""
+
+    def __init__(self, client: "FakeAzureClient", event_hub_name: str):
+        super().__init__(client.latency)
+        self.client = client
+        self.event_hub_name = event_hub_name
+
+    async def create_batch(self, max_size_in_bytes: Optional[int] = None, **kwargs) -> EventDataBatch:
+        return EventDataBatch(max_size_in_bytes=min(max_size_in_bytes or MAX_EVENT_BATCH_BYTES, MAX_EVENT_BATCH_BYTES))
+
+    async def send_batch(self, batch: EventDataBatch, **kwargs):
+        await self._round_trip()
+        self.client.events[self.event_hub_name] = self.client.events.get(self.event_hub_name, 0) + len(batch)
+        self.client.event_batches += 1
+        self.client.bytes_written += batch.size_in_bytes
+
+
+class FakeTableService(_FakeService):
+    def __init__(self, client: "FakeAzureClient"):
+        super().__init__(client.latency)
+        self.client = client
+
+    async def create_table(self, table_name: str):
+        await self._round_trip()
+        if table_name in self.client.tables:
+            raise ResourceExistsError(f"Table {table_name} already exists")
+        self.client.tables[table_name] = {}
+
+    def get_table_client(self, table_name: str) -> "FakeTable":
+        return FakeTable(self, table_name)
+
+
+class FakeTable:
+    def __init__(self, service: FakeTableService, table_name: str):
+        self.service = service
+        self.table_name = table_name
+
+    def _entities(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        entities = self.service.client.tables.get(self.table_name)
+        if entities is None:
+            raise ResourceNotFoundError(f"Table {self.table_name} does not exist")
+        return entities
+
+    async def upsert_entity(self, entity: Dict[str, Any], **kwargs):
+        await self.service._round_trip()
+        self._entities()[(entity["PartitionKey"], entity["RowKey"])] = dict(entity)
+
+    async def get_entity(self, partition_key: str, row_key: str, **kwargs) -> Dict[str, Any]:
+        await self.service._round_trip()
+        entity = self._entities().get((partition_key, row_key))
+        if entity is None:
+            raise ResourceNotFoundError(f"Entity {partition_key}/{row_key} does not exist")
+        return dict(entity)
+
+
+class FakeAzureClient(AzureClient):
+    """AzureClient whose Blob, Event Hub and Table SDK clients stay in process"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.blobs: Dict[str, Dict[str, Any]] = {}
+        self.events: Dict[str, int] = {}
+        self.tables: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self.event_batches = 0
+        self.bytes_written = 0
+
+    def _blob_service(self) -> FakeBlobService:
+        return FakeBlobService(self)
+
+    def _event_hub_producer(self, event_hub_name: str) -> FakeEventHubProducer:
+        return FakeEventHubProducer(self, event_hub_name)
+
+    def _table_service(self) -> FakeTableService:
+        return FakeTableService(self)
+
+
+class SourceServer:
+    """In-process HTTP server for API records and downloadable dataset files"""
+
+    def __init__(self, records: List[Dict[str, Any]], files_dir: Optional[str] = None):
+        self.records = records
+        self.files_dir = files_dir
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    async def _records(self, request: web.Request) -> web.Response:
+        limit = int(request.query.get("limit", len(self.records)))
+        return web.json_response({"data": self.records[:limit]})
+
+    async def _file(self, request: web.Request) -> web.StreamResponse:
+        path = os.path.join(self.files_dir, os.path.basename(request.match_info["name"]))
+        if not os.path.exists(path):
+            raise web.HTTPNotFound()
+        return web.FileResponse(path)
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/records", self._records)
+        if self.files_dir:
+            app.router.add_get("/files/{name}", self._file)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
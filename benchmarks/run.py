@@ -0,0 +1,342 @@
+# benchmarks/run.py
+"""
+Run the end-to-end benchmarks.
+
+    python -m benchmarks.run --rows 1000000
+    python -m benchmarks.run --rows 1000000 --save-baseline
+    python -m benchmarks.run --rows 1000000 --compare        # exit 1 on regression
+
+Pipeline scenarios drive ``process_data`` over synthetic CSV/Parquet/JSON
+files and an HTTP API source; endpoint scenarios drive ``/api/v1`` through
+an in-process ASGI transport, including NDJSON pushes to a stream. All Azure
+calls go through ``FakeAzureClient`` to in-memory SDK clients.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+from benchmarks import datasets
+from benchmarks.fakes import FakeAzureClient, SourceServer
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Metrics where a larger number is better; everything else is "lower is better"
+HIGHER_IS_BETTER = {"rows_per_s", "mb_per_s", "requests_per_s"}
+COMPARED_METRICS = ("rows_per_s", "mb_per_s", "requests_per_s", "peak_rss_mb", "p50_ms", "p99_ms")
+
+
+class PeakRSS:
+    """Sample this process's resident set size in a background thread"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+    @property
+    def peak_mb(self) -> float:
+        return self.peak / (1024 * 1024)
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def _run_job(client: FakeAzureClient, config_fields: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.data_processor import process_data
+    from app.schemas.models import DataSourceConfig
+
+    job_id = client.generate_job_id()
+    await process_data(job_id, DataSourceConfig(**config_fields), client)
+    job = await client.get_job_status(job_id)
+    if job is None or job["status"] != "completed":
+        raise RuntimeError(f"Benchmark job failed: {job and job['details']}")
+    return job
+
+
+async def bench_pipeline(name: str, config_fields: Dict[str, Any], rows: int, input_bytes: int, repeat: int, latency: float) -> Dict[str, Any]:
+    """Time process_data end to end; the first run also warms the schema cache"""
+    timings = []
+    peak_mb = 0.0
+
+    for _ in range(repeat):
+        client = FakeAzureClient(latency=latency)
+        await client.initialize()
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            await _run_job(client, config_fields)
+            timings.append(time.perf_counter() - start)
+        peak_mb = max(peak_mb, rss.peak_mb)
+
+    seconds = statistics.median(timings)
+    return {
+        "scenario": name,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_s": round(rows / seconds, 1),
+        "mb_per_s": round(input_bytes / (1024 * 1024) / seconds, 2),
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+
+async def bench_endpoint(name: str, send: Callable, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Issue ``requests`` calls with bounded concurrency and report latency percentiles"""
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name} returned {response.status_code}: {response.text}")
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "scenario": name,
+        "requests": requests,
+        "requests_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "peak_rss_mb": round(rss.peak_mb, 1),
+    }
+
+
+async def bench_stream(http, client: FakeAzureClient, records: List[Dict[str, Any]], producers: int) -> Dict[str, Any]:
+    """Push records to a stream as NDJSON from concurrent producers until all reach Event Hub"""
+    response = await http.post("/api/v1/streams", json={"destination": "eventhub:stream-bench"})
+    response.raise_for_status()
+    stream_id = response.json()["stream_id"]
+
+    lines = [json.dumps(record, default=str).encode("utf-8") + b"\n" for record in records]
+    size = sum(len(line) for line in lines)
+    bodies = [b"".join(lines[i::producers]) for i in range(producers)]
+
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[http.post(f"/api/v1/streams/{stream_id}/records", content=body) for body in bodies])
+        # Deleting flushes what is still queued
+        await http.delete(f"/api/v1/streams/{stream_id}")
+        elapsed = time.perf_counter() - start
+
+    for response in responses:
+        response.raise_for_status()
+    if client.events.get("stream-bench", 0) != len(records):
+        raise RuntimeError(f"Stream delivered {client.events.get('stream-bench', 0)} of {len(records)} records")
+
+    return {
+        "scenario": "endpoint/stream-ndjson",
+        "rows": len(records),
+        "seconds": round(elapsed, 4),
+        "rows_per_s": round(len(records) / elapsed, 1),
+        "mb_per_s": round(size / (1024 * 1024) / elapsed, 2),
+        "peak_rss_mb": round(rss.peak_mb, 1),
+    }
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    import httpx
+
+    from app.api import dependencies
+    from config.settings import settings
+
+    workdir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    # Start from an empty schema cache so the first run of each feed learns it
+    settings.SCHEMA_CACHE_DIR = os.path.join(workdir, "schemas")
+    settings.JOB_REGISTRY_PATH = os.path.join(workdir, "registry.db")
+    settings.CHECKPOINT_DIR = os.path.join(workdir, "checkpoints")
+    settings.LOG_DIR = os.path.join(workdir, "logs")
+
+    df = datasets.generate(args.rows)
+    paths = datasets.write(df, os.path.join(workdir, "data"), args.formats)
+    api_records = datasets.generate(min(args.rows, args.api_rows)).to_dict(orient="records")
+    del df
+
+    server = SourceServer(api_records, os.path.join(workdir, "data"))
+    base_url = await server.start()
+    results = []
+
+    try:
+        transformations = [
+            {"type": "filter", "condition": "quantity > 5 and region != 'mena'"},
+            {"type": "custom", "code": "total = price * quantity * (1 - coalesce(discount, 0))"},
+        ]
+
+        for file_format, path in paths.items():
+            source_format = "json" if file_format == "ndjson" else file_format
+            size = os.path.getsize(path)
+            base = {"source_type": "file", "source_url": path, "file_format": source_format}
+
+            if file_format != "ndjson":
+                # Whole-file reads expect a JSON array; NDJSON is only read by the streaming path
+                results.append(await bench_pipeline(
+                    f"pipeline/{file_format}",
+                    {**base, "transformations": transformations, "destination": f"blob:bench/out.{source_format}"},
+                    args.rows, size, args.repeat, args.latency
+                ))
+
+            if source_format in ("csv", "parquet") or file_format == "ndjson":
+                results.append(await bench_pipeline(
+                    f"aggregate/{file_format}",
+                    {**base, "transformations": transformations + [{
+                        "type": "aggregate",
+                        "group_by": ["region", "product"],
+                        "aggregations": {"total": "sum", "price": "approx_p95", "customer": "approx_distinct"},
+                    }], "destination": "blob:bench/agg.parquet"},
+                    args.rows, size, args.repeat, args.latency
+                ))
+
+        if "parquet" in paths:
+            results.append(await bench_pipeline(
+                "fanout/parquet-partitioned",
+                {
+                    "source_type": "file", "source_url": paths["parquet"], "file_format": "parquet",
+                    "destination": ["blob:bench/archive", "blob:bench/lake"],
+                    "partition_by": ["region"], "rows_per_file": 250000,
+                },
+                args.rows, os.path.getsize(paths["parquet"]), args.repeat, args.latency
+            ))
+
+        results.append(await bench_pipeline(
+            "pipeline/api-to-eventhub",
+            {"source_type": "api", "source_url": f"{base_url}/records", "destination": "eventhub:bench"},
+            len(api_records), len(json.dumps(api_records[:1000], default=str)) * len(api_records) // 1000,
+            args.repeat, args.latency
+        ))
+
+        # Endpoints, served in process with the fake client injected
+        from app.main import app
+
+        client = FakeAzureClient(latency=args.latency)
+        await client.initialize()
+        dependencies._azure_client = client
+        app.dependency_overrides[dependencies.get_azure_client] = lambda: client
+
+        job = await _run_job(client, {"source_type": "api", "source_url": f"{base_url}/records?limit=10", "destination": "eventhub:bench"})
+        ingest_body = {"source_type": "api", "source_url": f"{base_url}/records", "source_params": {"limit": 10}, "destination": "eventhub:bench"}
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {os.environ['API_KEY']}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as http:
+            results.append(await bench_endpoint(
+                "endpoint/status",
+                lambda: http.get(f"/api/v1/status/{job['job_id']}"),
+                args.requests, args.concurrency
+            ))
+            results.append(await bench_endpoint(
+                "endpoint/ingest",
+                lambda: http.post("/api/v1/ingest", json=ingest_body),
+                args.requests, args.concurrency
+            ))
+            results.append(await bench_endpoint(
+                "endpoint/ingest-file",
+                lambda: http.post("/api/v1/ingest/file", files={"file": ("f.csv", b"a,b\n1,2\n", "text/csv")}, data={"destination": "bench/upload.csv"}),
+                args.requests, args.concurrency
+            ))
+            results.append(await bench_stream(http, client, api_records, args.concurrency))
+    finally:
+        await server.stop()
+
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``"""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["scenario"])
+        if not previous:
+            continue
+
+        for metric in COMPARED_METRICS:
+            if metric not in result or metric not in previous or not previous[metric]:
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(
+                    f"{result['scenario']} {metric}: {previous[metric]} -> {result[metric]} ({change:+.1%})"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Azure Data Pipeline benchmarks")
+    parser.add_argument("--rows", type=int, default=200000, help="rows per synthetic dataset")
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "json", "ndjson"])
+    parser.add_argument("--api-rows", type=int, default=50000, help="records served by the fake API source")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per pipeline scenario (median is reported)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per Azure call")
+    parser.add_argument("--baseline", default="default", help="baseline name under benchmarks/baselines")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    for result in results:
+        print(json.dumps(result))
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.baseline}.json")
+
+    if args.compare:
+        if not os.path.exists(baseline_path):
+            print(f"No baseline at {baseline_path}", file=sys.stderr)
+            return 2
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump({
+                "rows": args.rows,
+                "cpu_count": os.cpu_count(),
+                "python": sys.version.split()[0],
+                "results": {result["scenario"]: result for result in results},
+            }, f, indent=2)
+        print(f"Saved baseline to {baseline_path}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# benchmarks/scaling.py
+"""
+Measure how job throughput scales with uvicorn worker processes.
+
+    python -m benchmarks.scaling --workers 1 2 4 8 --jobs 400
+
+For each worker count a server is started with ``--factory`` so every worker
+process uses ``FakeAzureClient``. Jobs are submitted to ``/api/v1/ingest``
+with an API source served by this process, and the shared SQLite registry is
+polled until every job has finished. The registry also confirms that no job
+ran more than once.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks import datasets
+from benchmarks.fakes import FakeAzureClient, SourceServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_app():
+    """uvicorn --factory entry point: the real app wired to in-memory Azure fakes"""
+    from app.api import dependencies
+    from app.main import app
+
+    client = FakeAzureClient(latency=float(os.environ.get("BENCH_AZURE_LATENCY", "0")))
+    dependencies._azure_client = client
+    app.dependency_overrides[dependencies.get_azure_client] = lambda: client
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _registry_counts(path: str) -> Dict[str, Any]:
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        max_attempts = conn.execute("SELECT COALESCE(MAX(attempts), 0) FROM jobs").fetchone()[0]
+        return {"counts": counts, "max_attempts": max_attempts}
+    finally:
+        conn.close()
+
+
+async def measure(workers: int, jobs: int, rows_per_job: int, source_url: str, latency: float, concurrency: int) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="pipeline-scaling-")
+    registry_path = os.path.join(workdir, "registry.db")
+    multiproc_dir = os.path.join(workdir, "prometheus")
+    os.makedirs(multiproc_dir)
+
+    port = _free_port()
+    env = {
+        **os.environ,
+        "JOB_REGISTRY_PATH": registry_path,
+        "CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "PROMETHEUS_MULTIPROC_DIR": multiproc_dir,
+        "JOB_POLL_INTERVAL": "0.05",
+        "BENCH_AZURE_LATENCY": str(latency),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.scaling:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+    try:
+        headers = {"Authorization": f"Bearer {os.environ['API_KEY']}"}
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30, headers=headers) as http:
+            for _ in range(600):
+                try:
+                    if (await http.get("/health/live")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError("Server did not start")
+
+            body = {"source_type": "api", "source_url": source_url, "source_params": {"limit": rows_per_job}, "destination": "eventhub:bench"}
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def submit():
+                async with semaphore:
+                    response = await http.post("/api/v1/ingest", json=body)
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*[submit() for _ in range(jobs)])
+            submitted = time.perf_counter() - start
+
+            while True:
+                state = _registry_counts(registry_path)
+                if sum(n for status, n in state["counts"].items() if status not in ("pending", "running")) >= jobs:
+                    break
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "workers": workers,
+        "jobs": jobs,
+        "submit_per_s": round(jobs / submitted, 1),
+        "jobs_per_s": round(jobs / elapsed, 1),
+        "rows_per_s": round(jobs * rows_per_job / elapsed, 1),
+        "statuses": state["counts"],
+        "max_attempts": state["max_attempts"],
+    }
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    records = datasets.generate(args.rows_per_job).to_dict(orient="records")
+    source = SourceServer(records)
+    base_url = await source.start()
+
+    try:
+        results = []
+        for workers in args.workers:
+            result = await measure(workers, args.jobs, args.rows_per_job, f"{base_url}/records", args.latency, args.concurrency)
+            print(json.dumps(result))
+            results.append(result)
+        return results
+    finally:
+        await source.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Worker scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--rows-per-job", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per Azure call")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    # A job claimed twice would show attempts > 1 without any worker having died
+    return 0 if all(result["max_attempts"] <= 1 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
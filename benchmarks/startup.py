@@ -0,0 +1,95 @@
+# benchmarks/startup.py
+"""
+Measure cold start: how long a fresh process takes to import the app and to
+answer ``/health/live`` under uvicorn.
+
+    python -m benchmarks.startup --runs 5 --target 1.0   # exit 1 if over target
+"""
+import argparse
+import os
+import socket
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _isolated_env(workdir: str) -> Dict[str, str]:
+    """Environment that keeps the logs, job registry and checkpoints of a run out of the checkout"""
+    return {
+        **os.environ,
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "JOB_REGISTRY_PATH": os.path.join(workdir, "registry.db"),
+        "CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+    }
+
+
+def time_import(env: Dict[str, str]) -> float:
+    """Seconds for a fresh interpreter to import and construct the app"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def time_to_live(env: Dict[str, str], timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until /health/live returns 200"""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health/live", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"/health/live did not respond within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold start measurement")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=1.0, help="maximum median seconds to /health/live")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="pipeline-startup-")
+    try:
+        env = _isolated_env(workdir)
+        imports = [time_import(env) for _ in range(args.runs)]
+        lives = [time_to_live(env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import_median = statistics.median(imports)
+    live_median = statistics.median(lives)
+    print(f"import app.main: median {import_median:.3f}s, max {max(imports):.3f}s")
+    print(f"time to /health/live: median {live_median:.3f}s, max {max(lives):.3f}s (target {args.target:.2f}s)")
+
+    return 0 if live_median <= args.target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
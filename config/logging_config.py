@@ -1,36 +1,221 @@
+import atexit
+import contextvars
+import datetime
+import json
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, Optional
 from config.settings import settings
 
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Fields attached to every record logged in the current context, e.g. job_id
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "context"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["ContextQueueHandler"] = None
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Attach fields such as job_id to every record logged inside the block, including by tasks it starts"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the log context and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", None) or {})
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, with the log context appended"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            text += " [" + " ".join(f"{key}={value}" for key, value in context.items()) + "]"
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the DEBUG and INFO records of selected loggers and
+    their children, e.g. every tenth at 0.1. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+        # Approximate under concurrent logging from several threads, which is fine for sampling
+        self._credit: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+
+        rate = self._rate(record.name)
+        if rate >= 1:
+            return True
+
+        credit = self._credit.get(record.name, 1.0 - rate) + rate
+        if credit >= 1:
+            self._credit[record.name] = credit - 1
+            return True
+        self._credit[record.name] = credit
+        return False
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse LOG_SAMPLING, e.g. ``app.core.azure_client=0.1,app.core.streaming=0.01``"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, rate = item.partition("=")
+        if not sep or not 0 <= float(rate) <= 1:
+            raise ValueError(f"Invalid LOG_SAMPLING entry {item!r}, expected logger=rate with 0 <= rate <= 1")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking the caller. Only
+    the message is merged with its args (which may change after the call)
+    and the log context attached here; formatting and I/O happen on the
+    listener thread. Records beyond ``maxsize`` queued ones are dropped and
+    counted rather than waited on.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, maxsize: int):
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Updated in place rather than copied as the stdlib does: the record
+        # stays in this process and the merged message is the same for any
+        # handler that sees it later
+        record.msg = record.getMessage()
+        record.args = None
+        record.context = _log_context.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # SimpleQueue has no bound of its own but is much cheaper to put to than queue.Queue
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put(record)
+
+
 def setup_logging():
-    """Configure logging for the application"""
-    
-    os.makedirs("logs", exist_ok=True)
-    
+    """
+    Configure logging for the application.
+
+    Records go onto a bounded queue in the thread that logs them, and a
+    listener thread writes them to stdout and the rotating log file, so
+    logging never blocks the event loop on I/O. With several workers
+    (PROMETHEUS_MULTIPROC_DIR set) logs go to stdout only, since processes
+    sharing one RotatingFileHandler file lose records when it rotates.
+    """
+    global _listener, _queue_handler
+
     log_level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
-    
+    logger = logging.getLogger("azure_data_pipeline")
+    logger.setLevel(log_level)
+
+    if _listener is not None:
+        return logger
+
+    # Neither format shows the process, so skip looking it up on every call
+    logging.logMultiprocessing = False
+    logging.logProcesses = False
+
+    formatter = JsonFormatter() if settings.LOG_FORMAT.lower() == "json" else TextFormatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+
+    # Same check as app.core.monitoring.multiprocess_mode, which config can't import
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        os.makedirs(settings.LOG_DIR, exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            os.path.join(settings.LOG_DIR, "azure_data_pipeline.log"),
+            maxBytes=10*1024*1024,
+            backupCount=5
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _queue_handler = ContextQueueHandler(queue.SimpleQueue(), max(1, settings.LOG_QUEUE_SIZE))
+    sampling = parse_sampling(settings.LOG_SAMPLING)
+    if sampling:
+        _queue_handler.addFilter(SamplingFilter(sampling))
+
     # root logger
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            
-            logging.StreamHandler(sys.stdout),
-            
-            RotatingFileHandler(
-                "logs/azure_data_pipeline.log",
-                maxBytes=10*1024*1024,  
-                backupCount=5
-            )
-        ]
-    )
-    
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    root.handlers = [_queue_handler]
+
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
     logging.getLogger("azure").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
-    
-    logger = logging.getLogger("azure_data_pipeline")
-    logger.setLevel(log_level)
-    
-    return logger
\ No newline at end of file
+
+    return logger
+
+def dropped_records() -> int:
+    """Records discarded because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler else 0
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
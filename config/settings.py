@@ -1,11 +1,11 @@
 import os
+from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from dotenv import load_dotenv
 
 
-load_dotenv()
-
 class Settings(BaseSettings):
     """Application settings"""
     
@@ -18,9 +18,46 @@ class Settings(BaseSettings):
     
     
     LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
+    LOG_FORMAT: str = Field("json", env="LOG_FORMAT")  # json or text
+    LOG_DIR: str = Field("logs", env="LOG_DIR")
+    LOG_QUEUE_SIZE: int = Field(10000, env="LOG_QUEUE_SIZE")
+    LOG_SAMPLING: str = Field("", env="LOG_SAMPLING")  # e.g. app.core.azure_client=0.1,app.core.streaming=0.01
     API_KEY: str = Field(..., env="API_KEY")
+    API_KEYS: str = Field("", env="API_KEYS")  # tenant:key or key, comma separated
+    DEBUG: bool = Field(False, env="DEBUG")
+    TENANT_WEIGHTS: str = Field("", env="TENANT_WEIGHTS")  # e.g. analytics=3,batch=1
+    TENANT_RATE_LIMITS: str = Field("", env="TENANT_RATE_LIMITS")  # requests/s per tenant, e.g. batch=5
+    RATE_LIMIT_PER_SECOND: float = Field(0.0, env="RATE_LIMIT_PER_SECOND")  # default per tenant, 0 = unlimited
+    RATE_LIMIT_BURST: int = Field(20, env="RATE_LIMIT_BURST")
     MAX_WORKERS: int = Field(4, env="MAX_WORKERS")
     BATCH_SIZE: int = Field(1000, env="BATCH_SIZE")
+    SINK_MAX_RETRIES: int = Field(3, env="SINK_MAX_RETRIES")
+    SINK_RETRY_BACKOFF: float = Field(1.0, env="SINK_RETRY_BACKOFF")
+    SOURCE_MAX_RETRIES: int = Field(3, env="SOURCE_MAX_RETRIES")
+    SOURCE_RETRY_BACKOFF: float = Field(1.0, env="SOURCE_RETRY_BACKOFF")
+    RETRY_MAX_DELAY: float = Field(30.0, env="RETRY_MAX_DELAY")
+    BREAKER_FAILURE_THRESHOLD: int = Field(5, env="BREAKER_FAILURE_THRESHOLD")
+    BREAKER_RESET_SECONDS: float = Field(30.0, env="BREAKER_RESET_SECONDS")
+    BLOB_UPLOAD_CONCURRENCY: int = Field(8, env="BLOB_UPLOAD_CONCURRENCY")
+    SCHEMA_CACHE_ENABLED: bool = Field(True, env="SCHEMA_CACHE_ENABLED")
+    SCHEMA_CACHE_DIR: str = Field(".schema_cache", env="SCHEMA_CACHE_DIR")
+    STREAM_BATCH_SIZE: int = Field(100000, env="STREAM_BATCH_SIZE")
+    AGGREGATE_MAX_MEMORY_MB: int = Field(256, env="AGGREGATE_MAX_MEMORY_MB")
+    AGGREGATE_SPILL_PARTITIONS: int = Field(16, env="AGGREGATE_SPILL_PARTITIONS")
+    AGGREGATE_SPILL_DIR: Optional[str] = Field(None, env="AGGREGATE_SPILL_DIR")
+    JOB_REGISTRY_PATH: str = Field(".jobs/registry.db", env="JOB_REGISTRY_PATH")
+    JOB_LEASE_SECONDS: float = Field(60.0, env="JOB_LEASE_SECONDS")
+    JOB_POLL_INTERVAL: float = Field(1.0, env="JOB_POLL_INTERVAL")
+    JOB_MAX_ATTEMPTS: int = Field(3, env="JOB_MAX_ATTEMPTS")
+    JOB_RETRY_DELAY: float = Field(30.0, env="JOB_RETRY_DELAY")
+    CHECKPOINT_ENABLED: bool = Field(True, env="CHECKPOINT_ENABLED")
+    CHECKPOINT_DIR: str = Field(".jobs/checkpoints", env="CHECKPOINT_DIR")
+    CHECKPOINT_BATCH_ROWS: int = Field(10000, env="CHECKPOINT_BATCH_ROWS")
+    STREAM_MAX_BATCH_RECORDS: int = Field(500, env="STREAM_MAX_BATCH_RECORDS")
+    STREAM_MAX_BATCH_SECONDS: float = Field(1.0, env="STREAM_MAX_BATCH_SECONDS")
+    STREAM_QUEUE_SIZE: int = Field(10000, env="STREAM_QUEUE_SIZE")
+    STREAM_IDLE_SECONDS: float = Field(300.0, env="STREAM_IDLE_SECONDS")
+    STREAM_MAX_LINE_BYTES: int = Field(1024 * 1024, env="STREAM_MAX_LINE_BYTES")
     
     
     HOST: str = Field("0.0.0.0", env="HOST")
@@ -30,5 +67,22 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
 
+@lru_cache()
+def get_settings() -> Settings:
+    """Load settings from the environment (and .env) on first use"""
+    load_dotenv()
+    return Settings()
+
+
+class _LazySettings:
+    """Module-level stand-in that defers loading until a setting is read"""
+    
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+    
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+
 # instance
-settings = Settings()
\ No newline at end of file
+settings = _LazySettings()
\ No newline at end of file
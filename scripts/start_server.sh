@@ -0,0 +1,22 @@
+#!/usr/bin/env bash
+# Start the API server.
+#
+#   WORKERS=4 ./scripts/start_server.sh
+#
+# With WORKERS > 1 the workers share Prometheus metrics through
+# PROMETHEUS_MULTIPROC_DIR (served at /metrics on the API port) and claim
+# jobs from the SQLite registry at JOB_REGISTRY_PATH, so each job runs once.
+set -euo pipefail
+
+HOST="${HOST:-0.0.0.0}"
+PORT="${PORT:-8000}"
+WORKERS="${WORKERS:-1}"
+
+if [ "$WORKERS" -gt 1 ]; then
+    export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}"
+    # Metric files from a previous run would be summed into this one
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+exec uvicorn app.main:app --host "$HOST" --port "$PORT" --workers "$WORKERS" "$@"
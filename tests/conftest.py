@@ -0,0 +1,16 @@
+# tests/conftest.py
+"""
+Settings are required at import time; the tests never reach Azure, so
+placeholders are filled in for anything not already set.
+"""
+import os
+
+for _name in (
+    "AZURE_BLOB_CONNECTION_STRING",
+    "AZURE_EVENTHUB_CONNECTION_STRING",
+    "AZURE_TABLE_CONNECTION_STRING",
+    "AZURE_COSMOS_ENDPOINT",
+    "AZURE_COSMOS_KEY",
+    "API_KEY",
+):
+    os.environ.setdefault(_name, "test")
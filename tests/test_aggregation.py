@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.aggregation import HLL_SPARSE_MAX, StreamingAggregator, aggregate, aggregate_frame, is_streamable
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    rows = 50000
+    frame = pd.DataFrame({
+        "group": rng.integers(0, 2000, rows),
+        "region": rng.choice(["emea", "apac", "amer"], rows),
+        "customer": rng.integers(0, 100000, rows),
+        "amount": rng.normal(100, 20, rows),
+    })
+    frame.loc[frame.index[:50], "customer"] = np.nan
+    return frame
+
+
+def batches(frame, size=5000):
+    return [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+
+
+def test_native_functions_match_pandas(df):
+    aggregations = {"amount": "sum", "customer": "count"}
+    result = aggregate(batches(df), ["group", "region"], aggregations).set_index(["group", "region"])
+    expected = df.groupby(["group", "region"]).agg(aggregations)
+    pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index(), check_dtype=False)
+
+    mean = aggregate(batches(df), ["region"], {"amount": "mean"}).set_index("region")["amount"]
+    np.testing.assert_allclose(mean.sort_index(), df.groupby("region")["amount"].mean().sort_index())
+
+
+def test_approx_distinct_is_close(df):
+    result = aggregate(batches(df), ["region"], {"customer": "approx_distinct"}).set_index("region")["customer"]
+    exact = df.groupby("region")["customer"].nunique()
+    assert ((result / exact - 1).abs() < 0.05).all()
+
+
+def test_approx_distinct_small_groups_are_nearly_exact(df):
+    result = aggregate(batches(df), ["group"], {"customer": "approx_distinct"}).set_index("group")["customer"]
+    exact = df.groupby("group")["customer"].nunique()
+    # Linear counting: only register collisions cause error
+    error = (result - exact).abs()
+    assert error.max() <= 3 and error.mean() < 0.5
+
+
+def test_large_groups_move_to_dense_registers(df):
+    aggregator = StreamingAggregator(["region"], {"customer": "approx_distinct"})
+    for batch in batches(df):
+        aggregator.update(batch)
+    aggregator._flush_pending()
+
+    assert len(aggregator._state["customer__dense"]) == 3
+    assert len(aggregator._state["customer__hll"]) == 0
+    assert aggregator.memory_bytes() < 3 * 4096 + 10000
+    aggregator.close()
+
+
+def test_mixed_sparse_and_dense_groups(df):
+    # One group per region stays sparse; the rest of the rows form one dense group
+    df = df.copy()
+    df["bucket"] = np.where(df.index % 100 == 0, df["region"], "bulk")
+    result = aggregate(batches(df, 1000), ["bucket"], {"customer": "approx_distinct"}).set_index("bucket")["customer"]
+    exact = df.groupby("bucket")["customer"].nunique()
+    assert exact["emea"] < HLL_SPARSE_MAX
+    assert ((result / exact - 1).abs() < 0.05).all()
+
+
+def test_approx_percentiles_are_close(df):
+    result = aggregate(batches(df), ["region"], {"amount": "approx_p95"}).set_index("region")["amount"]
+    exact = df.groupby("region")["amount"].quantile(0.95)
+    np.testing.assert_allclose(result.sort_index(), exact.sort_index(), rtol=0.02)
+
+    median = aggregate(batches(df), ["region"], {"amount": "approx_median"}).set_index("region")["amount"]
+    np.testing.assert_allclose(median.sort_index(), df.groupby("region")["amount"].median().sort_index(), rtol=0.02)
+
+
+def test_spilling_gives_the_same_result(df, tmp_path):
+    aggregations = {"amount": "approx_p95", "customer": "approx_distinct"}
+    in_memory = aggregate(batches(df), ["group", "region"], aggregations)
+
+    aggregator = StreamingAggregator(["group", "region"], aggregations, max_memory_bytes=100000, spill_partitions=4, spill_dir=str(tmp_path))
+    for batch in batches(df):
+        aggregator.update(batch)
+    assert aggregator.spills > 0
+    spilled = aggregator.result()
+
+    pd.testing.assert_frame_equal(spilled, in_memory)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_null_keys_and_values():
+    frame = pd.DataFrame({"k": ["a", "a", None, "b"], "v": [1, None, 3, None]})
+    result = aggregate([frame], ["k"], {"v": "approx_distinct"}).set_index("k")["v"]
+    assert result.to_dict() == {"a": 1, "b": 0}
+
+
+def test_exact_functions_are_not_streamed():
+    assert is_streamable({"a": "sum", "b": "approx_distinct", "c": "approx_p99", "d": "approx_median"})
+    for func in ("nunique", "median", "p95", "std"):
+        assert not is_streamable({"a": func})
+
+
+def test_aggregate_frame_exact_and_approximate(df):
+    result = aggregate_frame(df, ["region"], {
+        "customer": "nunique", "amount": "median", "group": "p90"
+    }).set_index("region")
+    grouped = df.groupby("region")
+    pd.testing.assert_series_equal(result["customer"], grouped["customer"].nunique(), check_names=False)
+    pd.testing.assert_series_equal(result["amount"], grouped["amount"].median(), check_names=False)
+    pd.testing.assert_series_equal(result["group"], grouped["group"].quantile(0.9), check_names=False)
+
+    approximate = aggregate_frame(df, ["region"], {"customer": "approx_distinct", "amount": "sum"})
+    streamed = aggregate(batches(df), ["region"], {"customer": "approx_distinct", "amount": "sum"})
+    pd.testing.assert_frame_equal(approximate, streamed, check_dtype=False)
@@ -0,0 +1,42 @@
+import asyncio
+
+from app.core.azure_client import APPEND_BLOCK_BYTES
+from benchmarks.fakes import FakeAzureClient
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_append_splits_blocks_at_lines():
+    client = FakeAzureClient()
+    line = b"x" * 1023 + b"\n"
+    data = line * (APPEND_BLOCK_BYTES // len(line) * 2 + 10)
+
+    run(client.append_to_blob("raw", "events.ndjson", data))
+    run(client.append_to_blob("raw", "events.ndjson", line))
+
+    blob = client.blobs["raw/events.ndjson"]
+    assert blob["size"] == len(data) + len(line)
+    assert blob["blocks"] == 4
+
+
+def test_event_hub_batches_by_size():
+    client = FakeAzureClient()
+    records = [{"id": i, "payload": "x" * 2000} for i in range(1000)]
+
+    run(client.send_to_event_hub("events", records))
+
+    assert client.events["events"] == len(records)
+    assert client.event_batches > 1
+
+
+def test_job_status_round_trip():
+    client = FakeAzureClient()
+    run(client.initialize())
+    run(client.update_job_status("job", "completed", {"records_processed": 3}))
+
+    status = run(client.get_job_status("job"))
+    assert status["status"] == "completed"
+    assert status["details"] == {"records_processed": 3}
+    assert run(client.get_job_status("missing")) is None
@@ -0,0 +1,149 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from app.core import data_processor
+from app.core.data_processor import HIVE_DEFAULT_PARTITION, partition_frame, process_data, upload_partitioned_to_blob
+from app.core.job_registry import JobCheckpoints
+from app.schemas.models import DataSourceConfig
+from benchmarks import fakes
+from benchmarks.fakes import FakeAzureClient
+from config.settings import settings
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def paths(parts):
+    return [path for path, _ in parts]
+
+
+@pytest.fixture
+def fan_out(monkeypatch):
+    """Run process_data against the fakes, counting reads of the source"""
+    monkeypatch.setattr(settings, "CHECKPOINT_ENABLED", False)
+    reads = []
+
+    async def fetch_data(config):
+        reads.append(config.source_url)
+        return [{"id": i, "v": i * 10} for i in range(5)]
+
+    monkeypatch.setattr(data_processor, "fetch_data", fetch_data)
+
+    def process(destinations):
+        client = FakeAzureClient()
+        config = DataSourceConfig(source_type="api", source_url="http://source/records", destination="blob:raw/out.json")
+        config = config.copy(update={"destination": destinations})
+
+        async def run_job():
+            await client.initialize()
+            ok = await process_data("job", config, client)
+            return ok, await client.get_job_status("job")
+
+        ok, status = run(run_job())
+        return client, reads, ok, status
+    return process
+
+
+def test_fan_out_reads_source_once(fan_out):
+    client, reads, ok, status = fan_out(["blob:raw/out.json", "blob:archive/out.csv", "eventhub:events"])
+
+    assert ok and reads == ["http://source/records"]
+    assert status["status"] == "completed"
+    assert sorted(client.blobs) == ["archive/out.csv", "raw/out.json"]
+    assert client.events["events"] == 5
+    assert {sink["status"] for sink in status["details"]["sinks"].values()} == {"completed"}
+
+
+def test_failed_sink_completes_with_errors(fan_out, monkeypatch):
+    async def rejected(self, batch, **kwargs):
+        raise fakes._service_error(400, "Event Hub rejected the batch")
+
+    monkeypatch.setattr(fakes.FakeEventHubProducer, "send_batch", rejected)
+    client, reads, ok, status = fan_out(["blob:raw/out.json", "eventhub:events", "ftp:elsewhere"])
+
+    assert not ok and len(reads) == 1
+    assert status["status"] == "completed_with_errors"
+    sinks = status["details"]["sinks"]
+    assert sinks["blob:raw/out.json"] == {"status": "completed", "attempts": 1}
+    assert sinks["eventhub:events"]["status"] == "failed"
+    assert sinks["eventhub:events"]["attempts"] == 1
+    assert "rejected" in sinks["eventhub:events"]["error"]
+    assert sinks["ftp:elsewhere"] == {"status": "failed", "attempts": 0, "error": "Unsupported destination: ftp:elsewhere"}
+
+
+def test_all_sinks_failing_fails_the_job(fan_out):
+    client, reads, ok, status = fan_out(["ftp:elsewhere"])
+
+    assert not ok
+    assert status["status"] == "failed"
+    assert status["details"]["sinks"]["ftp:elsewhere"]["status"] == "failed"
+
+
+def test_partition_by_several_columns():
+    df = pd.DataFrame({"region": ["emea", "apac", "emea"], "year": [2024, 2024, 2023], "v": [1, 2, 3]})
+
+    parts = dict(partition_frame(df, ["region", "year"]))
+    assert sorted(parts) == [
+        "region=apac/year=2024/part-0000",
+        "region=emea/year=2023/part-0000",
+        "region=emea/year=2024/part-0000",
+    ]
+    assert list(parts["region=emea/year=2024/part-0000"].columns) == ["v"]
+
+
+def test_null_keys_and_quoting():
+    df = pd.DataFrame({"key": [None, "a/b=c", "plain"], "v": [1, 2, 3]})
+
+    assert sorted(paths(partition_frame(df, ["key"]))) == [
+        f"key={HIVE_DEFAULT_PARTITION}/part-0000",
+        "key=a%2Fb%3Dc/part-0000",
+        "key=plain/part-0000",
+    ]
+
+
+def test_rows_per_file():
+    df = pd.DataFrame({"region": ["emea"] * 5 + ["apac"], "v": range(6)})
+
+    parts = dict(partition_frame(df, ["region"], rows_per_file=2))
+    assert sorted(parts) == [
+        "region=apac/part-0000",
+        "region=emea/part-0000",
+        "region=emea/part-0001",
+        "region=emea/part-0002",
+    ]
+    assert parts["region=emea/part-0002"]["v"].tolist() == [4]
+    assert paths(partition_frame(df, rows_per_file=4)) == ["part-0000", "part-0001"]
+
+
+def test_categorical_keys_only_yield_observed_values():
+    df = pd.DataFrame({"region": pd.Categorical(["emea"], categories=["amer", "apac", "emea"]), "v": [1]})
+
+    assert paths(partition_frame(df, ["region"])) == ["region=emea/part-0000"]
+
+
+def test_partitioned_write_replaces_earlier_run():
+    client = FakeAzureClient()
+    client.blobs["lake/sales/region=old/part-0003.csv"] = {"size": 1, "append": False, "blocks": 1}
+    client.blobs["lake/sales_archive/part-0000.csv"] = {"size": 1, "append": False, "blocks": 1}
+    df = pd.DataFrame({"region": ["emea", "apac"], "v": [1, 2]})
+
+    assert run(upload_partitioned_to_blob(client, "job", df, "lake/sales", "csv", ["region"])) == 2
+    assert sorted(client.blobs) == [
+        "lake/sales/region=apac/part-0000.csv",
+        "lake/sales/region=emea/part-0000.csv",
+        "lake/sales_archive/part-0000.csv",
+    ]
+
+
+def test_resumed_write_keeps_committed_parts():
+    client = FakeAzureClient()
+    client.blobs["lake/sales/region=emea/part-0000.csv"] = {"size": 1, "append": False, "blocks": 1}
+    checkpoints = JobCheckpoints("job", committed={"sink-0/region=emea/part-0000"})
+    df = pd.DataFrame({"region": ["emea", "apac"], "v": [1, 2]})
+
+    run(upload_partitioned_to_blob(client, "job", df, "lake/sales", "csv", ["region"], checkpoints=checkpoints, checkpoint_prefix="sink-0"))
+    assert client.blobs["lake/sales/region=emea/part-0000.csv"]["size"] == 1
+    assert "lake/sales/region=apac/part-0000.csv" in client.blobs
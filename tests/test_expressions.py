@@ -0,0 +1,177 @@
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from app.core.expressions import (
+    ExpressionError, MAX_DEPTH, apply_assignments, apply_filter, parse_assignments, parse_expression, schema_of
+)
+from app.schemas.models import Transformation
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "name": ["alice", "Bob", "carol", None],
+        "value": [50, 150, 250, None],
+        "region": ["emea", "apac", "amer", "emea"],
+        "created": pd.to_datetime(["2024-01-10", "2024-01-15", "2024-01-20", "2024-02-01"]),
+    })
+
+
+def ids(frame):
+    return frame["id"].tolist()
+
+
+class TestParser:
+    def test_precedence(self, df):
+        assert ids(apply_filter(df, "id == 1 or id == 2 and value > 100")) == [1, 2]
+        assert ids(apply_filter(df, "(id == 1 or id == 2) and value > 100")) == [2]
+        assert ids(apply_filter(df, "value - 10 * 2 == 30")) == [1]
+
+    def test_parse_is_cached(self):
+        assert parse_expression("id > 1") is parse_expression("id > 1")
+
+    def test_newlines_are_whitespace_in_conditions(self, df):
+        assert ids(apply_filter(df, "value > 100\n  and region == 'apac'")) == [2]
+
+    def test_assignments_split_on_newlines_and_semicolons(self):
+        names = [name for name, _ in parse_assignments("a = 1\nb = 2; c = a + b")]
+        assert names == ["a", "b", "c"]
+
+    @pytest.mark.parametrize("source", ["id >", "id == (1", "id $ 2", "1 2", "unknown_fn(id)", "'unterminated"])
+    def test_syntax_errors(self, source):
+        with pytest.raises(ExpressionError):
+            parse_expression(source)
+
+    @pytest.mark.parametrize("source", [
+        "(" * 3000 + "id" + ")" * 3000,
+        "not " * 3000 + "id",
+        "-" * 3000 + "id",
+        "abs(" * 3000 + "id" + ")" * 3000,
+        "id" + " + id" * 5000,
+    ], ids=["parentheses", "not", "minus", "calls", "operator chain"])
+    def test_deep_nesting_is_an_expression_error(self, source):
+        with pytest.raises(ExpressionError, match="nested"):
+            parse_expression(source)
+
+    def test_moderate_nesting_is_allowed(self, df):
+        depth = MAX_DEPTH // 2
+        assert ids(apply_filter(df, "(" * depth + "id == 1" + ")" * depth)) == [1]
+
+    def test_deep_nesting_is_rejected_at_request_validation(self):
+        with pytest.raises(ValidationError):
+            Transformation(type="filter", condition="(" * 3000 + "id" + ")" * 3000)
+
+
+class TestValidation:
+    def test_unknown_column(self, df):
+        with pytest.raises(ExpressionError, match="Unknown column 'missing'"):
+            apply_filter(df, "missing > 1")
+
+    def test_type_mismatch(self, df):
+        with pytest.raises(ExpressionError, match="Cannot compare"):
+            apply_filter(df, "value == 'x'")
+
+    def test_filter_must_be_boolean(self, df):
+        with pytest.raises(ExpressionError, match="boolean"):
+            apply_filter(df, "value + 1")
+
+    def test_only_literals_in_in_list(self):
+        with pytest.raises(ExpressionError):
+            parse_expression("id in (value)")
+
+    def test_literal_arguments(self):
+        with pytest.raises(ExpressionError, match="must be a literal"):
+            parse_expression("contains(name, region)")
+
+    def test_no_python_escape_hatches(self, df):
+        for source in ["__import__('os')", "name.__class__", "id; import os", "@id"]:
+            with pytest.raises(ExpressionError):
+                apply_filter(df, source)
+
+    def test_schema_of(self, df):
+        schema = schema_of(df)
+        assert schema["id"] == "number"
+        assert schema["created"] == "datetime"
+
+    def test_invalid_date_literal(self, df):
+        with pytest.raises(ExpressionError, match="Invalid date"):
+            apply_filter(df, "created > 'not a date'")
+
+    def test_datetime_only_compares_with_literals(self, df):
+        with pytest.raises(ExpressionError):
+            apply_filter(df, "created > region")
+
+    def test_object_columns_are_typed_by_sample(self, df):
+        df = df.astype({"name": object, "region": object})
+        assert schema_of(df)["name"] == "string"
+        with pytest.raises(ExpressionError, match="expects number"):
+            apply_assignments(df, "x = name * 3")
+
+    @pytest.mark.parametrize("source", ["x = created - 1", "x = created - region", "x = created + '2024-01-01'"])
+    def test_datetime_arithmetic(self, df, source):
+        with pytest.raises(ExpressionError):
+            apply_assignments(df, source)
+
+    @pytest.mark.parametrize("source", ["round(value, 1.5)", "round(value, true)", "substr(name, 1.0)", "substr(name, 0, null)"])
+    def test_integer_arguments(self, source):
+        with pytest.raises(ExpressionError, match="must be an integer"):
+            parse_expression(source)
+
+
+class TestEvaluation:
+    def test_null_checks(self, df):
+        assert ids(apply_filter(df, "value is null")) == [4]
+        assert ids(apply_filter(df, "value == null")) == [4]
+        assert ids(apply_filter(df, "name is not null")) == [1, 2, 3]
+
+    def test_null_comparisons_drop_the_row(self, df):
+        assert ids(apply_filter(df, "not (value > 100)")) == [1, 4]
+        assert ids(apply_filter(df, "value > 100")) == [2, 3]
+
+    def test_in(self, df):
+        assert ids(apply_filter(df, "region in ('emea', 'apac')")) == [1, 2, 4]
+        assert ids(apply_filter(df, "region not in ('emea')")) == [2, 3]
+
+    def test_string_functions(self, df):
+        assert ids(apply_filter(df, "startswith(lower(name), 'b')")) == [2]
+        assert ids(apply_filter(df, "length(region) == 4 and contains(region, 'm')")) == [1, 3, 4]
+
+    def test_datetime_compared_with_string_literal(self, df):
+        assert ids(apply_filter(df, "created > '2024-01-15'")) == [3, 4]
+        assert ids(apply_filter(df, "'2024-01-15' >= created")) == [1, 2]
+        assert ids(apply_filter(df, "created in ('2024-01-10', '2024-02-01')")) == [1, 4]
+
+    def test_datetime_literal_in_column_time_zone(self, df):
+        df["created"] = df["created"].dt.tz_localize("UTC")
+        assert ids(apply_filter(df, "created >= '2024-01-20'")) == [3, 4]
+        assert ids(apply_filter(df, "created >= '2024-01-20T01:00:00+02:00'")) == [3, 4]
+
+    def test_assignments(self, df):
+        result = apply_assignments(df, "total = value * 2; label = concat(upper(region), '-', id)")
+        assert result["total"].tolist()[:3] == [100, 300, 500]
+        assert result["label"].tolist()[0] == "EMEA-1"
+        assert "total" not in df
+
+    def test_assignments_see_earlier_columns(self, df):
+        result = apply_assignments(df, "a = id * 10\nb = a + 1")
+        assert result["b"].tolist() == [11, 21, 31, 41]
+
+    def test_arithmetic_checks_object_values(self, df):
+        df["mixed"] = pd.Series([1, "a", 2, None], dtype=object)
+        with pytest.raises(ExpressionError, match="expects numbers"):
+            apply_assignments(df, "x = mixed * 3")
+
+        df = df.astype({"name": object})
+        assert apply_assignments(df, "x = name + '!'")["x"].tolist()[:2] == ["alice!", "Bob!"]
+
+    def test_datetime_minus_string_literal(self, df):
+        result = apply_assignments(df, "age = created - '2024-01-01'; r = round(value / 3, 1)")
+        assert result["age"].dt.days.tolist() == [9, 14, 19, 31]
+        assert result["r"].tolist()[:2] == [16.7, 50.0]
+
+    def test_if_and_coalesce(self, df):
+        result = apply_assignments(df, "size = if(value > 100, 'big', 'small'); v = coalesce(value, 0)")
+        assert result["size"].tolist() == ["small", "big", "big", "small"]
+        assert result["v"].tolist() == [50, 150, 250, 0]
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core import data_processor
+from app.core.job_registry import JobRegistry, JobWorker
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return JobRegistry(str(tmp_path / "registry.db"))
+
+
+def status(registry, job_id):
+    return registry.get(job_id)["status"]
+
+
+def test_job_is_claimed_once(registry):
+    registry.submit("job", "ingest", {"a": 1})
+
+    job = registry.claim("worker-1", 60)
+    assert job["job_id"] == "job"
+    assert job["payload"] == {"a": 1}
+    assert job["attempts"] == 1
+    assert registry.claim("worker-2", 60) is None
+
+
+def test_expired_lease_is_reclaimed(registry):
+    registry.submit("job", "ingest", {})
+    registry.claim("worker-1", 0.01)
+    time.sleep(0.02)
+
+    job = registry.claim("worker-2", 60)
+    assert job["job_id"] == "job"
+    assert job["attempts"] == 2
+    assert not registry.renew("job", "worker-1", 60)
+    assert not registry.finish("job", "worker-1", "completed")
+    assert registry.finish("job", "worker-2", "completed")
+    assert status(registry, "job") == "completed"
+
+
+def test_renew_keeps_lease(registry):
+    registry.submit("job", "ingest", {})
+    registry.claim("worker-1", 0.05)
+    for _ in range(3):
+        time.sleep(0.02)
+        assert registry.renew("job", "worker-1", 0.05)
+    assert registry.claim("worker-2", 60) is None
+
+
+def test_released_job_waits_for_delay(registry):
+    registry.submit("job", "ingest", {})
+    registry.claim("worker-1", 60)
+    assert registry.release("job", "worker-1", 0.05)
+
+    assert registry.claim("worker-1", 60) is None
+    time.sleep(0.06)
+    assert registry.claim("worker-1", 60)["attempts"] == 2
+
+
+def test_tenants_share_by_weight(registry):
+    for i in range(6):
+        registry.submit(f"heavy-{i}", "ingest", {}, "heavy", weight=2)
+    for i in range(6):
+        registry.submit(f"light-{i}", "ingest", {}, "light", weight=1)
+
+    claimed = [registry.claim("worker", 60)["tenant"] for _ in range(6)]
+    assert claimed.count("heavy") == 4
+    assert claimed.count("light") == 2
+
+
+def test_retry_and_cancel(registry):
+    registry.submit("job", "ingest", {})
+    assert not registry.retry("job")
+
+    registry.claim("worker", 60)
+    registry.finish("job", "worker", "failed")
+    assert registry.retry("job")
+    assert status(registry, "job") == "pending"
+
+    assert registry.cancel("job")
+    assert registry.claim("worker", 60) is None
+    assert not registry.cancel("job")
+
+
+def test_lease_survives_cpu_bound_transform(registry, monkeypatch):
+    """A transform longer than the lease must not let another worker take the job"""
+    def slow_transform(data, transformations):
+        time.sleep(0.6)
+        return data
+
+    async def handler(job_id, payload):
+        await data_processor.transform_data([{"a": 1}], [{"type": "select", "columns": ["a"]}])
+        return True
+
+    monkeypatch.setattr(data_processor, "apply_transformations", slow_transform)
+    registry.submit("job", "ingest", {})
+
+    stolen = []
+    stop = threading.Event()
+
+    def rival():
+        while not stop.is_set() and status(registry, "job") == "pending":
+            time.sleep(0.01)
+        while not stop.is_set():
+            job = registry.claim("rival", 60)
+            if job:
+                stolen.append(job)
+            time.sleep(0.02)
+
+    async def run():
+        worker = JobWorker(registry, {"ingest": handler}, concurrency=1, lease_seconds=0.15, poll_interval=0.01)
+        worker.start()
+        try:
+            # Bounded, since a rival that stole the job keeps it running
+            deadline = time.monotonic() + 5
+            while status(registry, "job") in ("pending", "running") and not stolen and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+        finally:
+            await worker.stop()
+
+    thread = threading.Thread(target=rival)
+    thread.start()
+    try:
+        asyncio.run(run())
+    finally:
+        stop.set()
+        thread.join()
+
+    assert stolen == []
+    assert status(registry, "job") == "completed"
+    assert registry.get("job")["attempts"] == 1
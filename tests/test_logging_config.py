@@ -0,0 +1,51 @@
+import logging
+from logging.handlers import RotatingFileHandler
+
+import pytest
+
+from config import logging_config
+from config.settings import settings
+
+
+@pytest.fixture
+def fresh_logging(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(logging_config, "_listener", None)
+    monkeypatch.setattr(logging_config, "_queue_handler", None)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+
+    def setup():
+        logging_config.setup_logging()
+        return [type(handler) for handler in logging_config._listener.handlers]
+
+    yield setup
+
+    logging_config.shutdown_logging()
+    root.handlers, root.level = handlers, level
+
+
+def test_single_worker_logs_to_file(fresh_logging, monkeypatch, tmp_path):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    assert RotatingFileHandler in fresh_logging()
+    assert (tmp_path / "logs").is_dir()
+
+
+def test_multiple_workers_log_to_stdout_only(fresh_logging, monkeypatch, tmp_path):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path / "metrics"))
+    assert fresh_logging() == [logging.StreamHandler]
+    assert not (tmp_path / "logs").exists()
+
+
+def test_records_carry_context(fresh_logging, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    fresh_logging()
+    handler = logging_config._queue_handler
+    record = logging.LogRecord("test", logging.INFO, "", 0, "job %s", ("started",), None)
+
+    with logging_config.log_context(job_id="42"):
+        handler.prepare(record)
+
+    assert record.getMessage() == "job started"
+    assert record.context == {"job_id": "42"}
+    assert '"job_id": "42"' in logging_config.JsonFormatter().format(record)
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+
+from app.core.azure_client import AzureClient
+from app.core.data_processor import write_to_sink
+from app.core.job_registry import JobCheckpoints
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    TransientError,
+    is_transient,
+    retry_async,
+    track_retries,
+)
+from app.schemas.models import DataSourceConfig
+from config.settings import settings
+
+
+class Flaky:
+    """Fails with each of ``errors`` in turn, then succeeds"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def retry(func, breaker=None, attempts=3):
+    return asyncio.run(retry_async(func, name="test", attempts=attempts, base_delay=0, breaker=breaker))
+
+
+def open_breaker(threshold=2):
+    breaker = CircuitBreaker("test", failure_threshold=threshold, reset_timeout=0)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_is_transient():
+    assert is_transient(TransientError("503"))
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(type("HttpError", (Exception,), {"status_code": 503})())
+    assert not is_transient(type("HttpError", (Exception,), {"status_code": 404})())
+    assert not is_transient(ValueError("bad"))
+
+
+def test_retries_transient_errors():
+    func = Flaky(TransientError("1"), TransientError("2"))
+    assert retry(func) == "ok"
+    assert func.calls == 3
+
+
+def test_raises_non_transient_at_once():
+    func = Flaky(ValueError("bad"))
+    with pytest.raises(ValueError):
+        retry(func)
+    assert func.calls == 1
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    with pytest.raises(TransientError):
+        retry(Flaky(TransientError("1"), TransientError("2")), breaker, attempts=2)
+    assert breaker.state == "open"
+
+    func = Flaky()
+    with pytest.raises(CircuitOpenError):
+        retry(func, breaker, attempts=1)
+    assert func.calls == 0
+
+
+def test_non_transient_errors_leave_breaker_closed():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            retry(Flaky(ValueError("bad")), breaker)
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_half_open_trial_closes_breaker():
+    breaker = open_breaker()
+    assert breaker.state == "half_open"
+    assert retry(Flaky(), breaker) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_releases_breaker():
+    breaker = open_breaker()
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    async def cancel_trial():
+        task = asyncio.create_task(retry_async(hang, name="test", attempts=1, base_delay=0, breaker=breaker))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert breaker.state == "half_open"
+    assert retry(Flaky(), breaker) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_only_the_trial_ends_the_trial():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+
+    async def scenario():
+        earlier, trial = asyncio.Event(), asyncio.Event()
+
+        async def fail_when(event):
+            await event.wait()
+            raise ValueError("bad request")
+
+        async def succeed_when(event):
+            await event.wait()
+            return "ok"
+
+        def call(func):
+            return asyncio.create_task(retry_async(func, name="test", attempts=1, base_delay=0, breaker=breaker))
+
+        # Starts while the circuit is closed, and fails without saying anything about the endpoint
+        first = call(lambda: fail_when(earlier))
+        await asyncio.sleep(0)
+        breaker.record_failure()
+        second = call(lambda: succeed_when(trial))
+        await asyncio.sleep(0)
+
+        earlier.set()
+        with pytest.raises(ValueError):
+            await first
+        with pytest.raises(CircuitOpenError):
+            await retry_async(Flaky(), name="test", attempts=1, base_delay=0, breaker=breaker)
+
+        trial.set()
+        assert await second == "ok"
+
+    asyncio.run(scenario())
+    assert breaker.state == "closed"
+
+
+def test_track_retries_counts_child_tasks():
+    async def run():
+        with track_retries() as stats:
+            await asyncio.gather(
+                retry_async(Flaky(TransientError("1")), name="a", attempts=3, base_delay=0),
+                retry_async(Flaky(), name="b", attempts=3, base_delay=0),
+            )
+        return stats
+
+    stats = asyncio.run(run())
+    assert (stats.calls, stats.attempts, stats.retries) == (2, 2, 1)
+
+
+@pytest.fixture
+def flaky_client(monkeypatch):
+    monkeypatch.setattr(settings, "SINK_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "SINK_RETRY_BACKOFF", 0)
+    client = AzureClient()
+
+    def with_failures(*errors):
+        async def upload_blob(container_name, blob_path, data, content_type=None):
+            return await client._with_retry(f"blob:test-{id(errors)}", "Upload", Flaky(*errors))
+
+        client.upload_blob = upload_blob
+        return client
+
+    return with_failures
+
+
+def sink(client, destination="blob:container/out.json"):
+    config = DataSourceConfig(source_type="api", source_url="https://example.com", destination=destination, file_format="json")
+    return asyncio.run(write_to_sink(client, "job", [{"a": 1}], destination, config, JobCheckpoints("job")))
+
+
+def test_sink_reports_attempts(flaky_client):
+    result = sink(flaky_client(TransientError("1")))
+    assert result["status"] == "completed"
+    assert result["attempts"] == 2
+
+
+def test_failed_sink_reports_attempts(flaky_client):
+    result = sink(flaky_client(*[TransientError(str(i)) for i in range(3)]))
+    assert result["status"] == "failed"
+    assert result["attempts"] == 3
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from app.core import schema_cache
+from app.core.aggregation import aggregate_frame
+from app.core.data_processor import fetch_from_file, iter_file_batches
+from app.core.expressions import apply_assignments, apply_filter
+from config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SCHEMA_CACHE_DIR", str(tmp_path / "schemas"))
+    return tmp_path / "schemas"
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def test_learned_schema_types():
+    df = pd.DataFrame({
+        "amount": [1, 2, 40],
+        "day": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "region": ["emea"] * 3,
+        "price": [1.5, 2.0, 3.0],
+    })
+    schema = schema_cache.learn_schema(df)
+    assert schema["dtypes"]["amount"] == "int64"
+    assert schema["dtypes"]["day"] == "datetime64[ns]"
+    assert schema["datetime_formats"]["day"] == "%Y-%m-%d"
+    assert schema["dtypes"]["region"] == "category"
+    assert schema["dtypes"]["price"] == "float64"
+
+
+def test_later_reads_do_not_wrap_integers(tmp_path):
+    # Regression: the first file's range used to be cached as int8, and 300 read back as 44
+    path = tmp_path / "feed.csv"
+    write_csv(path, {"id": [1, 2], "amount": [10, 40]})
+    asyncio.run(fetch_from_file(str(path), "csv"))
+
+    write_csv(path, {"id": [3, 4], "amount": [300, 70000]})
+    df = asyncio.run(fetch_from_file(str(path), "csv"))
+    assert df["amount"].tolist() == [300, 70000]
+
+    streamed = pd.concat(iter_file_batches(str(path), "csv", 1))
+    assert streamed["amount"].tolist() == [300, 70000]
+
+
+def test_drift_relearns_schema(tmp_path):
+    path = tmp_path / "feed.csv"
+    write_csv(path, {"id": [1, 2], "amount": [10, 40]})
+    asyncio.run(fetch_from_file(str(path), "csv"))
+
+    write_csv(path, {"id": [1, 2], "amount": ["unknown", "12"]})
+    df = asyncio.run(fetch_from_file(str(path), "csv"))
+    assert df["amount"].tolist() == ["unknown", "12"]
+    assert schema_cache.load_schema(str(path), "csv")["dtypes"]["amount"] != "int64"
+
+
+def test_cache_key_ignores_query_and_credentials(cache_dir):
+    url = "https://account.blob.core.windows.net/feeds/daily.csv"
+    signed = url + "?sv=2022-11-02&sig=SECRET"
+    schema = schema_cache.learn_schema(pd.DataFrame({"a": [1]}))
+
+    schema_cache.save_schema(signed, "csv", schema)
+    assert schema_cache.load_schema(url + "?sv=2023-01-01&sig=OTHER", "csv") is not None
+    assert schema_cache.load_schema("https://user:pw@account.blob.core.windows.net/feeds/daily.csv", "csv") is not None
+
+    files = os.listdir(cache_dir)
+    assert len(files) == 1
+    content = (cache_dir / files[0]).read_text()
+    assert "SECRET" not in content and "sig=" not in content
+    assert json.loads(content)["source"] == url
+
+
+def test_schemas_from_older_versions_are_ignored(tmp_path):
+    path = str(tmp_path / "feed.csv")
+    schema = schema_cache.learn_schema(pd.DataFrame({"a": [1]}))
+    schema_cache.save_schema(path, "csv", schema)
+
+    cache_file = schema_cache._cache_path(path, "csv")
+    with open(cache_file) as f:
+        stored = json.load(f)
+    stored["version"] = 1
+    with open(cache_file, "w") as f:
+        json.dump(stored, f)
+
+    assert schema_cache.load_schema(path, "csv") is None
+
+
+def test_aggregating_categoricals_only_yields_observed_groups():
+    df = pd.DataFrame({
+        "region": pd.Categorical(["emea", "apac"]),
+        "tier": pd.Categorical(["gold", "silver"]),
+        "amount": [1, 2],
+    })
+    result = aggregate_frame(df, ["region", "tier"], {"amount": "sum"})
+    assert len(result) == 2
+
+
+def test_expressions_over_cached_categoricals(tmp_path):
+    path = tmp_path / "feed.csv"
+    write_csv(path, {"id": range(1, 9), "region": ["emea", "apac", "amer", None] * 2})
+    asyncio.run(fetch_from_file(str(path), "csv"))
+
+    df = asyncio.run(fetch_from_file(str(path), "csv"))
+    assert isinstance(df["region"].dtype, pd.CategoricalDtype)
+
+    assert apply_filter(df, "region > 'apac'")["id"].tolist() == [1, 5]
+    result = apply_assignments(df, "r = coalesce(region, 'none'); s = if(id > 4, region, 'early')")
+    assert result["r"].tolist()[:4] == ["emea", "apac", "amer", "none"]
+    assert result["s"].tolist()[3:6] == ["early", "emea", "apac"]
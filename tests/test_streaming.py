@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core import streaming
+from app.core.streaming import InvalidRecord, MicroBatcher, RecordTooLarge, StreamClosed, iter_ndjson
+from app.schemas.models import StreamConfig
+from config.settings import settings
+
+
+class RecordingClient:
+    """Azure client stand-in that keeps what the batcher appends"""
+
+    def __init__(self):
+        self.blobs = {}
+
+    async def append_to_blob(self, container_name, blob_path, data, content_type=None):
+        self.blobs[f"{container_name}/{blob_path}"] = self.blobs.get(f"{container_name}/{blob_path}", b"") + data
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def parse(*chunks, max_line_bytes=None):
+    async def run():
+        return [record async for record in iter_ndjson(chunked(*chunks), max_line_bytes)]
+    return asyncio.run(run())
+
+
+def test_iter_ndjson_across_chunks():
+    assert parse(b'{"a": 1}\n{"a"', b': 2}\n\n{"a": 3}') == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+def test_iter_ndjson_rejects_non_objects():
+    with pytest.raises(InvalidRecord, match="Line 2"):
+        parse(b'{"a": 1}\n[1, 2]\n')
+
+
+def test_iter_ndjson_caps_line_length():
+    with pytest.raises(RecordTooLarge, match="Line 2"):
+        parse(b'{"a": 1}\n{"a": "', b"x" * 100, b"x" * 100, max_line_bytes=64)
+
+    with pytest.raises(RecordTooLarge):
+        parse(b'{"a": "' + b"x" * 100 + b'"}\n', max_line_bytes=64)
+
+
+@pytest.fixture
+def batcher_settings(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_MAX_BATCH_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "STREAM_IDLE_SECONDS", 0.05)
+
+
+def test_flush_writes_valid_json(batcher_settings):
+    config = StreamConfig(
+        destination="blob:raw/out.ndjson",
+        transformations=[{"type": "custom", "code": "total = count * 2"}]
+    )
+    client = RecordingClient()
+
+    async def run():
+        batcher = MicroBatcher("stream", config, client)
+        for record in [{"count": 1, "name": "a"}, {"name": "b"}, {"count": 3}]:
+            await batcher.put(record)
+        await batcher.close()
+
+    asyncio.run(run())
+    lines = client.blobs["raw/out.ndjson"].decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"count": 1, "name": "a", "total": 2},
+        {"name": "b"},
+        {"count": 3, "total": 6},
+    ]
+
+
+def test_failed_flusher_closes_batcher(batcher_settings, monkeypatch):
+    def broken_registry():
+        raise RuntimeError("registry unavailable")
+
+    monkeypatch.setattr(streaming, "REGISTRY_CHECK_SECONDS", 0)
+    monkeypatch.setattr(streaming, "get_job_registry", broken_registry)
+    monkeypatch.setattr(settings, "STREAM_QUEUE_SIZE", 1)
+
+    async def run():
+        batcher = MicroBatcher("stream", StreamConfig(destination="blob:raw/out.ndjson"), RecordingClient())
+        with pytest.raises(StreamClosed):
+            while True:
+                await asyncio.wait_for(batcher.put({"i": 1}), timeout=1)
+        assert batcher.closed
+        await batcher.close()
+
+    asyncio.run(run())
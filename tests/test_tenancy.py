@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api import routes
+from app.api.dependencies import authenticate, get_azure_client
+from app.core import tenancy
+from app.core.job_registry import JobRegistry
+from app.core.tenancy import DEFAULT_TENANT, TenantIndex
+from config.settings import settings
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    def configure(api_key="", api_keys="", debug=False):
+        monkeypatch.setattr(settings, "API_KEY", api_key)
+        monkeypatch.setattr(settings, "API_KEYS", api_keys)
+        monkeypatch.setattr(settings, "DEBUG", debug)
+        monkeypatch.setattr(tenancy, "_index", None)
+    return configure
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = JobRegistry(str(tmp_path / "registry.db"))
+    monkeypatch.setattr(routes, "get_job_registry", lambda: registry)
+    return registry
+
+
+def test_index_parses_keys():
+    index = TenantIndex("analytics:a1,analytics:a2,bare", weights="analytics=3", default_key="main")
+    assert index.lookup("a1") is index.lookup("a2")
+    assert index.lookup("a1").weight == 3
+    assert index.lookup("bare").name.startswith("key-")
+    assert index.lookup("main") is index.default
+    assert index.lookup("other") is None
+
+
+def test_api_key_authenticates_default_tenant(keys):
+    keys(api_key="main", api_keys="analytics:a1")
+    assert authenticate("main").name == DEFAULT_TENANT
+    assert authenticate("a1").name == "analytics"
+
+
+@pytest.mark.parametrize("api_key", [None, "", "wrong"])
+def test_rejects_missing_and_unknown_keys(keys, api_key):
+    keys(api_key="main")
+    with pytest.raises(HTTPException) as error:
+        authenticate(api_key)
+    assert error.value.status_code == 401
+
+
+def test_fails_closed_without_keys(keys):
+    keys()
+    with pytest.raises(HTTPException) as error:
+        authenticate("anything")
+    assert error.value.status_code == 401
+
+
+def test_debug_is_anonymous(keys):
+    keys(debug=True)
+    assert authenticate(None).name == DEFAULT_TENANT
+
+
+def test_job_tenant(registry):
+    registry.submit("queued", "ingest", {}, "analytics")
+    registry.record_upload("upload", "batch")
+    assert registry.job_tenant("queued") == "analytics"
+    assert registry.job_tenant("upload") == "batch"
+    assert registry.job_tenant("missing") is None
+
+
+def test_check_job_tenant(registry):
+    registry.submit("job", "ingest", {}, "analytics")
+
+    asyncio.run(routes.check_job_tenant("job", tenancy.Tenant("analytics")))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(routes.check_job_tenant("job", tenancy.Tenant("batch")))
+    assert error.value.status_code == 404
+
+    # Jobs the registry doesn't know predate tenants
+    asyncio.run(routes.check_job_tenant("legacy", tenancy.Tenant(DEFAULT_TENANT)))
+    with pytest.raises(HTTPException):
+        asyncio.run(routes.check_job_tenant("legacy", tenancy.Tenant("analytics")))
+
+
+def test_streams_are_scoped_to_tenant(registry):
+    registry.create_stream("stream", {"destination": "eventhub:events"}, "analytics")
+    assert registry.get_stream("stream", "analytics") == {"destination": "eventhub:events"}
+    assert registry.get_stream("stream", "batch") is None
+    assert registry.get_stream("stream") is not None
+
+    assert not registry.delete_stream("stream", "batch")
+    assert registry.delete_stream("stream", "analytics")
+    assert registry.get_stream("stream") is None
+
+
+def test_rejected_requests_never_reach_azure(keys, client):
+    keys(api_key="main")
+    initialized = []
+    client.app.dependency_overrides[get_azure_client] = lambda: initialized.append(True)
+
+    response = client.post("/api/v1/ingest", json={
+        "source_type": "api", "source_url": "http://source", "destination": "blob:raw/out.json"
+    })
+    assert response.status_code == 401
+    assert initialized == []
+
+
+def test_websocket_handshake_is_rate_limited(keys, client, monkeypatch):
+    keys(api_key="main")
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_SECOND", 0.001)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 1)
+    index = tenancy.get_tenant_index()
+    assert index.acquire(index.default) == 0
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/v1/streams/stream/ws", headers={"Authorization": "Bearer main"}):
+            pass
+    assert closed.value.code == 1008
+    assert "Rate limit" in closed.value.reason